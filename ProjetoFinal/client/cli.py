@@ -15,6 +15,7 @@ Esta camada representa a Camada de Apresentação.
 """
 
 from client.client_core import ClientCore
+from config import CLIENT_PAGE_SIZE
 
 
 # ======================================================
@@ -71,6 +72,37 @@ def print_table(headers, rows):
     print_separator()
     
 
+def print_pages(title, headers, fetch_page):
+    """
+    Exibe resultados paginados, uma página por vez.
+
+    fetch_page: função que recebe o token da página (None para a
+    primeira) e retorna a resposta do ClientCore.
+    """
+    
+    token = None
+    print(f"\n--- {title} ---")
+    
+    while True:
+        result = fetch_page(token)
+        
+        if result["status"] != "success":
+            # Em caso de erro, a resposta deve conter uma mensagem de erro no campo "message"
+            print(result["message"])
+            return
+        
+        page = result["data"]
+        print_table(headers, page["items"])
+        
+        token = page["next_page_token"]
+        
+        if not token:
+            return
+        
+        if input("Enter para a próxima página, 'q' para voltar: ").strip().lower() == "q":
+            return
+    
+
 # ======================================================
 # Funções das opções do menu 
 # Cada função deve chamar o método correspondente do ClientCore e tratar a resposta
@@ -81,20 +113,13 @@ def list_movies(core):
     Solicita ao servidor a listagem de filmes.
     """
 
-    result = core.list_movies()
+    headers = ["ID", "Título", "Gênero", "Duração (min)"]
     
-    if result["status"] == "success":
-        # A resposta de sucesso deve conter a lista de filmes no campo "data"
-        
-        movies = result["data"]        
-        headers = ["ID", "Título", "Gênero", "Duração (min)"]
-        
-        print("\n--- Filmes Disponíveis ---")
-        print_table(headers, movies)
-            
-    else:
-        # Em caso de erro, a resposta deve conter uma mensagem de erro no campo "message"        
-        print(result["message"])
+    print_pages(
+        "Filmes Disponíveis",
+        headers,
+        lambda token: core.list_movies(CLIENT_PAGE_SIZE, token)
+    )
 
 def list_screenings_by_movie(core):
     """
@@ -107,19 +132,13 @@ def list_screenings_by_movie(core):
         print("ID inválido.")
         return
 
-    result = core.list_screenings_by_movie(movie_id)
+    headers = ["Sessão ID", "Horário", "Total", "Disponíveis"]
     
-    if result["status"] == "success":
-        # A resposta de sucesso deve conter a lista de sessões no campo "data"
-        screenings = result["data"]        
-        headers = ["Sessão ID", "Horário", "Total", "Disponíveis"]
-
-        print("\n--- Sessões Disponíveis ---")
-        print_table(headers, screenings)
-            
-    else:
-        # Em caso de erro, a resposta deve conter uma mensagem de erro no campo "message"        
-        print(result["message"])
+    print_pages(
+        "Sessões Disponíveis",
+        headers,
+        lambda token: core.list_screenings_by_movie(movie_id, CLIENT_PAGE_SIZE, token)
+    )
 
 
 def buy_tickets(core):
@@ -153,18 +172,44 @@ def view_purchases(core):
     
     email = input("Digite seu e-mail: ")
     
-    result = core.get_purchases_by_email(email)
+    headers = ["Filme", "Horário", "Quantidade", "Data da Compra"]
     
-    if result["status"] == "success":
-        purchases = result["data"]
-        
-        headers = ["Filme", "Horário", "Quantidade", "Data da Compra"]
-        
-        print("\n--- Minhas Compras ---")
-        print_table(headers, purchases)
-        
-    else:
+    print_pages(
+        "Minhas Compras",
+        headers,
+        lambda token: core.get_purchases_by_email(email, CLIENT_PAGE_SIZE, token)
+    )
+    
+
+def view_stats(core):
+    """
+    Exibe os histogramas de latência e a vazão do servidor.
+    """
+    
+    result = core.get_stats()
+    
+    if result["status"] != "success":
         print(result["message"])
+        return
+    
+    stats = result["data"]
+    
+    print(
+        f"\nUptime: {stats['uptime_s']} s | Requisições: {stats['requests']} | "
+        f"Média: {stats['avg_rps']} req/s | "
+        f"Últimos {stats['recent_window_s']} s: {stats['recent_rps']} req/s"
+    )
+    
+    headers = ["Método", "Resultado", "Chamadas", "p50 (ms)", "p90 (ms)", "p99 (ms)", "Máx (ms)"]
+    rows = []
+    
+    for method, outcomes in stats["methods"].items():
+        for outcome in ("success", "business_error", "internal_error"):
+            if outcome in outcomes:
+                h = outcomes[outcome]
+                rows.append((method, outcome, h["count"], h["p50_ms"], h["p90_ms"], h["p99_ms"], h["max_ms"]))
+    
+    print_table(headers, rows)
     
 
 # ======================================================
@@ -181,6 +226,7 @@ def menu():
     print("2 - Listar Sessões")
     print("3 - Comprar Ingresso")
     print("4 - Minhas Compras")
+    print("5 - Estatísticas do Servidor")
     print("0 - Sair")
     
     
@@ -218,6 +264,10 @@ def main():
             # Visualizar ingressos comprados
             view_purchases(core)
 
+        elif option == "5":
+            # Exibir latência e vazão dos métodos remotos
+            view_stats(core)
+
         elif option == "0":
             # Encerrar o programa
             print("Encerrando...")
@@ -12,13 +12,34 @@ garantindo que a interface NÃO precise conhecer:
 - Abstrai detalhes de comunicação RPC do cliente
 - Encapsular chamadas remotas
 - Implementação de Retry automático (Tolerância a Falhas)
+- Chaves de idempotência nas compras (retry sem venda em dobro)
+- Prazo (timeout) por operação, propagado ao servidor
+- Consultas em réplicas de leitura com defasagem limitada
+  (compras sempre no servidor principal)
+- Cache de descoberta: reconexões não consultam o Name Server
+  enquanto o endereço conhecido continuar respondendo
+- Assinatura (watch) do registro: instâncias adicionadas ou removidas
+  chegam por callback, sem consultas periódicas ao Name Server
+- Escolha da instância pela carga informada pelos servidores
+  (power-of-two-choices no Name Server e no cache de descoberta)
+- Reconstruir respostas recebidas por valor (sem netrefs)
 """
 
 
+import random
 import rpyc
 import time
-from config import NAME_SERVER_HOST, NAME_SERVER_PORT, SERVICE_NAME
+import uuid
+from rpyc.core.async_ import AsyncResultTimeout
+from config import (
+    NAME_SERVER_HOST, NAME_SERVER_PORT, SERVICE_NAME, READ_SERVICE_NAME,
+    CLIENT_CALL_TIMEOUT, CLIENT_BUSY_BACKOFF, CLIENT_READ_FROM_REPLICAS, CLIENT_MAX_STALENESS,
+    REPLICA_RETRY_INTERVAL, CLIENT_DISCOVERY_TTL, CLIENT_DISCOVERY_NEGATIVE_TTL,
+    CLIENT_WATCH_REGISTRY, CLIENT_REBALANCE_RATIO
+)
 from client.circuit_breaker import CircuitBreaker
+from client.discovery import DiscoveryCache, RegistryWatcher
+from serialization import decode
 
 
 class ClientCore:
@@ -28,10 +49,58 @@ class ClientCore:
         Inicializa o cliente sem conexão ativa.
         """
         self.conn = None
+        self.address = None
 
-        # Configurações de Retry
+        # Endereços descobertos no Name Server (lookup fora do caminho
+        # das reconexões; invalidado só quando a conexão falha)
+        self.discovery = DiscoveryCache(
+            self._lookup,
+            ttl=CLIENT_DISCOVERY_TTL,
+            negative_ttl=CLIENT_DISCOVERY_NEGATIVE_TTL,
+            rebalance_ratio=CLIENT_REBALANCE_RATIO
+        )
+
+        # Assinatura das mudanças do registro (iniciada na primeira conexão)
+        self.watch_registry = CLIENT_WATCH_REGISTRY
+        self.watcher = None
+        self._watch_retry_at = 0
+
+        # Conexão com uma réplica de leitura (consultas)
+        self.read_conn = None
+        self.read_address = None
+        self.read_from_replicas = CLIENT_READ_FROM_REPLICAS
+        self.max_staleness = CLIENT_MAX_STALENESS
+
+        # Sem réplica disponível: não procurar de novo antes deste instante
+        self._replica_retry_at = 0
+
+        # Após uma compra, consultas vão ao principal até este instante
+        # (o cliente enxerga as próprias compras)
+        self._primary_reads_until = 0
+
+        # Consultas atendidas por réplica, refeitas no principal
+        # e defasagem da última resposta de réplica
+        self.replica_reads = 0
+        self.replica_fallbacks = 0
+        self.last_staleness = None
+
+        # Configurações de Retry. Consultas e compras (que levam chave de
+        # idempotência) podem ser repetidas rapidamente sem venda em dobro;
+        # escritas sem chave (reservas) esperam mais entre as tentativas
         self.max_retries = 3
-        self.retry_delay = 1  # segundos
+        self.retry_delay = 0.2  # segundos
+        self.unkeyed_retry_delay = 1  # segundos
+        
+        # Espera após resposta "servidor ocupado" (dobra a cada tentativa)
+        self.busy_backoff = CLIENT_BUSY_BACKOFF
+        self.busy_replies = 0
+        
+        # Migrações para outra instância indicada pelo cache de descoberta
+        self.rebalances = 0
+        
+        # Prazo padrão de cada operação e operações que o esgotaram
+        self.call_timeout = CLIENT_CALL_TIMEOUT
+        self.deadline_exceeded = 0
         
         # 
         self.breaker = CircuitBreaker(
@@ -44,20 +113,77 @@ class ClientCore:
     # Controles de conexão via Name Server
     # ==================================================    
         
+    def _lookup(self, service_name):
+        """
+        Consulta no Name Server o endereço (host, porta) do serviço.
+        """
+        
+        ns_conn = None
+        
+        try:
+            # Conectar ao Name Server
+            ns_conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
+            address = ns_conn.root.lookup(service_name)
+            
+            return tuple(address) if address else None
+        
+        finally:
+            # Garantir que a conexão com o Name Server seja fechada
+            if ns_conn:
+                try:
+                    ns_conn.close()
+                except Exception:
+                    pass
+    
+    
+    def _ensure_watcher(self):
+        """
+        Assina no Name Server os serviços usados pelo cliente, se ainda
+        não houver assinatura ativa. Em caso de falha, segue apenas com
+        o cache de descoberta e tenta de novo após CLIENT_DISCOVERY_TTL.
+        """
+        
+        if not self.watch_registry or time.monotonic() < self._watch_retry_at:
+            return
+        
+        if self.watcher and self.watcher.is_active():
+            return
+        
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        
+        watcher = RegistryWatcher(
+            self.discovery,
+            NAME_SERVER_HOST,
+            NAME_SERVER_PORT,
+            (SERVICE_NAME, READ_SERVICE_NAME)
+        )
+        
+        try:
+            watcher.start()
+            self.watcher = watcher
+        except Exception:
+            self._watch_retry_at = time.monotonic() + CLIENT_DISCOVERY_TTL
+    
+    
     def connect(self):
         """
-        Conecta ao servidor via RPyC usando o Name Server para descoberta.
+        Conecta ao servidor via RPyC usando o Name Server para descoberta
+        (endereço do cache de descoberta, quando conhecido).
         """
 
+        address = None
+
         try:
             # Fecha conexão anterior se existir
             if self.conn:
                 self.conn.close()
                 self.conn = None
 
-            # Conectar ao Name Server
-            ns_conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
-            address = ns_conn.root.lookup(SERVICE_NAME)
+            self._ensure_watcher()
+
+            address = self.discovery.get(SERVICE_NAME)
             
             if not address:
                 return False
@@ -65,47 +191,111 @@ class ClientCore:
             # Conectar ao servidor real
             host, port = address
             self.conn = rpyc.connect(host, port)
+            self.address = address
             return True
 
         except Exception as e:
             print(f"Erro ao conectar: {e}")
             self.conn = None
+
+            # Endereço em cache não respondeu: a próxima tentativa consulta o Name Server
+            if address:
+                self.discovery.invalidate(SERVICE_NAME, address)
+
             return False
+    
+    
+    def _connect_replica(self):
+        """
+        Conecta a uma réplica de leitura. Sem réplica registrada (ou com
+        falha), desiste por REPLICA_RETRY_INTERVAL segundos.
+        """
         
-        finally:
-            # Garantir que a conexão com o Name Server seja fechada
-            if ns_conn:
-                try:
-                    ns_conn.close()
-                except Exception:
-                    pass
+        address = None
+        
+        try:
+            address = self.discovery.get(READ_SERVICE_NAME)
+            
+            if address:
+                host, port = address
+                self.read_conn = rpyc.connect(host, port)
+                self.read_address = address
+                return True
+        
+        except Exception:
+            self.read_conn = None
+            
+            if address:
+                self.discovery.invalidate(READ_SERVICE_NAME, address)
+        
+        self._replica_retry_at = time.monotonic() + REPLICA_RETRY_INTERVAL
+        return False
         
         
     def close(self):
         """
-        Fecha conexão RPC ativa.
+        Fecha as conexões RPC ativas (principal, réplica e assinatura).
         """
         
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        
+        self._close_primary()
+        self._close_replica()
+    
+    
+    def _close_primary(self):
         if self.conn:
             try:
                 self.conn.close()
             except Exception:
                 pass
             finally:
-                self.conn = None           
+                self.conn = None
+    
+    
+    def _close_replica(self):
+        if self.read_conn:
+            try:
+                self.read_conn.close()
+            except Exception:
+                pass
+            finally:
+                self.read_conn = None
+    
+    
+    @staticmethod
+    def _drop_late_replies(conn):
+        """
+        Prazo esgotado com a resposta ainda a caminho: ela chegaria nesta
+        conexão, então o encerramento não espera o servidor confirmar.
+        """
+        
+        conn._config["sync_request_timeout"] = 0
 
     
     # ==================================================
     # Método Interno com Retry
     # ==================================================
 
-    def _retry_call(self, method_name, *args):
+    def _retry_call(self, method_name, *args, timeout=None, retry_delay=None, write=False):
         """
         Executa chamada RPC combinando retry automático e Circuit Breaker,
         implementando tolerância a falhas, verificando o estado do circuito,
         executando chamadas com retry e depois atualizando o estado do circuito.
+        
+        timeout é o prazo total da operação (todas as tentativas); cada
+        tentativa envia ao servidor o orçamento restante (deadline_ms).
+        retry_delay sobrescreve a espera entre tentativas.
+        
+        write indica operação que altera dados: se o prazo esgotar com o
+        pedido já enviado, o resultado é "unknown" (o servidor pode tê-lo
+        concluído), e não um erro.
         """
         
+        retry_delay = retry_delay or self.retry_delay
+        
         # Verifica o estado do circuito
         try:
             # Verifica se o circuito permite chamada
@@ -119,44 +309,88 @@ class ClientCore:
                 "data": None
             }
 
+        deadline = time.monotonic() + (timeout or self.call_timeout)
+
         # Executa retry apenas se circuito permitir
         for retry in range(1, self.max_retries + 1):
 
             try:
+                # O cache passou a indicar outra instância (ex.: a atual
+                # ficou sobrecarregada): migrar entre as chamadas
+                if self.conn and self.discovery.current(SERVICE_NAME) not in (None, self.address):
+                    self.rebalances += 1
+                    self._close_primary()
+
                 # Se a conexão não existir, tenta conectar
                 if not self.conn:
                     if not self.connect():
                         raise Exception("Falha ao conectar ao servidor")
 
-                # Recuperar método dinamicamente
-                method = getattr(self.conn.root, method_name)
-                result = method(*args)
+                remaining = deadline - time.monotonic()
+                
+                if remaining <= 0:
+                    return self._deadline_exceeded()
+
+                # Chamada assíncrona com expiração: o cliente não fica
+                # preso a um servidor travado além do prazo
+                method = rpyc.async_(getattr(self.conn.root, method_name))
+                pending = method(*args, deadline_ms=int(remaining * 1000))
+                pending.set_expiry(remaining)
+                result = pending.value
                 
                 # Se chegou aqui, circuito foi bem sucedido
                 self.breaker.on_success()
 
-                # Forçar materialização simples sem pickle
-                if isinstance(result, dict):
-                    return {k: v for k, v in result.items()}
+                # Reconstruir a resposta recebida por valor; um proxy
+                # remoto indica servidor incompatível (não adianta repetir)
+                try:
+                    result = decode(result)
+                except TypeError as e:
+                    return {
+                        "status": "error",
+                        "message": f"Resposta inválida do servidor: {e}",
+                        "data": None
+                    }
+                
+                if result.get("status") != "busy":
+                    return result
+                
+                # Servidor ativo, mas sem worker livre: a operação não foi
+                # executada. A conexão recusada é encerrada pelo servidor;
+                # o endereço continua válido e o circuito não conta falha
+                self.busy_replies += 1
+                self._close_primary()
+                
+                delay = self.busy_backoff * 2 ** (retry - 1) * random.uniform(0.5, 1.5)
+                
+                if retry == self.max_retries or deadline - time.monotonic() <= delay:
+                    return result
+                
+                time.sleep(delay)
 
-                return result
+            except AsyncResultTimeout:
+                self._drop_late_replies(self.conn)
+                self._close_primary()
+                
+                self.breaker.on_failure()
+                
+                return self._deadline_exceeded(outcome_unknown=write)
 
             except Exception as e:
                 print(f"Falha na tentativa {retry}. Erro: {e}")
 
-                # Fecha conexão antiga
+                # Fecha conexão antiga; o servidor caiu ou ficou
+                # inacessível, então seu endereço sai do cache
                 if self.conn:
-                    try:
-                        self.conn.close()
-                    except Exception:
-                        pass
-                    finally:
-                        self.conn = None
+                    self.discovery.invalidate(SERVICE_NAME, self.address)
+                    self._close_primary()
 
                 # Realiza as tentativas de conexão com o servidor
-                if retry < self.max_retries:
+                remaining = deadline - time.monotonic()
+                
+                if retry < self.max_retries and remaining > retry_delay:
                     # Aguarda antes de nova tentativa
-                    time.sleep(self.retry_delay)
+                    time.sleep(retry_delay)
                 else:
                     # Falha definitiva, registra falha
                     self.breaker.on_failure()
@@ -168,21 +402,190 @@ class ClientCore:
                     }
 
 
+    # ==================================================
+    # Roteamento de leituras e escritas
+    # ==================================================
+
+    def _read_call(self, method_name, *args, timeout=None):
+        """
+        Consulta: tenta uma réplica de leitura e, se ela estiver
+        indisponível, defasada além de max_staleness ou se o cliente
+        acabou de comprar, refaz a chamada no servidor principal.
+        """
+        
+        deadline = time.monotonic() + (timeout or self.call_timeout)
+        
+        if self.read_from_replicas and time.monotonic() >= self._primary_reads_until:
+            result = self._replica_call(method_name, *args, deadline=deadline)
+            
+            if result is not None:
+                return result
+        
+        remaining = deadline - time.monotonic()
+        
+        if remaining <= 0:
+            return self._deadline_exceeded()
+        
+        return self._retry_call(method_name, *args, timeout=remaining)
+
+
+    def _replica_call(self, method_name, *args, deadline):
+        """
+        Uma única tentativa na réplica (sem retry nem Circuit Breaker:
+        o principal é o plano B). Retorna None para refazer no principal.
+        """
+        
+        if not self.read_conn:
+            if time.monotonic() < self._replica_retry_at or not self._connect_replica():
+                return None
+        
+        try:
+            remaining = deadline - time.monotonic()
+            
+            if remaining <= 0:
+                return None
+            
+            method = rpyc.async_(getattr(self.read_conn.root, method_name))
+            pending = method(*args, deadline_ms=int(remaining * 1000))
+            pending.set_expiry(remaining)
+            result = decode(pending.value)
+        
+        except Exception as e:
+            if isinstance(e, AsyncResultTimeout):
+                self._drop_late_replies(self.read_conn)
+            else:
+                self.discovery.invalidate(READ_SERVICE_NAME, self.read_address)
+            
+            self._close_replica()
+            self._replica_retry_at = time.monotonic() + REPLICA_RETRY_INTERVAL
+            self.replica_fallbacks += 1
+            return None
+        
+        staleness = result.get("staleness_s")
+        self.last_staleness = staleness
+        
+        if result["status"] != "success" or staleness is None or staleness > self.max_staleness:
+            self.replica_fallbacks += 1
+            return None
+        
+        self.replica_reads += 1
+        return result
+
+
+    def _write_call(self, method_name, *args, timeout=None, idempotency_key=None):
+        """
+        Operação que altera dados: sempre no servidor principal. Após
+        o sucesso, as consultas seguintes também vão ao principal por
+        max_staleness segundos, até as réplicas alcançarem a alteração.
+        
+        idempotency_key, se informada, é enviada como último argumento.
+        Sem ela, as tentativas usam o intervalo maior (unkeyed_retry_delay).
+        Com resultado "unknown", data["idempotency_key"] traz a chave:
+        repetir a operação com ela retorna o resultado original.
+        """
+        
+        if idempotency_key is None:
+            retry_delay = self.unkeyed_retry_delay
+        else:
+            retry_delay = None
+            args = args + (idempotency_key,)
+        
+        result = self._retry_call(
+            method_name, *args, timeout=timeout, retry_delay=retry_delay, write=True
+        )
+        
+        if result.get("status") == "success":
+            self._primary_reads_until = time.monotonic() + self.max_staleness
+        
+        elif result.get("status") == "unknown" and idempotency_key is not None:
+            result["message"] += " Repita com a mesma chave de idempotência para obter o resultado."
+            result["data"] = {"idempotency_key": idempotency_key}
+        
+        return result
+
+
+    def _deadline_exceeded(self, outcome_unknown=False):
+        """
+        Prazo da operação esgotado: contabiliza e retorna erro padrão ou,
+        se uma alteração já foi enviada (outcome_unknown), o status
+        "unknown": o servidor pode ter concluído a operação.
+        """
+        
+        self.deadline_exceeded += 1
+        
+        if outcome_unknown:
+            return {
+                "status": "unknown",
+                "message": "Tempo limite excedido sem confirmação do servidor: a operação pode ter sido concluída.",
+                "data": None
+            }
+        
+        return {
+            "status": "error",
+            "message": "Tempo limite da requisição excedido.",
+            "data": None
+        }
+
+
     # ==================================================
     # Operações Remotas
     # ==================================================            
             
-    def list_movies(self):
-        return self._retry_call("list_movies")
+    # Operações de listagem aceitam paginação opcional: com page_size,
+    # data = {"items": [...], "next_page_token": token ou None}
+    #
+    # Todas aceitam timeout (segundos, padrão CLIENT_CALL_TIMEOUT):
+    # esgotado o prazo, retornam erro e o servidor descarta o pedido.
+    # Em compras, reservas e confirmações já enviadas, o status é
+    # "unknown": o servidor pode ter concluído a operação
+    #
+    # Consultas atendidas por réplica trazem "staleness_s" na resposta
+
+    def list_movies(self, page_size=None, page_token=None, timeout=None):
+        return self._read_call("list_movies", page_size, page_token, timeout=timeout)
     
 
-    def list_screenings_by_movie(self, movie_id):
-        return self._retry_call("list_screenings_by_movie", movie_id)
+    def list_screenings_by_movie(self, movie_id, page_size=None, page_token=None, timeout=None):
+        return self._read_call(
+            "list_screenings_by_movie", movie_id, page_size, page_token, timeout=timeout
+        )
     
 
-    def buy_tickets(self, nome, email, screening_id, quantity):
-        return self._retry_call("buy_tickets", nome, email, screening_id, quantity)
+    def buy_tickets(self, nome, email, screening_id, quantity, idempotency_key=None, timeout=None):
+        # Mesma chave em todas as tentativas: se a resposta de uma compra
+        # confirmada se perder, a nova tentativa recebe o resultado original
+        return self._write_call(
+            "buy_tickets", nome, email, screening_id, quantity,
+            timeout=timeout, idempotency_key=idempotency_key or uuid.uuid4().hex
+        )
+    
+    
+    def buy_tickets_batch(self, nome, email, items, idempotency_key=None, timeout=None):
+        # Tuplas de inteiros são enviadas por valor (sem netrefs)
+        items = tuple((int(screening_id), int(quantity)) for screening_id, quantity in items)
+        return self._write_call(
+            "buy_tickets_batch", nome, email, items,
+            timeout=timeout, idempotency_key=idempotency_key or uuid.uuid4().hex
+        )
+    
+    
+    def hold_tickets(self, screening_id, quantity, timeout=None):
+        return self._write_call("hold_tickets", screening_id, quantity, timeout=timeout)
+    
+    
+    def confirm_hold(self, hold_id, nome, email, timeout=None):
+        return self._write_call("confirm_hold", hold_id, nome, email, timeout=timeout)
+    
+    
+    def release_hold(self, hold_id, timeout=None):
+        return self._write_call("release_hold", hold_id, timeout=timeout)
+    
+    
+    def get_purchases_by_email(self, email, page_size=None, page_token=None, timeout=None):
+        return self._read_call(
+            "get_purchases_by_email", email, page_size, page_token, timeout=timeout
+        )
     
     
-    def get_purchases_by_email(self, email):        
-        return self._retry_call("get_purchases_by_email", email)
+    def get_stats(self, timeout=None):
+        return self._retry_call("stats", timeout=timeout)
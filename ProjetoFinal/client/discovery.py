@@ -0,0 +1,417 @@
+"""
+discovery.py
+
+Cache de descoberta de serviços do cliente.
+
+Sem cache, cada reconexão abre uma conexão com o Name Server só para
+repetir o lookup. Este cache guarda o endereço resolvido e tira o
+Name Server do caminho crítico das reconexões:
+
+- TTL: dentro do prazo, o endereço em cache é usado sem consulta
+- Stale-while-revalidate: vencido o TTL, o endereço antigo continua
+  sendo usado enquanto uma consulta em segundo plano o atualiza; se o
+  Name Server estiver fora do ar, o cliente segue com o endereço conhecido
+- Cache negativo: "serviço não registrado" também é lembrado por
+  pouco tempo, evitando consultas repetidas em sequência
+- Invalidação apenas quando a conexão ao endereço em cache falha
+
+Com o RegistryWatcher, o cliente assina (watch) os serviços no Name
+Server: enquanto a assinatura estiver ativa, as entradas não vencem e
+são atualizadas pelos eventos (instância removida -> troca imediata
+para outra instância ativa), sem consultas periódicas. A troca usa
+power-of-two-choices sobre a carga informada por cada instância, para
+que instâncias lentas ou sobrecarregadas recebam menos clientes.
+Eventos de carga também podem trocar a instância: quando a atual passa
+de rebalance_ratio vezes a carga da menos carregada, a escolha é refeita
+e o ClientCore migra para a nova instância na próxima chamada.
+"""
+
+import random
+import threading
+import time
+
+import rpyc
+
+from core.registry import power_of_two
+
+
+class DiscoveryCache:
+    """
+    Endereços resolvidos por nome de serviço, seguro entre threads.
+    """
+
+    def __init__(self, resolve, ttl=30, negative_ttl=1, rebalance_ratio=2):
+        """
+        resolve:
+            Função resolve(service_name) que consulta o Name Server e
+            retorna (host, port) ou None. Pode lançar exceção (Name
+            Server indisponível).
+
+        ttl:
+            Segundos em que um endereço é usado sem revalidação.
+
+        negative_ttl:
+            Segundos em que um serviço não registrado é lembrado.
+
+        rebalance_ratio:
+            Razão entre a carga da instância atual e a da menos
+            carregada a partir da qual a escolha é refeita.
+        """
+
+        self.resolve = resolve
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.rebalance_ratio = rebalance_ratio
+
+        # service_name -> (endereço ou None, instante da resolução)
+        self._entries = {}
+        self._refreshing = set()
+
+        # service_name -> função que indica se a assinatura segue ativa
+        self._watched = {}
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.lookups = 0
+        self.lookup_errors = 0
+        self.invalidations = 0
+        self.rebalances = 0
+
+
+    def get(self, service_name):
+        """
+        Retorna o endereço do serviço, consultando o Name Server apenas
+        sem entrada utilizável. Lança a exceção de resolve se o Name
+        Server falhar e não houver endereço conhecido.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(service_name)
+
+            if entry:
+                address, resolved_at = entry
+                age = now - resolved_at
+
+                # Assinatura ativa: a entrada é mantida pelos eventos
+                is_active = self._watched.get(service_name)
+
+                if is_active and is_active():
+                    if address is None:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+
+                    return address
+
+                if address is None:
+                    if age < self.negative_ttl:
+                        self.negative_hits += 1
+                        return None
+
+                elif age < self.ttl:
+                    self.hits += 1
+                    return address
+
+                else:
+                    # Vencido: responde com o endereço antigo e revalida em segundo plano
+                    self.stale_hits += 1
+
+                    if service_name not in self._refreshing:
+                        self._refreshing.add(service_name)
+                        threading.Thread(
+                            target=self._refresh,
+                            args=(service_name,),
+                            daemon=True
+                        ).start()
+
+                    return address
+
+        return self._resolve(service_name)
+
+
+    def current(self, service_name):
+        """
+        Endereço em cache para o serviço (ou None), sem consultar o
+        Name Server nem contar acerto.
+        """
+
+        with self._lock:
+            entry = self._entries.get(service_name)
+
+        return entry[0] if entry else None
+
+
+    def _resolve(self, service_name):
+        with self._lock:
+            self.lookups += 1
+
+        try:
+            address = self.resolve(service_name)
+        except Exception:
+            with self._lock:
+                self.lookup_errors += 1
+            raise
+
+        with self._lock:
+            self._entries[service_name] = (address, time.monotonic())
+
+        return address
+
+
+    def _refresh(self, service_name):
+        """
+        Revalidação em segundo plano. Em caso de falha do Name Server
+        ou serviço ausente, mantém o endereço antigo até que uma
+        conexão a ele falhe.
+        """
+
+        try:
+            with self._lock:
+                self.lookups += 1
+
+            address = self.resolve(service_name)
+
+            with self._lock:
+                if address is not None:
+                    self._entries[service_name] = (address, time.monotonic())
+
+        except Exception:
+            with self._lock:
+                self.lookup_errors += 1
+
+        finally:
+            with self._lock:
+                self._refreshing.discard(service_name)
+
+
+    def invalidate(self, service_name, address):
+        """
+        A conexão ao endereço falhou: descarta-o, se ainda for o do cache
+        (outra thread pode já ter resolvido um endereço novo).
+        """
+
+        with self._lock:
+            entry = self._entries.get(service_name)
+
+            if entry and entry[0] == address:
+                del self._entries[service_name]
+                self.invalidations += 1
+
+
+    # ==========================================================
+    # Assinatura (watch)
+    # ==========================================================
+
+    def watch(self, service_name, endpoints, is_active):
+        """
+        Passa a manter a entrada do serviço pelos eventos da assinatura.
+        is_active() indica se a assinatura continua valendo; quando
+        deixar de valer, a entrada volta às regras de TTL.
+        """
+
+        with self._lock:
+            self._watched[service_name] = is_active
+
+        self.set_endpoints(service_name, endpoints)
+
+
+    def unwatch(self, service_name):
+        with self._lock:
+            self._watched.pop(service_name, None)
+
+
+    def set_endpoints(self, service_name, endpoints):
+        """
+        Atualiza a entrada com as instâncias ativas do serviço: mantém
+        o endereço atual se ele continuar ativo e não sobrecarregado;
+        senão, escolhe outro (ou lembra que não há nenhum).
+
+        endpoints pode ser um dict {(host, port): carga}: a escolha
+        compara a carga de duas instâncias sorteadas (sem informe
+        conta como 0).
+        """
+
+        loads = dict(endpoints) if isinstance(endpoints, dict) else dict.fromkeys(endpoints)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(service_name)
+            keep = entry and entry[0] in loads
+
+            if keep and self._overloaded(entry[0], loads):
+                keep = False
+                self.rebalances += 1
+
+            if keep:
+                self._entries[service_name] = (entry[0], now)
+            elif loads:
+                # Ordem embaralhada: empates não favorecem sempre a mesma instância
+                candidates = random.sample(list(loads), len(loads))
+                address = power_of_two(candidates, lambda address: loads[address] or 0)
+                self._entries[service_name] = (address, now)
+            else:
+                self._entries[service_name] = (None, now)
+
+
+    def _overloaded(self, address, loads):
+        """
+        A carga da instância passa de rebalance_ratio vezes a da menos
+        carregada entre as demais (cargas abaixo de 1 contam como 1).
+        """
+
+        others = [load or 0 for other, load in loads.items() if other != address]
+
+        if not others:
+            return False
+
+        return (loads[address] or 0) > self.rebalance_ratio * max(min(others), 1)
+
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "watched": len(self._watched),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "negative_hits": self.negative_hits,
+                "lookups": self.lookups,
+                "lookup_errors": self.lookup_errors,
+                "invalidations": self.invalidations,
+                "rebalances": self.rebalances
+            }
+
+
+class RegistryWatcher:
+    """
+    Assinatura dos serviços no Name Server que mantém, no cache de
+    descoberta, a lista de instâncias ativas de cada serviço.
+    """
+
+    def __init__(self, discovery, host, port, service_names):
+        """
+        discovery:
+            DiscoveryCache atualizado pelos eventos.
+
+        host, port:
+            Endereço do Name Server.
+
+        service_names:
+            Serviços assinados.
+        """
+
+        self.discovery = discovery
+        self.host = host
+        self.port = port
+        self.service_names = tuple(service_names)
+
+        self.conn = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # service_name -> {(host, port): carga}
+        self.endpoints = {}
+
+        # Eventos recebidos antes de a lista inicial do serviço ser
+        # aplicada: service_name -> [(event, address, load), ...]
+        self._buffered = {}
+
+        # Contadores
+        self.events = 0
+
+
+    def start(self):
+        """
+        Conecta ao Name Server e assina os serviços.
+        Lança exceção se o Name Server estiver indisponível.
+        """
+
+        with self._lock:
+            self.endpoints = {}
+            self._buffered = {service_name: [] for service_name in self.service_names}
+
+        self.conn = rpyc.connect(self.host, self.port, config={"allow_pickle": False})
+
+        try:
+            # Thread que atende os callbacks do Name Server
+            self._thread = rpyc.BgServingThread(self.conn)
+
+            for service_name in self.service_names:
+                # Eventos podem chegar antes do retorno de watch(): ficam
+                # guardados e são reaplicados, em ordem, sobre a lista inicial
+                watch_id, instances = self.conn.root.watch(service_name, self._on_event)
+
+                with self._lock:
+                    endpoints = {(host, port): load for host, port, load in instances}
+
+                    for event, address, load in self._buffered.pop(service_name):
+                        self._apply(endpoints, event, address, load)
+
+                    self.endpoints[service_name] = endpoints
+
+                    # Ainda com o lock: um evento seguinte não é sobrescrito
+                    self.discovery.watch(service_name, dict(endpoints), self.is_active)
+
+        except Exception:
+            self.stop()
+            raise
+
+
+    def is_active(self):
+        return self.conn is not None and not self.conn.closed
+
+
+    def _on_event(self, service_name, event, host, port, load):
+        """
+        Callback chamado pelo Name Server a cada mudança do serviço.
+        """
+
+        address = (host, port)
+
+        with self._lock:
+            self.events += 1
+
+            # Lista inicial ainda não aplicada: guardar para depois
+            if service_name in self._buffered:
+                self._buffered[service_name].append((event, address, load))
+                return
+
+            endpoints = self.endpoints.setdefault(service_name, {})
+            self._apply(endpoints, event, address, load)
+            current = dict(endpoints)
+
+        # Eventos de carga também podem trocar a instância sobrecarregada
+        self.discovery.set_endpoints(service_name, current)
+
+
+    @staticmethod
+    def _apply(endpoints, event, address, load):
+        if event == "removed":
+            endpoints.pop(address, None)
+        else:
+            endpoints[address] = load
+
+
+    def stop(self):
+        for service_name in self.service_names:
+            self.discovery.unwatch(service_name)
+
+        thread, self._thread = self._thread, None
+        conn, self.conn = self.conn, None
+
+        if thread:
+            try:
+                thread.stop()
+            except Exception:
+                pass
+
+        if conn:
+            try:
+                conn.close()
+            except Exception:
+                pass
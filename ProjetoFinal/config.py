@@ -15,6 +15,36 @@ import os
 SERVER_HOST = "localhost"
 SERVER_PORT = 18861
 
+# Engine do servidor RPC:
+#   "threaded" -> ThreadedServer do RPyC (uma thread por conexão, sem limite)
+#   "pool"     -> workers fixos com fila de aceitação limitada; conexões
+#                 excedentes recebem a resposta "busy" (servidor ocupado)
+SERVER_ENGINE = "threaded"
+SERVER_WORKERS = 16           # Threads de atendimento no engine "pool"
+SERVER_ACCEPT_QUEUE = 64      # Conexões aguardando worker antes de recusar
+SERVER_QUEUE_TIMEOUT = 5      # Segundos na fila antes de receber "busy" (workers presos a conexões persistentes)
+SERVER_BUSY_REPLY_TIMEOUT = 1 # Segundos dedicados a responder "busy" a cada conexão recusada
+
+# Processos workers compartilhando a mesma porta (contorna o GIL).
+# 1 mantém o servidor em processo único. Sobrescrito por CINEMA_SERVER_PROCESSES.
+SERVER_PROCESSES = 1
+SERVER_PROCESS_START_TIMEOUT = 10   # Segundos aguardando todos os workers subirem
+SERVER_STATS_INTERVAL = 1           # Segundos entre publicações das estatísticas de cada worker
+SERVER_INVALIDATION_LOG_SIZE = 1024 # Invalidações do catálogo retidas entre processos
+
+# Papel do servidor (sobrescrito por CINEMA_SERVER_ROLE):
+#   "primary" -> atende leituras e compras; fonte das réplicas
+#   "replica" -> cópia local do banco, somente consultas (filmes, sessões,
+#                compras por e-mail), atualizada a partir do principal
+SERVER_ROLE = "primary"
+REPLICA_SYNC_INTERVAL = 1     # Segundos entre sincronizações da réplica
+REPLICA_SYNC_BATCH = 1000     # Alterações buscadas por chamada ao principal
+
+# Segredo compartilhado entre o principal e as réplicas (sobrescrito por
+# CINEMA_REPLICATION_SECRET). O log e a cópia completa expõem clientes e
+# compras: sem segredo definido, o principal recusa a replicação.
+REPLICATION_SECRET = None
+
 
 # ===============================
 # Name Server
@@ -23,6 +53,32 @@ SERVER_PORT = 18861
 NAME_SERVER_HOST = "localhost"
 NAME_SERVER_PORT = 18862
 SERVICE_NAME = "cinema_service"
+READ_SERVICE_NAME = "cinema_service_read"   # Réplicas de leitura
+
+# Escolha da instância no lookup quando há vários servidores registrados:
+#   "round_robin"  -> alterna entre as instâncias
+#   "random"       -> escolha aleatória
+#   "least_loaded" -> menor carga informada pelas instâncias
+#   "p2c"          -> sorteia duas instâncias e escolhe a de menor carga
+#   "weighted"     -> sorteio com peso inversamente proporcional à carga
+# A carga vem do relatório enviado a cada heartbeat (requisições em
+# andamento, utilização dos workers e p99 recente)
+NAME_SERVER_LOOKUP_POLICY = "p2c"
+
+# Registros são leases: sem heartbeat dentro do prazo, a instância
+# deixa de ser retornada no lookup e é removida pela varredura
+NAME_SERVER_LEASE_TTL = 6        # Segundos de validade de um registro
+NAME_SERVER_SWEEP_INTERVAL = 1   # Segundos entre varreduras de leases vencidos
+SERVER_HEARTBEAT_INTERVAL = 2    # Segundos entre heartbeats (renovação + carga)
+
+# Assinaturas (watch) das mudanças do registro
+NAME_SERVER_WATCH_QUEUE = 256    # Eventos pendentes por assinante antes de descartá-lo
+NAME_SERVER_WATCH_TIMEOUT = 5    # Segundos aguardando o callback do assinante
+
+# Persistência do registro (journal + snapshot) para reinícios rápidos:
+# instâncias restauradas ficam provisórias até o heartbeat do dono
+NAME_SERVER_COMPACT_EVERY = 500  # Operações no journal antes de um novo snapshot
+NAME_SERVER_RESTORE_GRACE = 6    # Segundos de carência das instâncias restauradas
 
 
 # ===============================
@@ -36,10 +92,169 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 DB_NAME = os.path.join(DATA_DIR, "cinema.db")
 TEST_DB_NAME = os.path.join(DATA_DIR, "cinema_test.db")
 
+# Journal e snapshot do registro do Name Server
+NAME_SERVER_STATE_DIR = os.path.join(DATA_DIR, "name_server")
+TEST_NAME_SERVER_STATE_DIR = os.path.join(DATA_DIR, "name_server_test")
+
+# Pool de conexões (reaproveitadas entre requisições das threads do servidor)
+DB_POOL_SIZE = 8                    # Máximo de conexões abertas simultaneamente
+DB_POOL_TIMEOUT = 5                 # Segundos aguardando conexão livre no pool
+DB_POOL_HEALTHCHECK_INTERVAL = 30   # Segundos ociosos antes de revalidar a conexão
+DB_STATEMENT_CACHE_SIZE = 128       # Cache de prepared statements por conexão
+
+# Perfis de durabilidade aplicados a cada conexão (PRAGMAs do SQLite).
+# WAL permite que leituras (list_movies) não bloqueiem durante compras.
+#   strict   -> fsync a cada commit, máxima segurança
+#   balanced -> fsync apenas em checkpoints do WAL (padrão)
+#   fast     -> sem fsync, para testes e cargas descartáveis
+DB_DURABILITY_PROFILES = {
+    "strict": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 10000,       # ms
+        "cache_size": -8000,         # negativo = KiB
+        "mmap_size": 0,              # bytes
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "busy_timeout": 2000,
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+    },
+}
+
+DB_DURABILITY_PROFILE = "balanced"
+
+
+# ===============================
+# Concorrência
+# ===============================
+
+SCREENING_LOCK_STRIPES = 64   # Faixas de lock por sessão (limite de memória)
+HOT_KEYS_TRACKED = 32         # Sessões disputadas mantidas no ranking de contenção
+BATCH_MAX_ITEMS = 20          # Itens aceitos em uma única compra em lote
+HOLD_TTL = 300                # Segundos que uma reserva temporária (hold) é mantida
+HOLD_REAPER_INTERVAL = 5      # Segundos entre varreduras de holds expirados
+
+
+# ===============================
+# Cliente
+# ===============================
+
+# Prazo padrão (segundos) de cada operação do ClientCore, incluindo
+# as novas tentativas. O orçamento restante é enviado ao servidor.
+CLIENT_CALL_TIMEOUT = 10
+
+# Espera inicial (segundos) após uma resposta "busy" do servidor; dobra
+# a cada tentativa, com variação aleatória. Não conta como falha no
+# Circuit Breaker nem descarta o endereço do cache de descoberta
+CLIENT_BUSY_BACKOFF = 0.5
+
+# Consultas vão às réplicas de leitura quando houver alguma registrada.
+# Resposta mais defasada que CLIENT_MAX_STALENESS (segundos) é refeita
+# no servidor principal, assim como as leituras logo após uma compra
+CLIENT_READ_FROM_REPLICAS = True
+CLIENT_MAX_STALENESS = 5
+REPLICA_RETRY_INTERVAL = 10   # Segundos antes de procurar réplica de novo após falha
+
+# Cache de descoberta: endereços do Name Server reaproveitados nas reconexões.
+# Vencido o TTL, o endereço antigo segue em uso enquanto é revalidado
+# em segundo plano; só é descartado se a conexão a ele falhar
+CLIENT_DISCOVERY_TTL = 30
+CLIENT_DISCOVERY_NEGATIVE_TTL = 1   # Segundos lembrando um serviço não registrado
+
+# Assinar as mudanças do registro no Name Server: o cache de descoberta
+# acompanha as instâncias ativas sem consultas periódicas
+CLIENT_WATCH_REGISTRY = True
+
+# Com a assinatura, a instância em uso é trocada (nova escolha
+# power-of-two-choices) quando sua carga informada passa de
+# CLIENT_REBALANCE_RATIO vezes a da instância menos carregada
+CLIENT_REBALANCE_RATIO = 2
+
+
+# ===============================
+# Idempotência das compras
+# ===============================
+
+IDEMPOTENCY_TTL = 24 * 60 * 60    # Segundos em que uma chave de compra é lembrada
+IDEMPOTENCY_MAX_KEYS = 100000     # Limite de chaves armazenadas (descarta as mais antigas)
+IDEMPOTENCY_PURGE_EVERY = 256     # Compras com chave entre limpezas da tabela
+IDEMPOTENCY_KEY_MAX_LENGTH = 128  # Tamanho máximo da chave enviada pelo cliente
+
+
+# ===============================
+# Paginação
+# ===============================
+
+PAGE_SIZE_MAX = 500           # Maior página aceita pelo servidor
+CLIENT_PAGE_SIZE = 20         # Linhas por página exibidas na CLI e na GUI
+
+
+# ===============================
+# Inventário em memória (write-behind)
+# ===============================
+
+# Quando ativo, as compras são admitidas contra o estoque em memória
+# e persistidas de forma assíncrona (journal + fila ordenada)
+INVENTORY_WRITE_BEHIND = False
+INVENTORY_FLUSH_BATCH = 100       # Máximo de compras persistidas por transação
+INVENTORY_JOURNAL_FSYNC = False   # fsync do journal a cada compra admitida
+INVENTORY_JOURNAL_COMPACT_OPS = 10000  # Operações já persistidas no journal antes de compactá-lo
+
+# Lote que o banco recusa é reenviado com espera exponencial (até
+# INVENTORY_FLUSH_BACKOFF_MAX segundos). Após INVENTORY_FLUSH_MAX_RETRIES
+# falhas seguidas, novas vendas são suspensas até o banco voltar a
+# aceitar a fila (as admitidas seguem seguras no journal)
+INVENTORY_FLUSH_MAX_RETRIES = 5
+INVENTORY_FLUSH_BACKOFF_MAX = 30
+
+
+# ===============================
+# Group commit
+# ===============================
+
+# Compras concorrentes que chegam dentro da janela são confirmadas
+# em uma única transação (menos sincronizações com o disco).
+# Ignorado com INVENTORY_WRITE_BEHIND, cuja fila já grava em lotes.
+GROUP_COMMIT_ENABLED = False
+GROUP_COMMIT_WINDOW_MS = 5        # Espera máxima para formar um lote
+GROUP_COMMIT_MAX_BATCH = 64       # Máximo de compras por transação
+
+
+# ===============================
+# Métricas
+# ===============================
+
+METRICS_WINDOW = 60       # Janela (segundos) da taxa de requisições recente
+METRICS_LOAD_WINDOW = 10  # Janela (segundos) do p99 recente do relatório de carga
+
+
+# ===============================
+# Cache do catálogo
+# ===============================
+
+CATALOG_CACHE_ENABLED = True
+CATALOG_CACHE_TTL = 30            # Segundos até a entrada expirar
+CATALOG_CACHE_MAX_ENTRIES = 256   # Limite de entradas (descarte LRU)
+
 
 # ===============================
 # Logging
 # ===============================
 
 LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
-LOG_LEVEL = "INFO"
\ No newline at end of file
+LOG_LEVEL = "INFO"
+
+# Escrita assíncrona: as threads de requisição só enfileiram os registros
+LOG_QUEUE_SIZE = 10000   # Registros aguardando escrita antes de descartar
+LOG_INFO_RATE = 50       # Mensagens INFO por segundo, por logger (0 desativa o limite)
+LOG_INFO_BURST = 200     # Rajada de mensagens INFO aceita antes de limitar
@@ -0,0 +1,206 @@
+"""
+cache.py
+
+Cache read-through versionado para consultas do catálogo.
+
+O catálogo de filmes quase nunca muda, mas cada listagem executava
+um SELECT completo. Este cache mantém no servidor o resultado de
+list_movies e list_screenings_by_movie:
+
+- Read-through: em caso de miss, a consulta é feita e armazenada
+- TTL: entradas expiram após um tempo configurável
+- LRU com tamanho máximo: as entradas menos usadas são descartadas
+- Versões por chave: uma compra invalida apenas as entradas que
+  contêm a sessão afetada, e uma leitura concorrente com a compra
+  não grava no cache um resultado já desatualizado
+- Estatísticas de hits, misses, expirações e descartes
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CatalogCache:
+    """
+    Cache LRU com TTL, invalidação por tags e controle de versão.
+    """
+
+    def __init__(self, max_entries=256, ttl=30):
+        """
+        max_entries:
+            Número máximo de entradas mantidas em memória.
+
+        ttl:
+            Tempo de vida (em segundos) de cada entrada.
+        """
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # chave -> (valor, expira_em, tags)
+        self._entries = OrderedDict()
+
+        # tag -> chaves que dependem dela (ex.: ("screening", 3))
+        self._tags = {}
+
+        # Versão global e versão da última invalidação de cada chave/tag
+        # (limitadas ao tamanho do catálogo: filmes e sessões)
+        self._version = 0
+        self._key_versions = {}
+        self._tag_versions = {}
+        self._cleared_version = 0
+
+        self._lock = threading.Lock()
+
+        # Estatísticas
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+
+    # ==========================================================
+    # Leitura
+    # ==========================================================
+
+    def get_or_load(self, key, loader, tags_of=None):
+        """
+        Retorna o valor em cache ou executa loader() e armazena o resultado.
+
+        tags_of:
+            Função opcional que recebe o valor carregado e retorna as
+            tags das quais ele depende, usadas na invalidação.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                value, expires_at, _ = entry
+
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+
+                self._remove(key)
+                self._expirations += 1
+
+            self._misses += 1
+            version = self._version
+
+        # Consulta executada fora do lock para não serializar leituras
+        value = loader()
+        tags = tuple(tags_of(value)) if tags_of else ()
+
+        with self._lock:
+            # Invalidação concorrente: não armazenar resultado possivelmente velho
+            if self._cleared_version > version or self._key_versions.get(key, 0) > version:
+                return value
+
+            if any(self._tag_versions.get(tag, 0) > version for tag in tags):
+                return value
+
+            self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+        return value
+
+
+    # ==========================================================
+    # Invalidação
+    # ==========================================================
+
+    def invalidate_tag(self, tag):
+        """
+        Invalida apenas as entradas que dependem da tag informada.
+        """
+
+        with self._lock:
+            self._version += 1
+            self._tag_versions[tag] = self._version
+
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self._invalidations += 1
+
+
+    def invalidate(self, key):
+        """
+        Invalida uma entrada específica.
+        """
+
+        with self._lock:
+            self._version += 1
+            self._key_versions[key] = self._version
+
+            if key in self._entries:
+                self._remove(key)
+                self._invalidations += 1
+
+
+    def clear(self):
+        """
+        Remove todas as entradas.
+        """
+
+        with self._lock:
+            self._version += 1
+            self._cleared_version = self._version
+
+            for key in list(self._entries):
+                self._remove(key)
+
+
+    def _remove(self, key):
+        """
+        Remove a entrada e suas referências nas tags (chamar com lock).
+        """
+
+        entry = self._entries.pop(key, None)
+
+        if entry is None:
+            return
+
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+    # ==========================================================
+    # Estatísticas
+    # ==========================================================
+
+    def stats(self):
+        """
+        Retorna estatísticas de uso do cache.
+        """
+
+        with self._lock:
+            lookups = self._hits + self._misses
+
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "expirations": self._expirations,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
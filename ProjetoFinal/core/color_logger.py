@@ -1,4 +1,32 @@
+"""
+color_logger.py
+
+Logging colorido e assíncrono do sistema.
+
+As threads que atendem requisições apenas enfileiram os registros
+(sem bloquear); uma única thread de escrita os formata e grava no
+console. Um terminal lento ou um pipe redirecionado atrasa somente
+a thread de escrita, nunca uma chamada RPC.
+
+- Fila limitada: se a escrita não acompanhar, registros são
+  descartados e contabilizados, em vez de bloquear o chamador
+- Limite de taxa por logger para mensagens INFO/DEBUG de alto
+  volume; WARNING e acima sempre passam
+- setup_logger é idempotente: chamadas repetidas não duplicam handlers
+"""
+
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from config import (
+    LOG_FORMAT, LOG_LEVEL,
+    LOG_QUEUE_SIZE, LOG_INFO_RATE, LOG_INFO_BURST
+)
 
 
 class ColorFormatter(logging.Formatter):
@@ -23,21 +51,202 @@ class ColorFormatter(logging.Formatter):
         return f"{color}{message}{self.RESET}"
 
 
+# ==========================================================
+# Limite de taxa por logger
+# ==========================================================
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket para registros INFO e abaixo: até burst mensagens
+    de uma vez, repostas a rate mensagens por segundo.
+    Os registros suprimidos são contabilizados.
+    """
+
+    def __init__(self, rate, burst):
+        super().__init__()
+
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.suppressed = 0
+
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rate:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+
+            self.suppressed += 1
+            return False
+
+
+# ==========================================================
+# Fila e thread de escrita
+# ==========================================================
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enfileira o registro sem bloquear; com a fila cheia, descarta-o.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AsyncLogPipeline:
+    """
+    Fila limitada de registros consumida por uma thread de escrita.
+    """
+
+    def __init__(self, queue_size=10000, handler=None):
+        """
+        queue_size:
+            Registros aguardando escrita antes de começar a descartar.
+
+        handler:
+            Handler final executado na thread de escrita
+            (padrão: console colorido).
+        """
+
+        if handler is None:
+            handler = logging.StreamHandler()
+            handler.setFormatter(ColorFormatter(LOG_FORMAT))
+
+        self.queue_size = queue_size
+        self.target = handler
+        self.handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+
+        self._writer = None
+        self._lock = threading.Lock()
+
+        self.written = 0
+
+
+    def start(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run,
+                    name="LogWriter",
+                    daemon=True
+                )
+                self._writer.start()
+
+
+    def stop(self):
+        """
+        Grava os registros pendentes e encerra a thread de escrita.
+        """
+
+        with self._lock:
+            writer, self._writer = self._writer, None
+
+        if writer:
+            self.handler.queue.put(None)
+            writer.join()
+
+
+    def _run(self):
+        log_queue = self.handler.queue
+
+        while True:
+            record = log_queue.get()
+
+            if record is None:
+                return
+
+            try:
+                self.target.handle(record)
+                self.written += 1
+            except Exception:
+                self.target.handleError(record)
+
+
+    def reset_after_fork(self):
+        """
+        No processo filho, a thread de escrita não existe e a fila
+        pode ter ficado com o lock preso: recria ambas.
+        """
+
+        self.handler.queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._writer = None
+        self.start()
+
+
+    def stats(self):
+        return {
+            "queue_size": self.queue_size,
+            "queue_depth": self.handler.queue.qsize(),
+            "written": self.written,
+            "dropped": self.handler.dropped
+        }
+
+
+# Pipeline compartilhado por todos os loggers do processo
+_pipeline = AsyncLogPipeline(LOG_QUEUE_SIZE)
+
+# Filtros de taxa por logger (para as estatísticas)
+_rate_limits = {}
+
+atexit.register(_pipeline.stop)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_pipeline.reset_after_fork)
+
+
 def setup_logger(name: str):
     """
-    Configura um logger com formatação colorida.
+    Configura um logger com formatação colorida e escrita assíncrona.
+    Chamadas repetidas com o mesmo nome retornam o logger já configurado.
     """
     
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)  # Loga todos os níveis
     
-    # Criar console handler com formatação colorida
-    console_handler = logging.StreamHandler()
-    formatter = ColorFormatter(
-        "%(asctime)s - %(levelname)s - %(message)s"
-    )
+    if _pipeline.handler in logger.handlers:
+        return logger
+    
+    logger.setLevel(LOG_LEVEL)
     
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    rate_limit = RateLimitFilter(LOG_INFO_RATE, LOG_INFO_BURST)
+    logger.addFilter(rate_limit)
+    _rate_limits[name] = rate_limit
     
-    return logger
\ No newline at end of file
+    logger.addHandler(_pipeline.handler)
+    _pipeline.start()
+    
+    return logger
+
+
+def logging_stats():
+    """
+    Retorna contadores da fila de logging: registros gravados,
+    descartados (fila cheia) e suprimidos pelo limite de taxa.
+    """
+
+    stats = _pipeline.stats()
+    stats["suppressed"] = {
+        name: rate_limit.suppressed for name, rate_limit in _rate_limits.items()
+    }
+
+    return stats
@@ -14,32 +14,340 @@ Esta é a Camada de Persistência na arquitetura N-Camadas.
 Ela NÃO contém lógica de negócio distribuída (isso pertence ao server).
 """
 
+import itertools
+import json
 import os
 import sqlite3
-from config import DB_NAME
+import threading
+import time
+from contextlib import contextmanager
+from config import (
+    DB_NAME, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+    DB_POOL_HEALTHCHECK_INTERVAL, DB_STATEMENT_CACHE_SIZE,
+    DB_DURABILITY_PROFILES, DB_DURABILITY_PROFILE,
+    IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_PURGE_EVERY
+)
 
 
 DB_PATH = os.getenv("CINEMA_DB", DB_NAME)
+DB_PROFILE = os.getenv("CINEMA_DB_PROFILE", DB_DURABILITY_PROFILE)
 
 
 # ======================================================
 # Conexão com o banco
 # ======================================================
 
-def connect(db_path=DB_PATH):
+def get_profile(name=DB_PROFILE):
+    """
+    Retorna as configurações do perfil de durabilidade informado.
+    """
+
+    if name not in DB_DURABILITY_PROFILES:
+        raise ValueError(f"Perfil de durabilidade desconhecido: {name}")
+
+    return DB_DURABILITY_PROFILES[name]
+
+
+def describe_profile(name=DB_PROFILE):
+    """
+    Descreve o perfil de durabilidade em uma linha, para logs de inicialização.
+    """
+
+    settings = ", ".join(f"{key}={value}" for key, value in get_profile(name).items())
+    return f"perfil '{name}' ({settings})"
+
+
+def connect(db_path=DB_PATH, profile=DB_PROFILE):
 	"""
-    Cria conexão com SQLite e ativa suporte a
-    chaves estrangeiras (Foreign Keys).
+    Cria conexão com SQLite, ativa suporte a
+    chaves estrangeiras (Foreign Keys) e aplica
+    o perfil de durabilidade configurado.
     """
 
+	settings = get_profile(profile)
+
 	conn = sqlite3.connect(
         db_path,
-		check_same_thread=False  # Importante para ThreadedServer
+		check_same_thread=False,  # Importante para ThreadedServer
+		cached_statements=DB_STATEMENT_CACHE_SIZE  # Prepared statements reaproveitados
     )
 	conn.execute("PRAGMA foreign_keys = ON")  # Habilitar chaves estrangeiras
+
+	# Aplicar perfil de durabilidade (valores vindos do config, não do usuário)
+	conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+	conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+	conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+	conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+	conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
 	return conn
 
 
+# ======================================================
+# Pool de Conexões
+# ======================================================
+
+class ConnectionPool:
+    """
+    Pool de conexões SQLite compartilhado pelas threads do servidor.
+
+    Evita abrir o arquivo do banco e reconfigurar PRAGMAs a cada
+    requisição. As conexões permanecem abertas ("quentes"), mantendo
+    o cache de prepared statements do sqlite3.
+
+    - Tamanho máximo configurável (conexões criadas sob demanda)
+    - Afinidade por thread: a thread recebe preferencialmente a
+      última conexão que utilizou
+    - Health check de conexões ociosas há muito tempo
+    - Encerramento limpo de todas as conexões
+    """
+
+    def __init__(self, db_path=DB_PATH, size=DB_POOL_SIZE,
+                 timeout=DB_POOL_TIMEOUT,
+                 healthcheck_interval=DB_POOL_HEALTHCHECK_INTERVAL):
+
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+
+        # Conexões livres e instante em que foram devolvidas ao pool
+        self._idle = []
+        self._last_used = {}
+
+        # Total de conexões abertas (livres + em uso)
+        self._created = 0
+        self._closed = False
+
+        self._cond = threading.Condition()
+
+        # Estado por thread: conexão preferida e conexão em uso
+        self._local = threading.local()
+
+
+    # --------------------------------------------------
+    # Retirada e devolução de conexões
+    # --------------------------------------------------
+
+    def _checkout(self):
+        """
+        Retira uma conexão do pool, priorizando a conexão
+        usada anteriormente pela thread atual.
+        """
+
+        deadline = time.monotonic() + self.timeout
+        preferred = getattr(self._local, "preferred", None)
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Pool de conexões encerrado.")
+
+                if self._idle:
+                    if preferred is not None and preferred in self._idle:
+                        self._idle.remove(preferred)
+                        conn = preferred
+                    else:
+                        conn = self._idle.pop()  # LIFO: conexão mais recente
+                    last_used = self._last_used.pop(conn, None)
+                    break
+
+                if self._created < self.size:
+                    # Reserva a vaga antes de abrir a conexão fora do lock
+                    self._created += 1
+                    conn = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Tempo esgotado aguardando conexão do pool.")
+
+                self._cond.wait(remaining)
+
+        if conn is None:
+            return self._open()
+
+        if self._needs_healthcheck(last_used) and not self._is_healthy(conn):
+            self._discard(conn)
+            with self._cond:
+                self._created += 1
+            return self._open()
+
+        return conn
+
+
+    def _release(self, conn):
+        """
+        Devolve a conexão ao pool ou a fecha caso o pool
+        já tenha sido encerrado.
+        """
+
+        with self._cond:
+            if self._closed:
+                self._created -= 1
+                conn.close()
+                return
+
+            self._idle.append(conn)
+            self._last_used[conn] = time.monotonic()
+            self._cond.notify()
+
+
+    def _open(self):
+        """
+        Abre uma nova conexão. Em caso de falha, libera a vaga reservada.
+        """
+
+        try:
+            return connect(self.db_path)
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+
+    def _discard(self, conn):
+        """
+        Remove definitivamente uma conexão inválida do pool.
+        """
+
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+    # --------------------------------------------------
+    # Health check
+    # --------------------------------------------------
+
+    def _needs_healthcheck(self, last_used):
+        if last_used is None:
+            return False
+        return time.monotonic() - last_used >= self.healthcheck_interval
+
+
+    def _is_healthy(self, conn):
+        """
+        Executa uma consulta trivial para validar a conexão.
+        """
+
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+
+    # --------------------------------------------------
+    # API pública
+    # --------------------------------------------------
+
+    @contextmanager
+    def connection(self):
+        """
+        Fornece uma conexão do pool dentro de uma transação.
+
+        Commit ao sair do bloco sem erros e rollback em caso de
+        exceção. Chamadas aninhadas na mesma thread reutilizam a
+        conexão (e a transação) já em uso.
+        """
+
+        active = getattr(self._local, "active", None)
+
+        if active is not None:
+            yield active
+            return
+
+        conn = self._checkout()
+        self._local.active = conn
+        self._local.preferred = conn
+
+        try:
+            with conn:  # Commit/rollback automático
+                yield conn
+        finally:
+            self._local.active = None
+            self._release(conn)
+
+
+    def close(self):
+        """
+        Encerra o pool, fechando as conexões livres.
+        Conexões em uso são fechadas quando devolvidas.
+        """
+
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._last_used.clear()
+            self._created -= len(idle)
+            self._cond.notify_all()
+
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+    def stats(self):
+        """
+        Retorna contadores de ocupação do pool.
+        """
+
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": len(self._idle),
+                "in_use": self._created - len(self._idle)
+            }
+
+
+# Pool global do processo, criado sob demanda
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Retorna o pool de conexões do processo, criando-o na primeira chamada.
+    """
+
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def get_connection():
+    """
+    Atalho para obter uma conexão transacional do pool global.
+    """
+
+    return get_pool().connection()
+
+
+def close_pool():
+    """
+    Encerra o pool global (utilizado no desligamento do servidor).
+    """
+
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
 # ======================================================
 # Inicialização do Banco
 # ======================================================
@@ -47,14 +355,18 @@ def connect(db_path=DB_PATH):
 def start_db():
 	"""
 	Criar todas as tabelas do sistema,
-	caso não tenham sido criadas
+	caso não tenham sido criadas, e aplicar migrações pendentes.
+	Retorna a versão de schema resultante.
 	"""
 
-	with connect() as conn:
+	with get_connection() as conn:
 		cursor = conn.cursor()
 		create_tables(cursor)
+		version = migrate(cursor)  # Atualiza bancos existentes para a versão atual
 		insert_initial_data(cursor)
 
+	return version
+
 
 # ======================================================
 # Criar Tabelas dos Bancos de Dados
@@ -107,6 +419,202 @@ def create_tables(cursor):
 	""")
 
 
+# ======================================================
+# Migrações de Schema
+# ======================================================
+
+# Tabelas copiadas para as réplicas de leitura (em ordem de dependência)
+REPLICATED_TABLES = ("movies", "screenings", "clients", "purchases")
+
+
+# Operações registradas no log de replicação e a linha (nova ou antiga) usada
+REPLICATED_OPERATIONS = (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+
+
+def _replication_triggers():
+    """
+    Triggers que registram no log de replicação cada linha alterada
+    das tabelas replicadas (a réplica busca depois a linha atual).
+    """
+
+    statements = []
+
+    for table in REPLICATED_TABLES:
+        for operation, row in REPLICATED_OPERATIONS:
+            statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_replication_{table}_{operation.lower()}
+            AFTER {operation} ON {table}
+            BEGIN
+                INSERT INTO replication_log (table_name, row_id) VALUES ('{table}', {row}.id);
+            END
+            """)
+
+    return statements
+
+
+def _drop_replication_triggers():
+    return [
+        f"DROP TRIGGER IF EXISTS trg_replication_{table}_{operation.lower()}"
+        for table in REPLICATED_TABLES
+        for operation, _ in REPLICATED_OPERATIONS
+    ]
+
+
+# Migrações versionadas, aplicadas em ordem uma única vez.
+# Nunca altere uma migração já publicada: adicione uma nova versão.
+MIGRATIONS = [
+    (
+        1,
+        "Índices de cobertura para sessões por filme e compras por cliente",
+        [
+            # list_screenings_by_movie: WHERE movie_id = ? ORDER BY time
+            """
+            CREATE INDEX IF NOT EXISTS idx_screenings_movie_time
+            ON screenings (movie_id, time, total_tickets, available_tickets)
+            """,
+            # get_purchases_by_email: WHERE client_id = ? ORDER BY timestamp
+            # (a busca de clientes por e-mail já é coberta pelo índice UNIQUE)
+            """
+            CREATE INDEX IF NOT EXISTS idx_purchases_client_timestamp
+            ON purchases (client_id, timestamp, screening_id, quantity)
+            """,
+        ],
+    ),
+    (
+        2,
+        "Checkpoint da persistência write-behind do inventário",
+        [
+            # Última operação do journal do inventário aplicada ao banco
+            """
+            CREATE TABLE IF NOT EXISTS inventory_checkpoint (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                seq INTEGER NOT NULL
+            )
+            """,
+            "INSERT OR IGNORE INTO inventory_checkpoint (id, seq) VALUES (1, 0)",
+        ],
+    ),
+    (
+        3,
+        "Reservas temporárias de ingressos (holds) com expiração",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS holds (
+                id TEXT PRIMARY KEY,
+                screening_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                FOREIGN KEY(screening_id) REFERENCES screenings(id) ON DELETE CASCADE
+            )
+            """,
+            # Varredura de holds expirados pelo reaper
+            "CREATE INDEX IF NOT EXISTS idx_holds_expires_at ON holds (expires_at)",
+        ],
+    ),
+    (
+        4,
+        "Chaves de idempotência das compras",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                response TEXT,
+                created_at REAL NOT NULL
+            )
+            """,
+            # Expiração e limite de tamanho removem as chaves mais antigas
+            "CREATE INDEX IF NOT EXISTS idx_idempotency_created_at ON idempotency_keys (created_at)",
+        ],
+    ),
+    (
+        5,
+        "Log de alterações para as réplicas de leitura",
+        [
+            # AUTOINCREMENT: a sequência nunca é reutilizada, mesmo após a limpeza
+            """
+            CREATE TABLE IF NOT EXISTS replication_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL
+            )
+            """,
+            *_replication_triggers(),
+            # Retém as 100.000 alterações mais recentes; réplicas mais
+            # atrasadas que isso recebem uma cópia completa
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_replication_log_prune
+            AFTER INSERT ON replication_log
+            WHEN NEW.seq % 1000 = 0
+            BEGIN
+                DELETE FROM replication_log WHERE seq <= NEW.seq - 100000;
+            END
+            """,
+            # Posição do log do servidor principal já aplicada pela réplica
+            """
+            CREATE TABLE IF NOT EXISTS replication_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                seq INTEGER NOT NULL,
+                synced_at REAL NOT NULL
+            )
+            """,
+            "INSERT OR IGNORE INTO replication_state (id, seq, synced_at) VALUES (1, 0, 0)",
+        ],
+    ),
+    (
+        6,
+        "Log de replicação ativado apenas quando uma réplica pede a cópia completa",
+        [
+            # Sem réplicas, cada compra gravaria 2 a 3 linhas extras no log
+            # dentro da transação; as triggers são recriadas sob demanda
+            # (replication_snapshot_page) e ficam ativas a partir daí
+            *_drop_replication_triggers(),
+            "DELETE FROM replication_log",
+        ],
+    ),
+]
+
+
+def get_schema_version(cursor):
+    """
+    Retorna a versão de schema registrada no banco (0 se nenhuma).
+    """
+
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return cursor.fetchone()[0]
+
+
+def migrate(cursor):
+    """
+    Aplica as migrações pendentes e registra cada versão aplicada.
+    Permite atualizar bancos (cinema.db) já existentes sem recriá-los.
+    """
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    current = get_schema_version(cursor)
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+
+        for statement in statements:
+            cursor.execute(statement)
+
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+            (version, description)
+        )
+
+    return get_schema_version(cursor)
+
+
 # ======================================================
 # Inserir Dados Iniciais
 # ======================================================
@@ -183,7 +691,7 @@ def list_movies():
     Listar todos os filmes disponíveis no banco de dados.
     """
     
-    with connect() as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, title, genre, length 
@@ -198,7 +706,7 @@ def list_screenings_by_movie(movie_id):
     Listar todas as sessões disponíveis para um filme específico.
     """
     
-    with connect() as conn:    
+    with get_connection() as conn:    
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, time, total_tickets, available_tickets 
@@ -229,63 +737,900 @@ def find_client(name, email, cursor):
 # Compra de Ingressos
 # ======================================================
 
-def buy_tickets(name, email, screening_id, quantity):
+def buy_tickets(name, email, screening_id, quantity, idempotency_key=None):
 	"""
 	Realizar a compra de ingressos para uma sessão específica, 
     garantindo que haja ingressos disponíveis e atualizando o estoque.
+
+	Com idempotency_key, uma nova tentativa com a mesma chave
+	retorna o resultado original sem repetir a compra.
 	"""
 
-	with connect() as conn:
-		cursor = conn.cursor()
+	with get_connection() as conn:
+		# Commit automático ao sair do bloco with
+		return purchase_once(conn.cursor(), idempotency_key, name, email, screening_id, quantity)
 
-		cursor.execute("""
-			SELECT available_tickets
-			FROM screenings
-			WHERE id=?
-		""", (screening_id,))
 
-		# Verificar se a sessão existe e obter a quantidade de ingressos disponíveis
-		result = cursor.fetchone()
+def purchase(cursor, name, email, screening_id, quantity):
+	"""
+	Executar uma compra com o cursor de uma transação já aberta.
+	Compartilhado pela compra individual e pelo group commit.
+	"""
+
+	# Decremento atômico condicional: a própria cláusula WHERE
+	# impede a venda acima do estoque, sem leitura prévia
+	cursor.execute("""
+		UPDATE screenings
+		SET available_tickets = available_tickets - ?
+		WHERE id = ? AND available_tickets >= ?
+	""", (quantity, screening_id, quantity))
+
+	if cursor.rowcount == 0:
+		# Nenhuma linha alterada: sessão inexistente ou estoque insuficiente
+		cursor.execute("SELECT 1 FROM screenings WHERE id=?", (screening_id,))
 
-		if not result:
+		if not cursor.fetchone():
 			return {
 				"status": "error",
 				"message": "Sessão não encontrada.",
 				"data": None
 			}
 
-		# Verificar se há ingressos suficientes disponíveis
-		current = result[0]
+		return {
+			"status": "error",
+			"message": "Quantidade de ingressos insuficiente.",
+			"data": None
+		}
 
-		if current < quantity:
-			return {
-				"status": "error",
-				"message": "Quantidade de ingressos insuficiente.",
-				"data": None
-			}
+	# Estoque resultante, lido dentro da mesma transação de escrita
+	cursor.execute("""
+		SELECT available_tickets
+		FROM screenings
+		WHERE id=?
+	""", (screening_id,))
+	total = cursor.fetchone()[0]
 
-		# Buscar ou criar cliente
-		client_id = find_client(name, email, cursor)
+	# Buscar ou criar cliente
+	client_id = find_client(name, email, cursor)
 
-		total = current - quantity
+	cursor.execute("""
+		INSERT INTO purchases (client_id, screening_id, quantity)
+		VALUES (?, ?, ?)
+	""", (client_id, screening_id, quantity))
 
-		cursor.execute("""
-			UPDATE screenings
-			SET available_tickets=?
-			WHERE id=?
-		""", (total, screening_id))
+	return {
+		"status": "success",
+		"message": "Compra realizada com sucesso.",
+		"data": {"available_tickets": total}
+	}
 
-		cursor.execute("""
-			INSERT INTO purchases (client_id, screening_id, quantity)
-			VALUES (?, ?, ?)
-		""", (client_id, screening_id, quantity))
 
-		# Commit automático ao sair do bloco with
-		return {
-			"status": "success",
-			"message": "Compra realizada com sucesso.",
-			"data": {"available_tickets": total}
-		}
+def buy_tickets_group(purchases):
+    """
+    Aplicar várias compras independentes (name, email, screening_id,
+    quantity, idempotency_key) em uma única transação, com um único commit (group commit).
+
+    Cada compra é isolada por um SAVEPOINT: uma falha inesperada em
+    uma compra desfaz apenas ela. Retorna um resultado por compra,
+    na mesma ordem recebida.
+    """
+
+    results = []
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Transação explícita envolvendo os savepoints: sem ela, o
+        # RELEASE do savepoint mais externo confirmaria cada compra
+        cursor.execute("BEGIN IMMEDIATE")
+
+        for name, email, screening_id, quantity, idempotency_key in purchases:
+            cursor.execute("SAVEPOINT group_item")
+
+            try:
+                results.append(
+                    purchase_once(cursor, idempotency_key, name, email, screening_id, quantity)
+                )
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK TO group_item")
+                results.append({
+                    "status": "error",
+                    "message": "Erro interno ao realizar compra.",
+                    "data": None
+                })
+            finally:
+                cursor.execute("RELEASE group_item")
+
+    # Commit único ao sair do bloco with
+    return results
+
+
+# ======================================================
+# Idempotência das Compras
+# ======================================================
+
+# Inserções de chaves desde o início (dispara a limpeza periódica)
+_idempotency_inserts = itertools.count(1)
+
+
+def idempotency_fingerprint(name, email, screening_id, quantity):
+    """
+    Identifica a compra associada a uma chave: a mesma chave
+    reenviada com outros dados é recusada.
+    """
+
+    return json.dumps([name, email, screening_id, quantity])
+
+
+def batch_fingerprint(name, email, items):
+    """
+    Identifica a compra em lote associada a uma chave.
+    """
+
+    return json.dumps([name, email, [[screening_id, quantity] for screening_id, quantity in items]])
+
+
+def idempotency_conflict():
+    return {
+        "status": "error",
+        "message": "Chave de idempotência já utilizada em outra compra.",
+        "data": None
+    }
+
+
+def purchase_once(cursor, idempotency_key, name, email, screening_id, quantity):
+    """
+    Executa purchase() no máximo uma vez por chave de idempotência.
+
+    A chave é gravada na mesma transação da compra: se a resposta se
+    perder e o cliente repetir o pedido, a compra já confirmada é
+    encontrada e seu resultado original é retornado, sem tocar no
+    estoque. Sem chave, equivale a purchase().
+    """
+
+    if idempotency_key is None:
+        return purchase(cursor, name, email, screening_id, quantity)
+
+    now = time.time()
+    fingerprint = idempotency_fingerprint(name, email, screening_id, quantity)
+
+    stored = claim_idempotency_key(cursor, idempotency_key, fingerprint, now)
+
+    if stored is not None:
+        return stored
+
+    result = purchase(cursor, name, email, screening_id, quantity)
+
+    cursor.execute(
+        "UPDATE idempotency_keys SET response = ? WHERE key = ?",
+        (json.dumps(result), idempotency_key)
+    )
+
+    return result
+
+
+def claim_idempotency_key(cursor, idempotency_key, fingerprint, now):
+    """
+    Reserva a chave na transação atual. Retorna None se ela for nova
+    (a operação deve ser executada), o resultado original se já foi
+    usada com os mesmos dados, ou o erro de conflito.
+    """
+
+    # A primeira instrução já é uma escrita: pedidos simultâneos com
+    # a mesma chave aguardam o commit do primeiro e encontram a chave
+    cursor.execute(
+        "DELETE FROM idempotency_keys WHERE key = ? AND created_at < ?",
+        (idempotency_key, now - IDEMPOTENCY_TTL)
+    )
+    cursor.execute("""
+        INSERT OR IGNORE INTO idempotency_keys (key, fingerprint, response, created_at)
+        VALUES (?, ?, NULL, ?)
+    """, (idempotency_key, fingerprint, now))
+
+    if cursor.rowcount == 0:
+        cursor.execute(
+            "SELECT fingerprint, response FROM idempotency_keys WHERE key = ?",
+            (idempotency_key,)
+        )
+        stored_fingerprint, stored_response = cursor.fetchone()
+
+        if stored_fingerprint != fingerprint:
+            return idempotency_conflict()
+
+        return json.loads(stored_response)
+
+    if next(_idempotency_inserts) % IDEMPOTENCY_PURGE_EVERY == 0:
+        purge_idempotency_keys(cursor, now)
+
+    return None
+
+
+def purge_idempotency_keys(cursor, now):
+    """
+    Remove chaves expiradas e, acima do limite, as mais antigas.
+    """
+
+    cursor.execute(
+        "DELETE FROM idempotency_keys WHERE created_at < ?",
+        (now - IDEMPOTENCY_TTL,)
+    )
+    cursor.execute("""
+        DELETE FROM idempotency_keys
+        WHERE key IN (
+            SELECT key FROM idempotency_keys
+            ORDER BY created_at DESC
+            LIMIT -1 OFFSET ?
+        )
+    """, (IDEMPOTENCY_MAX_KEYS,))
+
+
+def store_idempotency_key(cursor, idempotency_key, fingerprint, result, created_at):
+    """
+    Registra a chave de uma compra admitida fora do banco (inventário).
+    """
+
+    cursor.execute("""
+        INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, response, created_at)
+        VALUES (?, ?, ?, ?)
+    """, (idempotency_key, fingerprint, json.dumps(result), created_at))
+
+
+def load_idempotency_keys(since):
+    """
+    Chaves registradas a partir de since, da mais antiga para a mais nova:
+    lista de (key, fingerprint, response, created_at).
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT key, fingerprint, response, created_at
+            FROM idempotency_keys
+            WHERE created_at >= ? AND response IS NOT NULL
+            ORDER BY created_at
+        """, (since,))
+
+        return [
+            (key, fingerprint, json.loads(response), created_at)
+            for key, fingerprint, response, created_at in cursor.fetchall()
+        ]
+
+
+def buy_tickets_batch(name, email, items, idempotency_key=None):
+    """
+    Realizar a compra de vários itens (screening_id, quantity) em uma
+    única transação: ou todos são confirmados, ou nenhum.
+
+    Com idempotency_key, uma nova tentativa com a mesma chave
+    retorna o resultado original sem repetir a compra.
+
+    Retorna dict padronizado com o resultado de cada item em data["items"].
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        if idempotency_key is None:
+            return purchase_batch(conn, cursor, name, email, items)
+
+        now = time.time()
+        fingerprint = batch_fingerprint(name, email, items)
+
+        stored = claim_idempotency_key(cursor, idempotency_key, fingerprint, now)
+
+        if stored is not None:
+            return stored
+
+        result = purchase_batch(conn, cursor, name, email, items)
+
+        # Lote recusado desfaz a transação (inclusive a reserva da chave):
+        # a chave é gravada de novo com o resultado
+        store_idempotency_key(cursor, idempotency_key, fingerprint, result, now)
+
+        return result
+
+
+def purchase_batch(conn, cursor, name, email, items):
+    """
+    Compra em lote com o cursor de uma transação já aberta.
+    """
+
+    results = []
+    failed = False
+
+    for screening_id, quantity in items:
+        cursor.execute("""
+            UPDATE screenings
+            SET available_tickets = available_tickets - ?
+            WHERE id = ? AND available_tickets >= ?
+        """, (quantity, screening_id, quantity))
+
+        if cursor.rowcount == 0:
+            failed = True
+            cursor.execute("SELECT 1 FROM screenings WHERE id=?", (screening_id,))
+
+            if not cursor.fetchone():
+                message = "Sessão não encontrada."
+            else:
+                message = "Quantidade de ingressos insuficiente."
+
+            results.append({
+                "screening_id": screening_id,
+                "quantity": quantity,
+                "status": "error",
+                "message": message,
+                "available_tickets": None
+            })
+            continue
+
+        cursor.execute(
+            "SELECT available_tickets FROM screenings WHERE id=?",
+            (screening_id,)
+        )
+
+        results.append({
+            "screening_id": screening_id,
+            "quantity": quantity,
+            "status": "success",
+            "message": "Item reservado.",
+            "available_tickets": cursor.fetchone()[0]
+        })
+
+    if failed:
+        # Desfaz os itens já decrementados: tudo ou nada
+        conn.rollback()
+
+        for item in results:
+            if item["status"] == "success":
+                item["message"] = "Item cancelado: outro item do lote falhou."
+                item["status"] = "cancelled"
+                item["available_tickets"] = None
+
+        return {
+            "status": "error",
+            "message": "Compra em lote não realizada.",
+            "data": {"items": results}
+        }
+
+    client_id = find_client(name, email, cursor)
+
+    cursor.executemany("""
+        INSERT INTO purchases (client_id, screening_id, quantity)
+        VALUES (?, ?, ?)
+    """, [(client_id, screening_id, quantity) for screening_id, quantity in items])
+
+    for item in results:
+        item["message"] = "Compra realizada com sucesso."
+
+    # Commit pelo chamador, ao sair do bloco with
+    return {
+        "status": "success",
+        "message": "Compra em lote realizada com sucesso.",
+        "data": {"items": results}
+    }
+
+
+# ======================================================
+# Reservas Temporárias (holds)
+# ======================================================
+#
+# Um hold retira os ingressos do estoque por tempo limitado, enquanto
+# o cliente preenche seus dados. A confirmação apenas registra a
+# compra (o estoque já foi descontado); a liberação ou a expiração
+# devolvem os ingressos ao estoque.
+
+def create_hold(hold_id, screening_id, quantity, expires_at):
+    """
+    Reserva ingressos de uma sessão até expires_at (timestamp Unix).
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            UPDATE screenings
+            SET available_tickets = available_tickets - ?
+            WHERE id = ? AND available_tickets >= ?
+        """, (quantity, screening_id, quantity))
+
+        if cursor.rowcount == 0:
+            cursor.execute("SELECT 1 FROM screenings WHERE id=?", (screening_id,))
+
+            if not cursor.fetchone():
+                return {
+                    "status": "error",
+                    "message": "Sessão não encontrada.",
+                    "data": None
+                }
+
+            return {
+                "status": "error",
+                "message": "Quantidade de ingressos insuficiente.",
+                "data": None
+            }
+
+        cursor.execute("""
+            INSERT INTO holds (id, screening_id, quantity, expires_at)
+            VALUES (?, ?, ?, ?)
+        """, (hold_id, screening_id, quantity, expires_at))
+
+        cursor.execute(
+            "SELECT available_tickets FROM screenings WHERE id=?",
+            (screening_id,)
+        )
+
+        return {
+            "status": "success",
+            "message": "Ingressos reservados.",
+            "data": {
+                "hold_id": hold_id,
+                "screening_id": screening_id,
+                "quantity": quantity,
+                "expires_at": expires_at,
+                "available_tickets": cursor.fetchone()[0]
+            }
+        }
+
+
+def confirm_hold(hold_id, name, email, now):
+    """
+    Converte um hold ainda válido em compra.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Lock de escrita desde o início: duas confirmações
+        # simultâneas do mesmo hold não podem ambas vencer
+        cursor.execute("BEGIN IMMEDIATE")
+
+        cursor.execute("""
+            SELECT screening_id, quantity
+            FROM holds
+            WHERE id = ? AND expires_at > ?
+        """, (hold_id, now))
+
+        hold = cursor.fetchone()
+
+        if not hold:
+            return {
+                "status": "error",
+                "message": "Reserva não encontrada ou expirada.",
+                "data": None
+            }
+
+        screening_id, quantity = hold
+        cursor.execute("DELETE FROM holds WHERE id = ?", (hold_id,))
+        client_id = find_client(name, email, cursor)
+
+        cursor.execute("""
+            INSERT INTO purchases (client_id, screening_id, quantity)
+            VALUES (?, ?, ?)
+        """, (client_id, screening_id, quantity))
+
+        return {
+            "status": "success",
+            "message": "Compra realizada com sucesso.",
+            "data": {"screening_id": screening_id, "quantity": quantity}
+        }
+
+
+def release_hold(hold_id):
+    """
+    Cancela um hold, devolvendo os ingressos ao estoque.
+    Retorna o screening_id liberado (None se o hold não existir).
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+
+        cursor.execute(
+            "SELECT screening_id, quantity FROM holds WHERE id = ?",
+            (hold_id,)
+        )
+        hold = cursor.fetchone()
+
+        if not hold:
+            return None
+
+        cursor.execute("DELETE FROM holds WHERE id = ?", (hold_id,))
+        cursor.execute("""
+            UPDATE screenings
+            SET available_tickets = available_tickets + ?
+            WHERE id = ?
+        """, (hold[1], hold[0]))
+
+        return hold[0]
+
+
+def expire_holds(now):
+    """
+    Devolve ao estoque, em uma única transação, todos os holds
+    expirados. Retorna os screening_ids afetados.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+
+        cursor.execute("""
+            SELECT screening_id, SUM(quantity)
+            FROM holds
+            WHERE expires_at <= ?
+            GROUP BY screening_id
+        """, (now,))
+        expired = cursor.fetchall()
+
+        if not expired:
+            return []
+
+        cursor.executemany("""
+            UPDATE screenings
+            SET available_tickets = available_tickets + ?
+            WHERE id = ?
+        """, [(quantity, screening_id) for screening_id, quantity in expired])
+
+        cursor.execute("DELETE FROM holds WHERE expires_at <= ?", (now,))
+
+        return [screening_id for screening_id, _ in expired]
+
+
+# ======================================================
+# Persistência do Inventário em Memória (write-behind)
+# ======================================================
+
+def load_inventory():
+    """
+    Retorna o estoque atual de todas as sessões: [(screening_id, available_tickets)].
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, available_tickets FROM screenings")
+        return cursor.fetchall()
+
+
+def get_inventory_checkpoint():
+    """
+    Retorna a sequência da última operação do inventário persistida.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM inventory_checkpoint WHERE id = 1")
+        result = cursor.fetchone()
+        return result[0] if result else 0
+
+
+def apply_purchases(operations):
+    """
+    Persiste, em uma única transação e na ordem recebida, compras
+    já admitidas pelo inventário em memória, avançando o checkpoint.
+
+    Cada operação é um dict com: seq, name, email, screening_id,
+    quantity e timestamp (e, opcionalmente, idempotency_key, response e
+    fingerprint, este quando a chave é de um lote). O estoque não é verificado aqui: o
+    inventário em memória é a fonte autoritativa.
+    """
+
+    if not operations:
+        return
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        for op in operations:
+            client_id = find_client(op["name"], op["email"], cursor)
+
+            cursor.execute("""
+                UPDATE screenings
+                SET available_tickets = available_tickets - ?
+                WHERE id = ?
+            """, (op["quantity"], op["screening_id"]))
+
+            cursor.execute("""
+                INSERT INTO purchases (client_id, screening_id, quantity, timestamp)
+                VALUES (?, ?, ?, ?)
+            """, (client_id, op["screening_id"], op["quantity"], op["timestamp"]))
+
+            if op.get("idempotency_key"):
+                fingerprint = op.get("fingerprint") or idempotency_fingerprint(
+                    op["name"], op["email"], op["screening_id"], op["quantity"]
+                )
+                store_idempotency_key(
+                    cursor, op["idempotency_key"], fingerprint,
+                    op["response"], op["enqueued_at"]
+                )
+
+        cursor.execute(
+            "UPDATE inventory_checkpoint SET seq = ? WHERE id = 1",
+            (operations[-1]["seq"],)
+        )
+
+
+# ======================================================
+# Replicação para Réplicas de Leitura
+# ======================================================
+
+def _replication_head(cursor):
+    """
+    Última posição do log de replicação (0 se nada foi registrado).
+    """
+
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'replication_log'")
+    row = cursor.fetchone()
+
+    return row[0] if row else 0
+
+
+def _replication_log_enabled(cursor):
+    """
+    Indica se as triggers do log de replicação estão instaladas.
+    """
+
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({})".format(
+            ", ".join("?" * len(REPLICATED_TABLES) * len(REPLICATED_OPERATIONS))
+        ),
+        [
+            f"trg_replication_{table}_{operation.lower()}"
+            for table in REPLICATED_TABLES
+            for operation, _ in REPLICATED_OPERATIONS
+        ]
+    )
+
+    return cursor.fetchone()[0] == len(REPLICATED_TABLES) * len(REPLICATED_OPERATIONS)
+
+
+def replication_snapshot_page(table, after_id, limit):
+    """
+    Página da cópia completa de uma tabela replicada (servidor
+    principal): até limit linhas com id maior que after_id.
+    Retorna um dict com seq (posição do log no instante da leitura),
+    columns e rows.
+
+    A cópia é lida em várias páginas, sem transação entre elas: a
+    réplica usa o seq da primeira página e, em seguida, aplica as
+    alterações posteriores a ele, que cobrem tudo o que mudou
+    enquanto as demais páginas eram lidas.
+
+    O log só é mantido depois que uma réplica pede a primeira cópia:
+    as triggers são instaladas na mesma transação da leitura, para
+    que nenhuma alteração posterior à página fique sem registro.
+    """
+
+    if table not in REPLICATED_TABLES:
+        raise ValueError(f"Tabela não replicada: {table}")
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        if _replication_log_enabled(cursor):
+            # Transação de leitura: posição e linhas no mesmo instante
+            cursor.execute("BEGIN")
+        else:
+            cursor.execute("BEGIN IMMEDIATE")
+
+            for statement in _replication_triggers():
+                cursor.execute(statement)
+
+        seq = _replication_head(cursor)
+
+        cursor.execute(f"SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+
+        return {
+            "seq": seq,
+            "columns": [column[0] for column in cursor.description],
+            "rows": cursor.fetchall()
+        }
+
+
+def replication_changes(since, limit):
+    """
+    Alterações posteriores à posição since (servidor principal).
+
+    Retorna None se a réplica precisar de uma cópia completa (since
+    negativo: ainda sem dados; log ainda desativado; ou mais atrasada
+    que o log retido). Senão, um dict com:
+    upto (posição aplicada após este lote), head (última posição),
+    columns (colunas por tabela) e changes: lista de (tabela, id, linha),
+    com linha None para remoções.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+
+        # Log desativado (nenhuma réplica pediu cópia): nada foi registrado
+        if not _replication_log_enabled(cursor):
+            return None
+
+        head = _replication_head(cursor)
+
+        cursor.execute("SELECT MIN(seq) FROM replication_log")
+        oldest = cursor.fetchone()[0]
+
+        if since < 0 or since > head or (since < head and (oldest is None or oldest > since + 1)):
+            return None
+
+        cursor.execute("""
+            SELECT seq, table_name, row_id
+            FROM replication_log
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+        """, (since, limit))
+        entries = cursor.fetchall()
+
+        # Várias alterações da mesma linha viram uma só (estado atual),
+        # na posição da última alteração
+        latest = {}
+        for _, table, row_id in entries:
+            latest.pop((table, row_id), None)
+            latest[(table, row_id)] = True
+
+        columns = {}
+        changes = []
+
+        for table, row_id in latest:
+            cursor.execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,))
+            changes.append((table, row_id, cursor.fetchone()))
+            columns.setdefault(table, [column[0] for column in cursor.description])
+
+    return {
+        "upto": entries[-1][0] if entries else since,
+        "head": head,
+        "columns": columns,
+        "changes": changes
+    }
+
+
+def _checked_columns(cursor, table, columns):
+    """
+    Valida tabela e colunas recebidas do servidor principal
+    antes de usá-las na montagem do SQL.
+    """
+
+    if table not in REPLICATED_TABLES:
+        raise ValueError(f"Tabela não replicada: {table}")
+
+    cursor.execute(f"PRAGMA table_info({table})")
+    local = {row[1] for row in cursor.fetchall()}
+
+    if not set(columns) <= local or "id" not in columns:
+        raise ValueError(f"Colunas incompatíveis para {table}: {columns}")
+
+    return columns
+
+
+def _upsert_row(cursor, table, columns, row):
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != "id")
+
+    cursor.execute(f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({", ".join("?" * len(columns))})
+        ON CONFLICT(id) DO UPDATE SET {updates}
+    """, tuple(row))
+
+
+def _finish_replication(cursor, seq):
+    # As triggers também registram as escritas da própria réplica: descartar
+    cursor.execute("DELETE FROM replication_log")
+    cursor.execute(
+        "UPDATE replication_state SET seq = ?, synced_at = ? WHERE id = 1",
+        (seq, time.time())
+    )
+
+
+def _apply_changes(cursor, columns, changes, checked):
+    """
+    Aplica alterações recebidas do principal (chamar com transação).
+    Retorna os ids das sessões alteradas e se algum filme mudou.
+    """
+
+    screenings = set()
+    movies_changed = False
+
+    for table, row_id, row in changes:
+        if table not in checked:
+            checked[table] = _checked_columns(cursor, table, columns.get(table, ["id"]))
+
+        if row is None:
+            cursor.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+        else:
+            _upsert_row(cursor, table, checked[table], row)
+
+        if table == "screenings":
+            screenings.add(row_id)
+        elif table == "movies":
+            movies_changed = True
+
+    return screenings, movies_changed
+
+
+def apply_replication_snapshot(pages, catch_up):
+    """
+    Substitui as tabelas replicadas pela cópia completa (réplica),
+    recebida em páginas, e aplica as alterações feitas no principal
+    durante a cópia. Tudo em uma única transação local: consultas
+    concorrentes veem a cópia anterior ou a nova, nunca uma parcial.
+
+    pages:
+        Iterável de (seq, tabela, colunas, linhas), na ordem de
+        REPLICATED_TABLES; vale o seq da primeira página.
+
+    catch_up:
+        Função catch_up(seq) que retorna os lotes de alterações
+        (dicts de replication_changes) posteriores a seq.
+
+    Retorna a posição do log aplicada.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+
+        # Linhas copiadas em instantes diferentes: chaves estrangeiras
+        # verificadas só no commit, após as alterações da cópia
+        cursor.execute("PRAGMA defer_foreign_keys = ON")
+
+        for table in reversed(REPLICATED_TABLES):
+            cursor.execute(f"DELETE FROM {table}")
+
+        seq = None
+        checked = {}
+
+        for page_seq, table, columns, rows in pages:
+            if seq is None:
+                seq = page_seq
+
+            if table not in checked:
+                checked[table] = _checked_columns(cursor, table, columns)
+
+            for row in rows:
+                _upsert_row(cursor, table, checked[table], row)
+
+        for changes in catch_up(seq):
+            _apply_changes(cursor, changes["columns"], changes["changes"], {})
+            seq = changes["upto"]
+
+        _finish_replication(cursor, seq)
+
+    return seq
+
+
+def apply_replication_changes(upto, columns, changes):
+    """
+    Aplica um lote de alterações do servidor principal (réplica).
+    Retorna os ids das sessões alteradas e se algum filme mudou,
+    para invalidar o cache do catálogo.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+
+        # Linhas chegam na ordem da última alteração, não da criação:
+        # chaves estrangeiras verificadas só no commit
+        cursor.execute("PRAGMA defer_foreign_keys = ON")
+
+        screenings, movies_changed = _apply_changes(cursor, columns, changes, {})
+
+        _finish_replication(cursor, upto)
+
+    return screenings, movies_changed
+
+
+def get_replication_state():
+    """
+    Posição do log já aplicada pela réplica e instante da última sincronização.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq, synced_at FROM replication_state WHERE id = 1")
+        return cursor.fetchone()
 
 
 # ======================================================
@@ -313,7 +1658,7 @@ def get_purchases_by_email(email):
     retorna lista vazia.
     """
 
-    with connect() as conn:        
+    with get_connection() as conn:        
         cursor = conn.cursor()
         
         # Primeiro localizar o client epelo e-mail
@@ -340,4 +1685,120 @@ def get_purchases_by_email(email):
 			ORDER BY p.timestamp DESC
         """, (client_id,))
         
-        return cursor.fetchall()
\ No newline at end of file
+        return cursor.fetchall()
+
+# ======================================================
+# Consultas Paginadas (keyset pagination)
+# ======================================================
+#
+# Em vez de OFFSET, cada página continua a partir da chave de
+# ordenação da última linha entregue (cursor). O custo de uma
+# página não cresce com a posição no histórico e os índices
+# de cobertura são aproveitados.
+#
+# Cada função retorna (linhas, próxima_chave), sendo próxima_chave
+# None quando não há mais páginas.
+
+def _split_page(rows, limit, key_of):
+    """
+    Separa a linha excedente (buscada com LIMIT limit + 1)
+    e calcula a chave de continuação.
+    """
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, key_of(rows[-1])
+
+
+def list_movies_page(limit, after=None):
+    """
+    Página de filmes ordenados por id.
+    after: (id,) do último filme da página anterior.
+    """
+
+    last_id = after[0] if after else 0
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, title, genre, length
+            FROM movies
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (last_id, limit + 1))
+
+        return _split_page(cursor.fetchall(), limit, lambda row: (row[0],))
+
+
+def list_screenings_page(movie_id, limit, after=None):
+    """
+    Página de sessões de um filme ordenadas por (time, id).
+    after: (time, id) da última sessão da página anterior.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        if after:
+            cursor.execute("""
+                SELECT id, time, total_tickets, available_tickets
+                FROM screenings
+                WHERE movie_id = ?
+                  AND (time > ? OR (time = ? AND id > ?))
+                ORDER BY time, id
+                LIMIT ?
+            """, (movie_id, after[0], after[0], after[1], limit + 1))
+        else:
+            cursor.execute("""
+                SELECT id, time, total_tickets, available_tickets
+                FROM screenings
+                WHERE movie_id = ?
+                ORDER BY time, id
+                LIMIT ?
+            """, (movie_id, limit + 1))
+
+        return _split_page(cursor.fetchall(), limit, lambda row: (row[1], row[0]))
+
+
+def get_purchases_page(email, limit, before=None):
+    """
+    Página do histórico de compras do cliente, da mais recente para
+    a mais antiga, ordenada por (timestamp, id) decrescente.
+    before: (timestamp, id) da última compra da página anterior.
+
+    As linhas têm o mesmo formato de get_purchases_by_email.
+    """
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT id FROM clients WHERE email=?", (email,))
+        client = cursor.fetchone()
+
+        if not client:
+            return [], None
+
+        # p.id é buscado apenas para compor o cursor da próxima página
+        query = """
+            SELECT m.title, s.time, p.quantity, p.timestamp, p.id
+            FROM purchases p
+            JOIN screenings s ON p.screening_id = s.id
+            JOIN movies m ON s.movie_id = m.id
+            WHERE p.client_id = ?
+        """
+        params = [client[0]]
+
+        if before:
+            query += " AND (p.timestamp < ? OR (p.timestamp = ? AND p.id < ?))"
+            params += [before[0], before[0], before[1]]
+
+        query += " ORDER BY p.timestamp DESC, p.id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        cursor.execute(query, params)
+
+        rows, next_key = _split_page(cursor.fetchall(), limit, lambda row: (row[3], row[4]))
+        return [row[:4] for row in rows], next_key
@@ -0,0 +1,293 @@
+"""
+group_commit.py
+
+Group commit de compras concorrentes.
+
+Sob carga em rajadas, cada compra confirmava sua própria transação,
+e o tempo de sincronização com o disco limitava a vazão. Aqui, as
+compras que chegam dentro de uma janela curta (ou até um tamanho
+máximo de lote) são aplicadas em uma única transação:
+
+- Cada chamador continua recebendo seu próprio resultado
+- Uma única thread de escrita agrupa e confirma os lotes
+- Janela e tamanho máximo do lote são configuráveis
+- Pedidos cujo prazo do cliente vence ainda na fila são descartados
+  sem comprar (o cliente já desistiu da resposta); o chamador para
+  de esperar no prazo, mesmo com a thread de escrita parada
+- No encerramento, pedidos que sobrarem na fila recebem erro em vez
+  de prender a thread do chamador
+- Métricas de tamanho de lote e latência de commit
+"""
+
+import queue
+import threading
+import time
+
+from core import database
+from core.color_logger import setup_logger
+
+
+logger = setup_logger("GroupCommit")
+
+
+class _PendingPurchase:
+    """
+    Compra aguardando o commit do lote em que foi incluída.
+    """
+
+    __slots__ = ("args", "deadline", "result", "done", "claimed", "cancelled")
+
+    def __init__(self, args, deadline=None):
+        self.args = args
+        self.deadline = deadline
+        self.result = None
+        self.done = threading.Event()
+
+        # Estado protegido pelo lock do GroupCommitter: incluída em um
+        # lote em commit (claimed) ou abandonada pelo chamador (cancelled)
+        self.claimed = False
+        self.cancelled = False
+
+
+class GroupCommitter:
+    """
+    Agrupa compras concorrentes em transações compartilhadas.
+    """
+
+    def __init__(self, window_ms=5, max_batch=64):
+        """
+        window_ms:
+            Tempo máximo (ms) que o primeiro pedido de um lote aguarda
+            a chegada de outros pedidos.
+
+        max_batch:
+            Número máximo de compras por transação.
+        """
+
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._writer = None
+        self._running = False
+
+        # Protege _running, a entrada na fila e o estado dos pedidos
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+
+        # Métricas
+        self._batches = 0
+        self._purchases = 0
+        self._max_batch_size = 0
+        self._last_batch_size = 0
+        self._commit_errors = 0
+        self._expired = 0
+        self._total_commit = 0.0
+        self._max_commit = 0.0
+        self._last_commit = 0.0
+
+
+    def start(self):
+        """
+        Inicia a thread responsável por agrupar e confirmar os lotes.
+        """
+
+        self._running = True
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+        logger.info(
+            f"Group commit ativo (janela={self.window * 1000:g} ms, "
+            f"lote máximo={self.max_batch})."
+        )
+
+
+    def stop(self):
+        """
+        Confirma os pedidos pendentes e encerra a thread de escrita.
+        Pedidos que ainda restarem na fila recebem erro.
+        """
+
+        # Mesmo lock de submit(): nenhum pedido entra na fila depois daqui
+        with self._lock:
+            self._running = False
+
+        if self._writer:
+            self._writer.join()
+            self._writer = None
+
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            pending.result = {
+                "status": "error",
+                "message": "Servidor em encerramento: compra não realizada.",
+                "data": None
+            }
+            pending.done.set()
+
+
+    # ==========================================================
+    # Submissão de compras
+    # ==========================================================
+
+    def submit(self, name, email, screening_id, quantity, idempotency_key=None, deadline=None):
+        """
+        Enfileira a compra e aguarda o commit do lote.
+        Retorna o resultado individual no formato padrão.
+
+        deadline (opcional): prazo absoluto (time.monotonic) do cliente.
+        Se vencer antes de o lote ser aplicado, a compra é descartada
+        sem alterar o estoque e o retorno é None. Se o lote que a
+        contém já estiver em commit, o resultado dele é aguardado.
+        """
+
+        pending = _PendingPurchase((name, email, screening_id, quantity, idempotency_key), deadline)
+
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("Group commit não está em execução.")
+
+            self._queue.put(pending)
+
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+
+        if pending.done.wait(timeout):
+            return pending.result
+
+        with self._lock:
+            # Ainda na fila: abandonada, a thread de escrita a descarta
+            if not pending.claimed:
+                pending.cancelled = True
+                return None
+
+        # Já em commit: o resultado chega assim que a transação terminar
+        pending.done.wait()
+        return pending.result
+
+
+    # ==========================================================
+    # Formação e commit dos lotes
+    # ==========================================================
+
+    def _run(self):
+        while self._running or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            # Aguarda outros pedidos até a janela expirar ou o lote encher
+            deadline = time.monotonic() + self.window
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    break
+
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._commit(batch)
+
+
+    def _commit(self, batch):
+        """
+        Aplica o lote em uma transação e entrega cada resultado ao seu chamador.
+        """
+
+        # Pedidos cujo cliente já desistiu não entram na transação;
+        # os demais são marcados e não podem mais ser abandonados
+        now = time.monotonic()
+        expired = []
+        claimed = []
+
+        with self._lock:
+            for pending in batch:
+                if pending.cancelled or (pending.deadline is not None and now >= pending.deadline):
+                    pending.cancelled = True
+                    expired.append(pending)
+                else:
+                    pending.claimed = True
+                    claimed.append(pending)
+
+        batch = claimed
+
+        if expired:
+            with self._stats_lock:
+                self._expired += len(expired)
+
+            for pending in expired:
+                pending.done.set()
+
+            if not batch:
+                return
+
+        start = time.perf_counter()
+
+        try:
+            results = database.buy_tickets_group([p.args for p in batch])
+            failed = False
+
+        except Exception as e:
+            logger.error(f"Falha no commit do lote ({len(batch)} compras): {e}")
+            results = [{
+                "status": "error",
+                "message": "Erro interno ao realizar compra.",
+                "data": None
+            }] * len(batch)
+            failed = True
+
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            self._batches += 1
+            self._purchases += len(batch)
+            self._last_batch_size = len(batch)
+            self._max_batch_size = max(self._max_batch_size, len(batch))
+            self._last_commit = elapsed
+            self._total_commit += elapsed
+            self._max_commit = max(self._max_commit, elapsed)
+
+            if failed:
+                self._commit_errors += 1
+
+        for pending, result in zip(batch, results):
+            pending.result = result
+            pending.done.set()
+
+
+    # ==========================================================
+    # Métricas
+    # ==========================================================
+
+    def stats(self):
+        """
+        Retorna métricas de tamanho de lote e latência de commit.
+        """
+
+        with self._stats_lock:
+            batches = self._batches
+
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "queue_depth": self._queue.qsize(),
+                "batches": batches,
+                "purchases": self._purchases,
+                "avg_batch_size": round(self._purchases / batches, 2) if batches else 0.0,
+                "max_batch_size": self._max_batch_size,
+                "last_batch_size": self._last_batch_size,
+                "commit_errors": self._commit_errors,
+                "expired": self._expired,
+                "avg_commit_ms": round(self._total_commit / batches * 1000, 3) if batches else 0.0,
+                "max_commit_ms": round(self._max_commit * 1000, 3),
+                "last_commit_ms": round(self._last_commit * 1000, 3)
+            }
@@ -0,0 +1,102 @@
+"""
+holds.py
+
+Reaper de reservas temporárias (holds) expiradas.
+
+Um hold retira ingressos do estoque enquanto o cliente preenche seus
+dados. Se o cliente desistir ou demorar além do TTL, os ingressos
+precisam voltar ao estoque. Esta thread de fundo executa
+periodicamente a expiração em lote, em vez de verificar cada
+hold individualmente nas compras.
+"""
+
+import threading
+import time
+
+from core.color_logger import setup_logger
+
+
+logger = setup_logger("HoldReaper")
+
+
+class HoldReaper:
+    """
+    Thread que devolve periodicamente ao estoque os holds expirados.
+    """
+
+    def __init__(self, expire, interval=5, on_expired=None):
+        """
+        expire:
+            Função expire(now) que libera os holds expirados e
+            retorna os screening_ids afetados.
+
+        interval:
+            Intervalo (em segundos) entre as varreduras.
+
+        on_expired:
+            Função opcional chamada com cada screening_id afetado
+            (ex.: invalidar o cache do catálogo).
+        """
+
+        self.expire = expire
+        self.interval = interval
+        self.on_expired = on_expired
+
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Contadores
+        self.runs = 0
+        self.screenings_released = 0
+        self.errors = 0
+
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        self._stop.set()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+    def run_once(self):
+        """
+        Executa uma varredura imediatamente.
+        """
+
+        affected = self.expire(time.time())
+        self.runs += 1
+        self.screenings_released += len(affected)
+
+        if self.on_expired:
+            for screening_id in affected:
+                self.on_expired(screening_id)
+
+        if affected:
+            logger.info(f"Holds expirados devolvidos ao estoque em {len(affected)} sessões.")
+
+        return affected
+
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Erro ao expirar holds: {e}")
+
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "screenings_released": self.screenings_released,
+            "errors": self.errors
+        }
@@ -0,0 +1,776 @@
+"""
+inventory.py
+
+Inventário de ingressos em memória com persistência write-behind.
+
+Para vendas relâmpago, consultar e atualizar o SQLite a cada compra
+limita a vazão. Este módulo mantém em memória o estoque autoritativo
+de cada sessão (screening_id -> ingressos restantes), carregado na
+inicialização do servidor:
+
+- A compra é admitida em memória (microssegundos)
+- Cada compra admitida é gravada em um journal append-only e
+  enfileirada, em ordem, para persistência assíncrona no banco
+- Uma thread de escrita aplica a fila em lotes, avançando um
+  checkpoint no próprio banco, dentro da mesma transação
+- Após uma queda, as operações do journal posteriores ao
+  checkpoint são reaplicadas antes de carregar o estoque
+
+Contadores de atraso da fila (lag) permitem dimensionar o mecanismo.
+
+O journal é reiniciado quando a fila esvazia. Sob carga contínua ela
+pode nunca esvaziar: quando o journal acumula journal_compact_ops
+operações já persistidas, ele é reescrito só com as pendentes, para
+que não cresça sem limite nem torne lenta a recuperação.
+
+Se o banco recusar um lote, ele é reenviado com espera exponencial.
+Após max_flush_retries falhas seguidas, novas vendas e reservas são
+suspensas (o estoque em memória deixaria de refletir o banco por tempo
+indeterminado); elas voltam assim que um lote for gravado. No
+encerramento, um lote que continua falhando fica no journal e é
+reaplicado na próxima inicialização.
+
+Chaves de idempotência das compras ficam em memória (limitadas e com
+expiração) e são gravadas no journal e no banco junto com a compra.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from core import database
+from core.color_logger import setup_logger
+
+
+logger = setup_logger("Inventory")
+
+
+class InventoryEngine:
+    """
+    Estoque autoritativo em memória com fila ordenada de persistência.
+    """
+
+    def __init__(self, journal_path=None, batch_size=100, fsync=False,
+                 idempotency_ttl=86400, idempotency_max_keys=100000,
+                 max_flush_retries=5, flush_backoff=0.5, max_flush_backoff=30,
+                 journal_compact_ops=10000):
+        """
+        journal_path:
+            Arquivo do journal de operações (padrão: <banco>.journal).
+
+        batch_size:
+            Máximo de operações persistidas por transação.
+
+        fsync:
+            Se True, força gravação em disco do journal a cada compra.
+
+        idempotency_ttl / idempotency_max_keys:
+            Tempo e quantidade máxima de chaves de idempotência lembradas.
+
+        max_flush_retries:
+            Falhas seguidas de gravação antes de suspender as vendas.
+
+        flush_backoff / max_flush_backoff:
+            Espera (segundos) após a primeira falha, dobrada a cada nova
+            falha até o máximo.
+
+        journal_compact_ops:
+            Operações já persistidas no journal antes de reescrevê-lo
+            só com as pendentes.
+        """
+
+        self.journal_path = journal_path or database.DB_PATH + ".journal"
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.max_flush_retries = max_flush_retries
+        self.flush_backoff = flush_backoff
+        self.max_flush_backoff = max_flush_backoff
+        self.journal_compact_ops = journal_compact_ops
+
+        self._stock = {}
+        self._lock = threading.Lock()  # Protege estoque, holds, sequência e journal
+
+        # Reservas temporárias: hold_id -> (screening_id, quantity, expires_at).
+        # Só existem em memória: após uma queda, o banco nunca foi
+        # descontado por elas e o estoque recarregado já está correto
+        self._holds = {}
+
+        # Chaves de idempotência: key -> (fingerprint, resultado, criada_em),
+        # em ordem de criação (as mais antigas expiram primeiro)
+        self._idempotency = OrderedDict()
+        self.idempotency_ttl = idempotency_ttl
+        self.idempotency_max_keys = idempotency_max_keys
+
+        self._queue = queue.Queue()
+        self._seq = 0
+        self._applied_seq = 0
+
+        self._journal = None
+        self._journal_ops = 0  # Operações gravadas no journal atual
+        self._writer = None
+        self._running = False
+        self._wakeup = threading.Event()  # Interrompe a espera entre tentativas
+
+        # Vendas suspensas após falhas seguidas de gravação no banco
+        self._suspended = False
+        self._flush_failures = 0
+        self._last_flush_error = None
+
+        # Instante de enfileiramento da operação mais antiga em gravação
+        self._inflight_since = None
+
+        # Contadores
+        self._admitted = 0
+        self._rejected = 0
+        self._persisted = 0
+        self._batches = 0
+        self._flush_errors = 0
+        self._suspensions = 0
+        self._replayed = 0
+        self._compactions = 0
+        self._last_flush_ms = 0.0
+
+
+    # ==========================================================
+    # Inicialização e recuperação
+    # ==========================================================
+
+    def start(self):
+        """
+        Reaplica operações pendentes do journal, carrega o estoque
+        do banco e inicia a thread de escrita.
+        """
+
+        checkpoint = database.get_inventory_checkpoint()
+        pending = [op for op in self._read_journal() if op["seq"] > checkpoint]
+
+        if pending:
+            database.apply_purchases(pending)
+            self._replayed = len(pending)
+            checkpoint = pending[-1]["seq"]
+            logger.warning(f"Inventário: {len(pending)} operações reaplicadas do journal.")
+
+        self._seq = self._applied_seq = checkpoint
+
+        # Journal já refletido no banco: pode ser reiniciado
+        self._journal = open(self.journal_path, "w", encoding="utf-8")
+        self._journal_ops = 0
+
+        self._stock = dict(database.load_inventory())
+
+        # Chaves ainda válidas (incluindo as do journal reaplicado)
+        for key, fingerprint, result, created_at in database.load_idempotency_keys(
+            time.time() - self.idempotency_ttl
+        ):
+            self._idempotency[key] = (fingerprint, result, created_at)
+
+        self._running = True
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+        logger.info(f"Inventário em memória carregado: {len(self._stock)} sessões.")
+
+
+    def _read_journal(self):
+        """
+        Lê as operações do journal, ignorando uma última linha incompleta.
+        """
+
+        if not os.path.exists(self.journal_path):
+            return []
+
+        operations = []
+
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    operations.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # Gravação interrompida pela queda
+
+        return operations
+
+
+    # ==========================================================
+    # Admissão de compras
+    # ==========================================================
+
+    def purchase(self, name, email, screening_id, quantity, idempotency_key=None):
+        """
+        Admite a compra contra o estoque em memória e a enfileira
+        para persistência. Retorna resposta no formato padrão.
+
+        Com idempotency_key, uma nova tentativa com a mesma chave
+        retorna o resultado original sem tocar no estoque.
+        """
+
+        with self._lock:
+            if self._suspended:
+                return self._suspended_response()
+
+            if idempotency_key is None:
+                return self._purchase(name, email, screening_id, quantity)
+
+            now = time.time()
+            fingerprint = database.idempotency_fingerprint(name, email, screening_id, quantity)
+
+            self._expire_idempotency_keys(now)
+            entry = self._idempotency.get(idempotency_key)
+
+            if entry:
+                if entry[0] != fingerprint:
+                    return database.idempotency_conflict()
+
+                return entry[1]
+
+            result = self._purchase(name, email, screening_id, quantity, idempotency_key)
+            self._idempotency[idempotency_key] = (fingerprint, result, now)
+
+            return result
+
+
+    @staticmethod
+    def _suspended_response():
+        return {
+            "status": "error",
+            "message": "Vendas suspensas: falha ao gravar no banco de dados. Tente novamente mais tarde.",
+            "data": None
+        }
+
+
+    def _expire_idempotency_keys(self, now):
+        """
+        Descarta chaves expiradas e, acima do limite, as mais antigas (chamar com lock).
+        """
+
+        while self._idempotency:
+            key, (_, _, created_at) = next(iter(self._idempotency.items()))
+
+            if created_at >= now - self.idempotency_ttl and len(self._idempotency) < self.idempotency_max_keys:
+                break
+
+            del self._idempotency[key]
+
+
+    def _purchase(self, name, email, screening_id, quantity, idempotency_key=None):
+        """
+        Admite uma compra contra o estoque em memória (chamar com lock).
+        """
+
+        available = self._stock.get(screening_id)
+
+        if available is None:
+            self._rejected += 1
+            return {
+                "status": "error",
+                "message": "Sessão não encontrada.",
+                "data": None
+            }
+
+        if available < quantity:
+            self._rejected += 1
+            return {
+                "status": "error",
+                "message": "Quantidade de ingressos insuficiente.",
+                "data": None
+            }
+
+        remaining = available - quantity
+        self._stock[screening_id] = remaining
+
+        result = {
+            "status": "success",
+            "message": "Compra realizada com sucesso.",
+            "data": {"available_tickets": remaining}
+        }
+
+        # A chave acompanha a compra no journal e no banco
+        self._enqueue(name, email, screening_id, quantity, idempotency_key, result)
+
+        return result
+
+
+    def purchase_batch(self, name, email, items, idempotency_key=None):
+        """
+        Admite vários itens (screening_id, quantity) atomicamente:
+        ou todos são aceitos, ou nenhum altera o estoque.
+
+        Com idempotency_key, uma nova tentativa com a mesma chave
+        retorna o resultado original sem tocar no estoque.
+        """
+
+        with self._lock:
+            if self._suspended:
+                return self._suspended_response()
+
+            if idempotency_key is None:
+                return self._purchase_batch(name, email, items)
+
+            now = time.time()
+            fingerprint = database.batch_fingerprint(name, email, items)
+
+            self._expire_idempotency_keys(now)
+            entry = self._idempotency.get(idempotency_key)
+
+            if entry:
+                if entry[0] != fingerprint:
+                    return database.idempotency_conflict()
+
+                return entry[1]
+
+            result = self._purchase_batch(name, email, items, idempotency_key, fingerprint)
+            self._idempotency[idempotency_key] = (fingerprint, result, now)
+
+            return result
+
+
+    def _purchase_batch(self, name, email, items, idempotency_key=None, fingerprint=None):
+        """
+        Admite um lote contra o estoque em memória (chamar com lock).
+        """
+
+        # Quantidade total pedida por sessão (itens repetidos somam)
+        requested = {}
+        for screening_id, quantity in items:
+            requested[screening_id] = requested.get(screening_id, 0) + quantity
+
+        errors = {}
+        for screening_id, total in requested.items():
+            available = self._stock.get(screening_id)
+
+            if available is None:
+                errors[screening_id] = "Sessão não encontrada."
+            elif available < total:
+                errors[screening_id] = "Quantidade de ingressos insuficiente."
+
+        if errors:
+            self._rejected += 1
+
+            return {
+                "status": "error",
+                "message": "Compra em lote não realizada.",
+                "data": {"items": [
+                    {
+                        "screening_id": screening_id,
+                        "quantity": quantity,
+                        "status": "error" if screening_id in errors else "cancelled",
+                        "message": errors.get(
+                            screening_id,
+                            "Item cancelado: outro item do lote falhou."
+                        ),
+                        "available_tickets": None
+                    }
+                    for screening_id, quantity in items
+                ]}
+            }
+
+        results = []
+        for screening_id, quantity in items:
+            self._stock[screening_id] -= quantity
+
+            results.append({
+                "screening_id": screening_id,
+                "quantity": quantity,
+                "status": "success",
+                "message": "Compra realizada com sucesso.",
+                "available_tickets": self._stock[screening_id]
+            })
+
+        result = {
+            "status": "success",
+            "message": "Compra em lote realizada com sucesso.",
+            "data": {"items": results}
+        }
+
+        # A chave do lote acompanha o último item no journal e no banco
+        last = len(items) - 1
+
+        for index, (screening_id, quantity) in enumerate(items):
+            if index == last and idempotency_key is not None:
+                self._enqueue(name, email, screening_id, quantity, idempotency_key, result, fingerprint)
+            else:
+                self._enqueue(name, email, screening_id, quantity)
+
+        return result
+
+
+    def _enqueue(self, name, email, screening_id, quantity, idempotency_key=None, result=None,
+                 fingerprint=None):
+        """
+        Registra a operação no journal e na fila de escrita (chamar com lock).
+        fingerprint identifica operações cuja chave não é de uma compra
+        individual (lotes).
+        """
+
+        self._seq += 1
+
+        op = {
+            "seq": self._seq,
+            "name": name,
+            "email": email,
+            "screening_id": screening_id,
+            "quantity": quantity,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+            "enqueued_at": time.time()
+        }
+
+        if idempotency_key is not None:
+            op["idempotency_key"] = idempotency_key
+            op["response"] = result
+
+            if fingerprint is not None:
+                op["fingerprint"] = fingerprint
+
+        # Journal e fila atualizados sob o mesmo lock: mesma ordem
+        self._journal.write(json.dumps(op) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+        self._journal_ops += 1
+        self._queue.put(op)
+        self._admitted += 1
+
+
+    # ==========================================================
+    # Reservas temporárias (holds)
+    # ==========================================================
+
+    def create_hold(self, hold_id, screening_id, quantity, expires_at):
+        """
+        Retira ingressos do estoque em memória até expires_at.
+        """
+
+        with self._lock:
+            if self._suspended:
+                return self._suspended_response()
+
+            available = self._stock.get(screening_id)
+
+            if available is None:
+                return {
+                    "status": "error",
+                    "message": "Sessão não encontrada.",
+                    "data": None
+                }
+
+            if available < quantity:
+                return {
+                    "status": "error",
+                    "message": "Quantidade de ingressos insuficiente.",
+                    "data": None
+                }
+
+            self._stock[screening_id] = available - quantity
+            self._holds[hold_id] = (screening_id, quantity, expires_at)
+
+            return {
+                "status": "success",
+                "message": "Ingressos reservados.",
+                "data": {
+                    "hold_id": hold_id,
+                    "screening_id": screening_id,
+                    "quantity": quantity,
+                    "expires_at": expires_at,
+                    "available_tickets": available - quantity
+                }
+            }
+
+
+    def confirm_hold(self, hold_id, name, email, now):
+        """
+        Converte um hold válido em compra, enfileirando-a para persistência.
+        """
+
+        with self._lock:
+            # O hold é mantido: pode ser confirmado quando as vendas voltarem
+            if self._suspended:
+                return self._suspended_response()
+
+            hold = self._holds.get(hold_id)
+
+            if not hold or hold[2] <= now:
+                return {
+                    "status": "error",
+                    "message": "Reserva não encontrada ou expirada.",
+                    "data": None
+                }
+
+            del self._holds[hold_id]
+            screening_id, quantity, _ = hold
+
+            # Estoque em memória já descontado pelo hold
+            self._enqueue(name, email, screening_id, quantity)
+
+        return {
+            "status": "success",
+            "message": "Compra realizada com sucesso.",
+            "data": {"screening_id": screening_id, "quantity": quantity}
+        }
+
+
+    def release_hold(self, hold_id):
+        """
+        Cancela um hold, devolvendo os ingressos ao estoque em memória.
+        """
+
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+
+            if not hold:
+                return None
+
+            self._stock[hold[0]] += hold[1]
+            return hold[0]
+
+
+    def expire_holds(self, now):
+        """
+        Devolve ao estoque todos os holds expirados.
+        Retorna os screening_ids afetados.
+        """
+
+        with self._lock:
+            expired = [
+                hold_id for hold_id, hold in self._holds.items()
+                if hold[2] <= now
+            ]
+
+            affected = set()
+
+            for hold_id in expired:
+                screening_id, quantity, _ = self._holds.pop(hold_id)
+                self._stock[screening_id] += quantity
+                affected.add(screening_id)
+
+            return list(affected)
+
+
+    def available(self, screening_id):
+        """
+        Retorna os ingressos restantes da sessão (None se não existir).
+        """
+
+        with self._lock:
+            return self._stock.get(screening_id)
+
+
+    def overlay(self, screenings):
+        """
+        Substitui a coluna available_tickets das linhas
+        (id, time, total_tickets, available_tickets) pelo estoque em memória.
+        """
+
+        with self._lock:
+            return [
+                (row[0], row[1], row[2], self._stock.get(row[0], row[3]))
+                for row in screenings
+            ]
+
+
+    # ==========================================================
+    # Persistência write-behind
+    # ==========================================================
+
+    def _writer_loop(self):
+        """
+        Aplica a fila ao banco em lotes ordenados. Em caso de falha,
+        o lote é mantido e reenviado com espera exponencial; após
+        max_flush_retries falhas seguidas, as vendas são suspensas.
+        """
+
+        batch = []
+
+        while self._running or batch or not self._queue.empty():
+            if not batch:
+                try:
+                    batch.append(self._queue.get(timeout=0.1))
+                except queue.Empty:
+                    continue
+
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                self._inflight_since = batch[0]["enqueued_at"]
+
+            start = time.perf_counter()
+
+            try:
+                database.apply_purchases(batch)
+            except Exception as e:
+                self._flush_errors += 1
+                self._flush_failures += 1
+                self._last_flush_error = str(e)
+                logger.error(f"Falha ao persistir inventário (tentativa {self._flush_failures}): {e}")
+
+                if self._flush_failures >= self.max_flush_retries:
+                    if not self._running:
+                        # Encerramento: o lote fica no journal e é
+                        # reaplicado na próxima inicialização
+                        logger.error(
+                            f"Inventário encerrado com {self._seq - self._applied_seq} "
+                            f"operações só no journal."
+                        )
+                        break
+
+                    self._suspend()
+
+                delay = min(self.flush_backoff * 2 ** (self._flush_failures - 1), self.max_flush_backoff)
+                self._wakeup.wait(delay)
+                continue
+
+            if self._flush_failures:
+                self._resume()
+
+            self._last_flush_ms = (time.perf_counter() - start) * 1000
+            self._batches += 1
+            self._persisted += len(batch)
+
+            with self._lock:
+                self._applied_seq = batch[-1]["seq"]
+
+                # Tudo persistido: o journal pode ser reiniciado
+                if self._applied_seq == self._seq:
+                    self._journal.seek(0)
+                    self._journal.truncate()
+                    self._journal_ops = 0
+
+                # Fila nunca vazia: descartar as já persistidas
+                elif self._journal_ops - (self._seq - self._applied_seq) >= self.journal_compact_ops:
+                    self._compact_journal()
+
+            self._inflight_since = None
+            batch = []
+
+
+    def _compact_journal(self):
+        """
+        Reescreve o journal só com as operações ainda não persistidas
+        (chamar com lock: a fila contém exatamente essas operações).
+        """
+
+        with self._queue.mutex:
+            pending = list(self._queue.queue)
+
+        temp_path = self.journal_path + ".tmp"
+
+        try:
+            with open(temp_path, "w", encoding="utf-8") as journal:
+                for op in pending:
+                    journal.write(json.dumps(op) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+
+            self._journal.close()
+            os.replace(temp_path, self.journal_path)
+
+        except OSError as e:
+            # O journal antigo continua válido: a recuperação ignora
+            # as operações anteriores ao checkpoint
+            logger.error(f"Falha ao compactar o journal do inventário: {e}")
+
+        else:
+            self._journal_ops = len(pending)
+            self._compactions += 1
+
+        finally:
+            if self._journal.closed:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+
+    def _suspend(self):
+        """
+        Suspende novas vendas e reservas: o banco não aceita a fila.
+        """
+
+        with self._lock:
+            if self._suspended:
+                return
+
+            self._suspended = True
+            self._suspensions += 1
+
+        logger.error(
+            f"Vendas suspensas após {self._flush_failures} falhas seguidas "
+            f"ao persistir o inventário."
+        )
+
+
+    def _resume(self):
+        """
+        Lote gravado após falhas: retoma as vendas, se suspensas.
+        """
+
+        with self._lock:
+            suspended = self._suspended
+            self._suspended = False
+
+        self._flush_failures = 0
+        self._last_flush_error = None
+
+        if suspended:
+            logger.warning("Banco voltou a aceitar o inventário: vendas retomadas.")
+
+
+    def stop(self):
+        """
+        Persiste as operações pendentes e encerra a thread de escrita.
+        Se o banco continuar recusando a fila, o que restar fica no
+        journal para a próxima inicialização.
+        """
+
+        self._running = False
+        self._wakeup.set()
+
+        if self._writer:
+            self._writer.join()
+            self._writer = None
+
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+
+    # ==========================================================
+    # Estatísticas
+    # ==========================================================
+
+    def stats(self):
+        """
+        Retorna contadores de admissão e de atraso da fila de escrita.
+        """
+
+        with self._lock:
+            seq = self._seq
+            applied = self._applied_seq
+
+        oldest = self._inflight_since
+        if oldest is None:
+            with self._queue.mutex:
+                if self._queue.queue:
+                    oldest = self._queue.queue[0]["enqueued_at"]
+
+        return {
+            "screenings": len(self._stock),
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "persisted": self._persisted,
+            "batches": self._batches,
+            "flush_errors": self._flush_errors,
+            "flush_failures": self._flush_failures,
+            "last_flush_error": self._last_flush_error,
+            "suspended": self._suspended,
+            "suspensions": self._suspensions,
+            "replayed": self._replayed,
+            "journal_ops": self._journal_ops,
+            "journal_compactions": self._compactions,
+            "queue_lag_ops": seq - applied,
+            "queue_lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "last_flush_ms": round(self._last_flush_ms, 3)
+        }
@@ -0,0 +1,187 @@
+"""
+lock_manager.py
+
+Gerenciador de locks por sessão (screening) com striping.
+
+Substitui o lock global do servidor: cada sessão é mapeada para
+uma entre N "faixas" (stripes) de locks fixas, de modo que:
+
+- Compras de sessões diferentes raramente disputam o mesmo lock
+- Uma sessão muito disputada (estreia de blockbuster) só atrasa
+  os próprios compradores
+- O consumo de memória é limitado ao número de faixas,
+  independentemente da quantidade de sessões existentes
+
+Também mantém contadores de contenção (tempo de espera e tamanho
+da fila por faixa) e um ranking limitado das sessões mais disputadas.
+"""
+
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+
+class _Stripe:
+    """
+    Faixa de lock com seus contadores de contenção.
+    """
+
+    __slots__ = (
+        "lock", "stats_lock", "acquisitions", "contended",
+        "waiting", "max_waiting", "total_wait", "max_wait"
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+
+        self.acquisitions = 0   # Total de aquisições
+        self.contended = 0      # Aquisições que precisaram aguardar
+        self.waiting = 0        # Threads aguardando neste momento (fila)
+        self.max_waiting = 0    # Maior fila observada
+        self.total_wait = 0.0   # Tempo total de espera (segundos)
+        self.max_wait = 0.0     # Maior espera individual (segundos)
+
+
+class StripedLockManager:
+    """
+    Locks por chave com quantidade fixa de faixas.
+    """
+
+    def __init__(self, stripes=64, hot_keys_tracked=32):
+        """
+        stripes:
+            Número de faixas de lock (limite de memória).
+
+        hot_keys_tracked:
+            Quantidade máxima de chaves mantidas no ranking
+            de sessões disputadas.
+        """
+
+        self._stripes = [_Stripe() for _ in range(stripes)]
+
+        # Contagem de esperas por chave, com tamanho limitado
+        self._hot_keys = {}
+        self._hot_keys_tracked = hot_keys_tracked
+        self._hot_lock = threading.Lock()
+
+
+    def _stripe_index(self, key):
+        return hash(key) % len(self._stripes)
+
+
+    # ==========================================================
+    # Aquisição do lock
+    # ==========================================================
+
+    @contextmanager
+    def lock(self, key):
+        """
+        Adquire o lock da faixa correspondente à chave,
+        registrando a contenção quando houver espera.
+        """
+
+        stripe = self._stripes[self._stripe_index(key)]
+
+        # Caminho rápido: lock livre, sem contenção
+        if stripe.lock.acquire(blocking=False):
+            with stripe.stats_lock:
+                stripe.acquisitions += 1
+        else:
+            with stripe.stats_lock:
+                stripe.waiting += 1
+                stripe.max_waiting = max(stripe.max_waiting, stripe.waiting)
+
+            start = time.perf_counter()
+            stripe.lock.acquire()
+            waited = time.perf_counter() - start
+
+            with stripe.stats_lock:
+                stripe.waiting -= 1
+                stripe.acquisitions += 1
+                stripe.contended += 1
+                stripe.total_wait += waited
+                stripe.max_wait = max(stripe.max_wait, waited)
+
+            self._record_hot_key(key)
+
+        try:
+            yield
+        finally:
+            stripe.lock.release()
+
+
+    @contextmanager
+    def lock_many(self, keys):
+        """
+        Adquire os locks de várias chaves sempre na mesma ordem
+        (índice da faixa), evitando deadlock entre operações em lote.
+        """
+
+        ordered = {}
+        for key in keys:
+            ordered.setdefault(self._stripe_index(key), key)
+
+        with ExitStack() as stack:
+            for index in sorted(ordered):
+                stack.enter_context(self.lock(ordered[index]))
+            yield
+
+
+    def _record_hot_key(self, key):
+        """
+        Contabiliza espera para a chave, descartando a chave
+        menos disputada quando o ranking está cheio.
+        """
+
+        with self._hot_lock:
+            if key not in self._hot_keys and len(self._hot_keys) >= self._hot_keys_tracked:
+                coldest = min(self._hot_keys, key=self._hot_keys.get)
+                del self._hot_keys[coldest]
+
+            self._hot_keys[key] = self._hot_keys.get(key, 0) + 1
+
+
+    # ==========================================================
+    # Estatísticas
+    # ==========================================================
+
+    def stats(self):
+        """
+        Retorna os contadores de cada faixa que já foi utilizada.
+        """
+
+        result = []
+
+        for index, stripe in enumerate(self._stripes):
+            with stripe.stats_lock:
+                if not stripe.acquisitions and not stripe.waiting:
+                    continue
+
+                result.append({
+                    "stripe": index,
+                    "acquisitions": stripe.acquisitions,
+                    "contended": stripe.contended,
+                    "queue_depth": stripe.waiting,
+                    "max_queue_depth": stripe.max_waiting,
+                    "total_wait_ms": round(stripe.total_wait * 1000, 3),
+                    "max_wait_ms": round(stripe.max_wait * 1000, 3)
+                })
+
+        return result
+
+
+    def hot_keys(self, limit=10):
+        """
+        Retorna as chaves com mais esperas, da mais disputada
+        para a menos disputada.
+        """
+
+        with self._hot_lock:
+            ranking = sorted(
+                self._hot_keys.items(),
+                key=lambda item: item[1],
+                reverse=True
+            )
+
+        return ranking[:limit]
@@ -0,0 +1,343 @@
+"""
+metrics.py
+
+Telemetria de desempenho dos métodos remotos.
+
+Cada chamada a um método exposto é cronometrada e registrada em um
+histograma de latência com buckets fixos (memória constante,
+independente do número de chamadas), separado por resultado:
+
+- success           -> operação concluída
+- business_error    -> recusada por regra de negócio ou entrada inválida
+- internal_error    -> falha inesperada no servidor
+- deadline_exceeded -> descartada porque o prazo do cliente expirou
+
+O registro custa um log2 e um incremento sob lock, baixo o
+suficiente para manter a telemetria sempre ativa em produção.
+Também mantém contadores de vazão (total e janela recente) e um
+relatório compacto de carga (requisições em andamento e p99 recente),
+enviado ao Name Server para o roteamento por carga.
+"""
+
+import functools
+import math
+import threading
+import time
+
+
+OUTCOMES = ("success", "business_error", "internal_error", "deadline_exceeded")
+
+
+class LatencyHistogram:
+    """
+    Histograma com buckets logarítmicos: 4 buckets por potência de 2
+    (erro relativo máximo de ~19%), de 1 µs até ~18 minutos.
+    """
+
+    SUB_BUCKETS = 4
+    MAX_EXPONENT = 30
+
+    def __init__(self):
+        self._counts = [0] * (self.SUB_BUCKETS * self.MAX_EXPONENT + 1)
+        self._lock = threading.Lock()
+
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+    def _bucket(self, micros):
+        if micros <= 1:
+            return 0
+
+        index = math.ceil(math.log2(micros) * self.SUB_BUCKETS)
+        return min(index, len(self._counts) - 1)
+
+
+    def _upper_bound(self, index):
+        """
+        Limite superior do bucket, em segundos.
+        """
+
+        return 2 ** (index / self.SUB_BUCKETS) / 1_000_000
+
+
+    def record(self, seconds):
+        index = self._bucket(seconds * 1_000_000)
+
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+            if seconds > self.max:
+                self.max = seconds
+
+
+    def percentile(self, fraction, counts=None, count=None):
+        """
+        Latência (segundos) abaixo da qual estão fraction das chamadas.
+        """
+
+        if counts is None:
+            with self._lock:
+                counts, count = self._counts[:], self.count
+
+        if not count:
+            return 0.0
+
+        rank = max(1, math.ceil(count * fraction))
+        seen = 0
+
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+
+        return self.max
+
+
+    def merge(self, other):
+        """
+        Soma ao histograma as chamadas registradas em other.
+        """
+
+        with other._lock:
+            counts, count = other._counts[:], other.count
+            total, maximum = other.total, other.max
+
+        with self._lock:
+            for index, bucket_count in enumerate(counts):
+                self._counts[index] += bucket_count
+
+            self.count += count
+            self.total += total
+            self.max = max(self.max, maximum)
+
+
+    def snapshot(self):
+        """
+        Resumo do histograma, com latências em milissegundos.
+        """
+
+        with self._lock:
+            counts, count = self._counts[:], self.count
+            total, maximum = self.total, self.max
+
+        return {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(self.percentile(0.50, counts, count) * 1000, 3),
+            "p90_ms": round(self.percentile(0.90, counts, count) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99, counts, count) * 1000, 3),
+            "max_ms": round(maximum * 1000, 3)
+        }
+
+
+class RequestMetrics:
+    """
+    Histogramas por método e resultado, e contadores de vazão.
+    """
+
+    def __init__(self, window=60, recent_window=10):
+        """
+        window:
+            Janela (em segundos) da taxa de requisições recente.
+
+        recent_window:
+            Janela (em segundos) da latência recente do relatório de carga.
+        """
+
+        self.window = window
+        self.recent_window = recent_window
+        self.started_at = time.time()
+
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+        # Contadores por segundo da janela recente (buffer circular)
+        self._seconds = [0] * window
+        self._counts = [0] * window
+
+        self._local = threading.local()
+
+        # Requisições em andamento e latência recente (todas as chamadas):
+        # dois histogramas alternados cobrem entre 1 e 2 janelas
+        self._inflight = 0
+        self._recent = LatencyHistogram()
+        self._previous = LatencyHistogram()
+        self._recent_started = time.monotonic()
+
+
+    # ==========================================================
+    # Registro das chamadas
+    # ==========================================================
+
+    def timed(self, method):
+        """
+        Decorator para métodos expostos: cronometra a chamada e
+        classifica o resultado pelo status da resposta padrão.
+        """
+
+        name = method.__name__.removeprefix("exposed_")
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            self._local.internal_error = False
+            self._local.deadline_exceeded = False
+            start = time.perf_counter()
+
+            with self._lock:
+                self._inflight += 1
+
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                self.record(name, "internal_error", time.perf_counter() - start)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight -= 1
+
+            self.record(name, self._outcome(result), time.perf_counter() - start)
+            return result
+
+        return wrapper
+
+
+    def mark_internal_error(self):
+        """
+        Sinaliza que a resposta da chamada atual é de erro interno
+        (e não de regra de negócio), embora ambas usem status "error".
+        """
+
+        self._local.internal_error = True
+
+
+    def mark_deadline_exceeded(self):
+        """
+        Sinaliza que a chamada atual foi descartada por prazo expirado.
+        """
+
+        self._local.deadline_exceeded = True
+
+
+    def _outcome(self, result):
+        if getattr(self._local, "internal_error", False):
+            return "internal_error"
+
+        if getattr(self._local, "deadline_exceeded", False):
+            return "deadline_exceeded"
+
+        if isinstance(result, dict) and result.get("status") == "error":
+            return "business_error"
+
+        return "success"
+
+
+    def record(self, name, outcome, seconds):
+        key = (name, outcome)
+        histogram = self._histograms.get(key)
+
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+
+        histogram.record(seconds)
+
+        now = int(time.time())
+        slot = now % self.window
+
+        with self._lock:
+            if self._seconds[slot] != now:
+                self._seconds[slot] = now
+                self._counts[slot] = 0
+
+            self._counts[slot] += 1
+            recent = self._rotate()
+
+        recent.record(seconds)
+
+
+    def _rotate(self):
+        """
+        Alterna os histogramas da latência recente ao fim de cada
+        janela e retorna o atual (chamar com lock).
+        """
+
+        now = time.monotonic()
+        elapsed = now - self._recent_started
+
+        if elapsed >= self.recent_window:
+            # Mais de duas janelas sem chamadas: nada recente a reter
+            self._previous = self._recent if elapsed < 2 * self.recent_window else LatencyHistogram()
+            self._recent = LatencyHistogram()
+            self._recent_started = now
+
+        return self._recent
+
+
+    # ==========================================================
+    # Consulta
+    # ==========================================================
+
+    def load_report(self):
+        """
+        Relatório compacto de carga: requisições em andamento e p99
+        das chamadas recentes (0 sem chamadas recentes).
+        """
+
+        with self._lock:
+            self._rotate()
+            inflight = self._inflight
+            recent, previous = self._recent, self._previous
+
+        merged = LatencyHistogram()
+        merged.merge(previous)
+        merged.merge(recent)
+
+        return {
+            "inflight": inflight,
+            "p99_ms": round(merged.percentile(0.99) * 1000, 3)
+        }
+
+
+    def snapshot(self):
+        """
+        Retorna os histogramas por método e os contadores de vazão.
+        """
+
+        with self._lock:
+            histograms = dict(self._histograms)
+
+            now = int(time.time())
+            recent = sum(
+                count for second, count in zip(self._seconds, self._counts)
+                if now - second < self.window
+            )
+
+        methods = {}
+
+        for (name, outcome), histogram in sorted(histograms.items()):
+            methods.setdefault(name, {})[outcome] = histogram.snapshot()
+
+        for outcomes in methods.values():
+            outcomes["calls"] = sum(outcomes[o]["count"] for o in OUTCOMES if o in outcomes)
+
+        total = sum(outcomes["calls"] for outcomes in methods.values())
+        deadline_exceeded = sum(
+            outcomes["deadline_exceeded"]["count"]
+            for outcomes in methods.values() if "deadline_exceeded" in outcomes
+        )
+        uptime = time.time() - self.started_at
+
+        return {
+            "uptime_s": round(uptime, 1),
+            "requests": total,
+            "avg_rps": round(total / uptime, 3) if uptime else 0.0,
+            "recent_window_s": self.window,
+            "recent_rps": round(recent / self.window, 3),
+            "deadline_exceeded": deadline_exceeded,
+            "methods": methods
+        }
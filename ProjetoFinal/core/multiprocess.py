@@ -0,0 +1,162 @@
+"""
+multiprocess.py
+
+Estado compartilhado entre os processos workers do servidor.
+
+Um único processo Python é limitado pelo GIL, independentemente
+da quantidade de threads. No modo multiprocesso, N processos
+atendem conexões do mesmo socket de escuta; cada um tem seu próprio
+pool de conexões, cache do catálogo e locks. Este módulo fornece
+o pouco estado que precisa ser compartilhado entre eles:
+
+- Log de invalidações do catálogo: uma compra em um worker
+  invalida as entradas do cache de todos os outros
+- Quadro de estatísticas: cada worker publica seus contadores
+  em uma faixa de memória compartilhada, e qualquer worker
+  consegue agregar a visão de todos
+
+Os objetos devem ser criados no processo principal antes do fork.
+"""
+
+import os
+import threading
+import time
+
+
+class SharedInvalidationLog:
+    """
+    Buffer circular, em memória compartilhada, das sessões
+    cujo estoque mudou. Cada processo acompanha o próprio cursor
+    e aplica ao seu cache apenas as invalidações novas.
+    """
+
+    def __init__(self, ctx, capacity=1024):
+        """
+        ctx:
+            Contexto do multiprocessing (deve usar fork).
+
+        capacity:
+            Invalidações mantidas. Um processo que ficar mais
+            atrasado que isso descarta o cache inteiro.
+        """
+
+        self.capacity = capacity
+
+        self._write_lock = ctx.Lock()
+        self._seq = ctx.Value("Q", 0, lock=False)
+        self._ring = ctx.Array("q", capacity, lock=False)
+
+        # Cursor local: cada processo recebe sua própria cópia no fork
+        self._cursor = 0
+        self._cursor_lock = threading.Lock()
+
+
+    def publish(self, screening_id):
+        """
+        Registra que o estoque da sessão mudou.
+        """
+
+        with self._write_lock:
+            seq = self._seq.value
+            self._ring[seq % self.capacity] = screening_id
+            self._seq.value = seq + 1
+
+
+    def sync(self, cache):
+        """
+        Aplica ao cache local as invalidações publicadas desde a última
+        sincronização. Caminho rápido sem lock quando não há novidades.
+        """
+
+        if self._seq.value == self._cursor:
+            return
+
+        with self._cursor_lock:
+            with self._write_lock:
+                seq = self._seq.value
+
+                if seq - self._cursor > self.capacity:
+                    screening_ids = None
+                else:
+                    screening_ids = [
+                        self._ring[i % self.capacity] for i in range(self._cursor, seq)
+                    ]
+
+            if screening_ids is None:
+                cache.clear()
+            else:
+                for screening_id in set(screening_ids):
+                    cache.invalidate_tag(("screening", screening_id))
+
+            self._cursor = seq
+
+
+class SharedStatsBoard:
+    """
+    Contadores por worker em memória compartilhada.
+    Cada worker escreve apenas na própria faixa.
+    """
+
+    FIELDS = (
+        "pid", "connections", "cache_hits", "cache_misses", "cache_entries",
+        "lock_acquisitions", "lock_contended", "inflight", "busy_workers",
+        "p99_us", "updated_at"
+    )
+
+    # Campos que não fazem sentido somar na visão agregada
+    NOT_SUMMED = ("pid", "p99_us", "updated_at")
+
+    def __init__(self, ctx, processes):
+        self.processes = processes
+        self._slots = ctx.Array("d", processes * len(self.FIELDS))
+
+
+    def publish(self, index, values):
+        """
+        Publica os contadores do worker index (campos ausentes valem 0).
+        """
+
+        values = dict(values, pid=os.getpid(), updated_at=time.time())
+        offset = index * len(self.FIELDS)
+
+        with self._slots.get_lock():
+            for position, field in enumerate(self.FIELDS):
+                self._slots[offset + position] = values.get(field, 0)
+
+
+    def collect(self):
+        """
+        Retorna os contadores de cada worker e a soma entre todos.
+        """
+
+        with self._slots.get_lock():
+            raw = self._slots[:]
+
+        workers = []
+
+        for index in range(self.processes):
+            offset = index * len(self.FIELDS)
+            row = dict(zip(self.FIELDS, raw[offset:offset + len(self.FIELDS)]))
+
+            # Worker que ainda não publicou
+            if not row["pid"]:
+                continue
+
+            for field in self.FIELDS:
+                if field != "updated_at":
+                    row[field] = int(row[field])
+
+            row["worker"] = index
+            workers.append(row)
+
+        totals = {
+            field: sum(row[field] for row in workers)
+            for field in self.FIELDS if field not in self.NOT_SUMMED
+        }
+
+        return {
+            "processes": self.processes,
+            "reporting": len(workers),
+            "totals": totals,
+            "workers": workers
+        }
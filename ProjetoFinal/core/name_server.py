@@ -9,6 +9,17 @@ permitindo que:
 - Servidores registrem seus serviços dinamicamente
 - Clientes descubram serviços sem conhecer endereço fixo
 - Seja implementada transparência de localização
+- Várias instâncias de um serviço dividam os clientes
+  (round-robin, aleatório, menor carga, power-of-two-choices ou
+  sorteio ponderado pela carga informada)
+- Instâncias lentas ou sobrecarregadas recebam menos clientes, a
+  partir do relatório de carga enviado em cada heartbeat
+- Instâncias que param de enviar heartbeat saiam do registro
+  (lease vencido), sem que clientes recebam endereços mortos
+- Clientes assinem (watch) um serviço e recebam as mudanças de
+  topologia por callback, sem consultar o lookup periodicamente
+- O registro sobreviva a reinícios (journal + snapshot), sem que os
+  clientes fiquem sem endereço até os servidores se registrarem de novo
 
 Em um Sistema Distribuído, o Name Server desacopla cliente e servidor,
 evitando que o cliente precise saber previamente onde o serviço está
@@ -17,11 +28,20 @@ Ele funciona como um "registro central" de serviços.
 """
 
 
+import os
+
 import rpyc
 from rpyc.utils.server import ThreadedServer
-import threading
-from config import NAME_SERVER_PORT
+from config import (
+    NAME_SERVER_PORT, NAME_SERVER_LOOKUP_POLICY,
+    NAME_SERVER_LEASE_TTL, NAME_SERVER_SWEEP_INTERVAL,
+    NAME_SERVER_WATCH_QUEUE, NAME_SERVER_WATCH_TIMEOUT,
+    NAME_SERVER_STATE_DIR, NAME_SERVER_COMPACT_EVERY, NAME_SERVER_RESTORE_GRACE
+)
 from core.color_logger import setup_logger
+from core.registry import ServiceRegistry, LeaseSweeper, RegistrationConflict
+from core.registry_store import RegistryStore
+from core.watch import WatchHub
 
 
 # ======================================================
@@ -33,39 +53,194 @@ from core.color_logger import setup_logger
 logger = setup_logger("NameServer")
 
 
+def on_registry_change(service_name, event, host, port, load, exclusive):
+    """
+    Repassa cada mudança do registro aos assinantes e, se a
+    persistência estiver ativa, ao journal (com a exclusividade,
+    para que ela sobreviva a um reinício do Name Server).
+    """
+
+    NameService.watchers.publish(service_name, event, host, port, load)
+
+    if NameService.store:
+        NameService.store.append(event, service_name, host, port, exclusive)
+
+
 class NameService(rpyc.Service):
     """
     Classe que implementa o serviço de registro e descoberta.
+    Cada serviço pode ter várias instâncias; o lookup distribui
+    os clientes entre elas conforme a política de balanceamento.
     """
     
-    # Registro de serviços
-    registry = {}
-    lock = threading.Lock()  # Para proteger acesso concorrente ao registro
+    # Assinantes das mudanças do registro
+    watchers = WatchHub(
+        queue_size=NAME_SERVER_WATCH_QUEUE,
+        call_timeout=NAME_SERVER_WATCH_TIMEOUT
+    )
+    
+    # Registro de serviços (protegido por lock interno)
+    registry = ServiceRegistry(
+        policy=NAME_SERVER_LOOKUP_POLICY,
+        lease_ttl=NAME_SERVER_LEASE_TTL,
+        on_change=on_registry_change
+    )
+    
+    # Journal + snapshot do registro (definido na inicialização)
+    store = None
+    
+    def on_disconnect(self, conn):
+        """
+        Conexão encerrada: remove as assinaturas feitas por ela.
+        """
+        
+        NameService.watchers.unsubscribe_owner(self)
+    
     
-    def exposed_register(self, service_name, host, port):
+    def exposed_register(self, service_name, host, port, ttl=None, exclusive=False):
         """
         Permite que um servidor registre seu endereço.
+        Várias instâncias podem ser registradas com o mesmo nome.
+        
+        O registro vale por ttl segundos (padrão NAME_SERVER_LEASE_TTL)
+        e deve ser renovado com heartbeat antes de vencer.
+        
+        exclusive: o servidor não admite outras instâncias do serviço
+        (ex.: estoque em memória); o registro é recusado se houver outra.
+        
+        data["instances"] informa quantas instâncias o serviço tem.
         """
 
-        with NameService.lock:
-            NameService.registry[service_name] = (host, port)
+        if ttl is not None and (not isinstance(ttl, (int, float)) or isinstance(ttl, bool) or ttl <= 0):
+            return {
+                "status": "error",
+                "message": "Prazo do lease inválido"
+            }
 
-        # Logar o registro para monitoramento
-        logger.info(f"Serviço '{service_name}' registrado em {host}:{port}")
+        try:
+            added = NameService.registry.register(service_name, host, port, ttl, bool(exclusive))
+        except RegistrationConflict as e:
+            logger.warning(f"Registro de {host}:{port} recusado: {e}")
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+
+        if added:
+            # Logar o registro para monitoramento
+            logger.info(f"Serviço '{service_name}' registrado em {host}:{port}")
 
         return {
 			"status": "success",
-			"message": "Registro bem-sucedido"
+			"message": "Registro bem-sucedido",
+			"data": {"instances": len(NameService.registry.instances(service_name))}
 		}
 
 
-    def exposed_lookup(self, service_name):
+    def exposed_unregister(self, service_name, host, port):
+        """
+        Remove uma instância (ex.: servidor encerrado normalmente).
+        """
+
+        if not NameService.registry.unregister(service_name, host, port):
+            return {
+                "status": "error",
+                "message": "Instância não registrada"
+            }
+
+        logger.info(f"Serviço '{service_name}' removido de {host}:{port}")
+
+        return {
+            "status": "success",
+            "message": "Instância removida"
+        }
+
+
+    def exposed_heartbeat(self, service_name, host, port, load=None, report=None):
+        """
+        Renova o lease de uma instância e, opcionalmente, informa sua carga.
+        
+        report (opcional): relatório compacto de carga, tupla
+        (inflight, utilization, p99_ms) -> requisições em andamento,
+        fração dos workers ocupados e p99 recente em ms. Quando
+        informado, define a carga usada no roteamento.
+        
+        Erro indica lease vencido ou desconhecido: a instância deve se
+        registrar novamente. data["instances"] informa quantas
+        instâncias o serviço tem.
+        """
+
+        if load is not None and (not isinstance(load, (int, float)) or isinstance(load, bool) or load < 0):
+            load = None
+
+        if report is not None:
+            report = self._parse_report(report)
+
+        if not NameService.registry.renew(service_name, host, port, load, report):
+            return {
+                "status": "error",
+                "message": "Lease inexistente ou vencido"
+            }
+
+        return {
+            "status": "success",
+            "message": "Lease renovado",
+            "data": {"instances": len(NameService.registry.instances(service_name))}
+        }
+
+
+    @staticmethod
+    def _parse_report(report):
+        """
+        Converte o relatório (inflight, utilization, p99_ms) em dict,
+        ou None se for inválido (o heartbeat segue valendo).
+        """
+
+        if not isinstance(report, tuple) or len(report) != 3:
+            return None
+
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and v >= 0 for v in report):
+            return None
+
+        inflight, utilization, p99_ms = report
+
+        return {"inflight": inflight, "utilization": utilization, "p99_ms": p99_ms}
+
+
+    def exposed_report_load(self, service_name, host, port, load):
+        """
+        Recebe a carga atual de uma instância (usada pela política least_loaded).
+        """
+
+        if not isinstance(load, (int, float)) or isinstance(load, bool) or load < 0:
+            return {
+                "status": "error",
+                "message": "Carga inválida"
+            }
+
+        if not NameService.registry.report_load(service_name, host, port, load):
+            return {
+                "status": "error",
+                "message": "Instância não registrada"
+            }
+
+        return {
+            "status": "success",
+            "message": "Carga atualizada"
+        }
+
+
+    def exposed_lookup(self, service_name, policy=None):
         """
         Permite que o cliente descubra o endereco de servico.
+        policy (opcional): round_robin, random, least_loaded, p2c ou weighted.
         """
         
-        with NameService.lock:
-            address = NameService.registry.get(service_name)
+        try:
+            address = NameService.registry.lookup(service_name, policy)
+        except ValueError as e:
+            logger.warning(str(e))
+            return None
         
         if address:
             # Logar a consulta para monitoramento
@@ -78,6 +253,45 @@ class NameService(rpyc.Service):
         return None
 
 
+    def exposed_watch(self, service_name, callback):
+        """
+        Assina as mudanças do serviço. callback(service_name, event,
+        host, port, load) é chamado a cada instância adicionada
+        ("added"), removida ("removed") ou com nova carga ("load").
+        
+        Retorna (watch_id, instâncias atuais como (host, port, load)).
+        A assinatura termina com unwatch ou quando a conexão cai.
+        """
+
+        if not callable(callback):
+            return None
+
+        # Assinar antes de listar: nenhuma mudança fica entre os dois
+        watch_id = NameService.watchers.subscribe(service_name, callback, owner=self)
+        logger.info(f"Assinatura {watch_id} do serviço '{service_name}'.")
+
+        return watch_id, self.exposed_list_instances(service_name)
+
+
+    def exposed_unwatch(self, watch_id):
+        """
+        Cancela uma assinatura.
+        """
+
+        return NameService.watchers.unsubscribe(watch_id)
+
+
+    def exposed_list_instances(self, service_name):
+        """
+        Retorna as instâncias do serviço como tuplas (host, port, load).
+        """
+
+        return tuple(
+            (instance["host"], instance["port"], instance["load"])
+            for instance in NameService.registry.instances(service_name)
+        )
+
+
 # ======================================================
 # Inicialização do Name Server
 # ======================================================
@@ -88,6 +302,20 @@ if __name__ == "__main__":
     logger.info("Name Server iniciando...")
     logger.info("==================================")
     
+    # Restaurar o registro anterior (instâncias provisórias até o heartbeat)
+    store = RegistryStore(
+        os.environ.get("CINEMA_NAME_SERVER_STATE", NAME_SERVER_STATE_DIR),
+        compact_every=NAME_SERVER_COMPACT_EVERY
+    )
+    restored = NameService.registry.restore(store.open(), grace=NAME_SERVER_RESTORE_GRACE)
+    NameService.store = store
+    
+    logger.info(f"{restored} instâncias restauradas do journal em {store.last_load_ms:.1f} ms.")
+    
+    # Remover periodicamente as instâncias com lease vencido
+    sweeper = LeaseSweeper(NameService.registry, interval=NAME_SERVER_SWEEP_INTERVAL)
+    sweeper.start()
+    
     # Iniciar o servidor de nomes para atender às requisições de registro e consulta
     server = ThreadedServer(
         NameService,
@@ -96,4 +324,8 @@ if __name__ == "__main__":
         reuse_addr=True
     )
     
-    server.start()
\ No newline at end of file
+    try:
+        server.start()
+    finally:
+        sweeper.stop()
+        store.close()
\ No newline at end of file
@@ -0,0 +1,541 @@
+"""
+registry.py
+
+Registro de serviços do Name Server com várias instâncias por serviço.
+
+Cada nome de serviço pode ter várias instâncias (host, porta)
+registradas; registrar novamente o mesmo endereço apenas o atualiza.
+A consulta (lookup) escolhe uma instância conforme a política:
+
+- round_robin  -> alterna entre as instâncias, em ordem de registro
+- random       -> escolha aleatória uniforme
+- least_loaded -> menor carga informada pelas instâncias (empates
+                  alternados em round-robin; instância sem informe
+                  conta como carga 0)
+- p2c          -> power-of-two-choices: sorteia duas instâncias e
+                  escolhe a de menor carga (evita que todos os
+                  clientes corram para a mesma instância)
+- weighted     -> sorteio com peso inversamente proporcional à carga
+
+Assim, adicionar servidores aumenta a capacidade sem alterar clientes.
+
+A carga de uma instância é um número informado por ela (ex.: conexões
+ativas) ou, quando o heartbeat traz um relatório de carga (requisições
+em andamento, utilização dos workers e p99 recente), o custo de
+roteamento calculado a partir dele: instâncias lentas ou sobrecarregadas
+passam a receber menos tráfego automaticamente.
+
+Cada registro é um lease (concessão) com prazo: a instância precisa
+renová-lo periodicamente (heartbeat). Um lease vencido nunca é
+retornado pelo lookup, e o LeaseSweeper remove as instâncias vencidas
+(ex.: servidor que caiu sem cancelar o registro).
+
+Cada mudança (instância adicionada, removida ou com nova carga) é
+repassada à função on_change, usada pelas assinaturas (watch) e pelo
+journal do registro (RegistryStore). Os eventos são enfileirados ainda
+com o lock do registro e entregues fora dele, na mesma ordem em que o
+estado mudou (ex.: a remoção de um lease vencido nunca chega depois do
+novo registro da mesma instância).
+
+Uma instância pode se registrar como exclusiva (ex.: servidor com
+estoque e holds em memória, que não podem ser divididos com outra
+instância do mesmo banco): enquanto ela tiver lease válido, nenhuma
+outra instância do serviço é aceita, e ela é recusada se já houver
+outra registrada.
+
+Instâncias restauradas do journal após reiniciar o Name Server são
+provisórias: continuam sendo retornadas (os clientes não ficam sem
+endereço), mas o lookup prefere as confirmadas, e elas vencem ao fim
+do prazo de carência se o dono não enviar heartbeat.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+from core.color_logger import setup_logger
+
+
+logger = setup_logger("Registry")
+
+
+POLICIES = ("round_robin", "random", "least_loaded", "p2c", "weighted")
+
+# Variação relativa mínima da carga para notificar os assinantes
+# (relatórios mudam a cada heartbeat; pequenas oscilações não geram eventos)
+LOAD_EVENT_CHANGE = 0.1
+
+
+class RegistrationConflict(Exception):
+    """
+    Registro recusado: o serviço já tem instância e uma das duas é exclusiva.
+    """
+
+
+def routing_cost(report):
+    """
+    Custo de roteamento de um relatório de carga: tempo esperado de
+    atendimento (requisições na frente x p99 recente), ampliado conforme
+    a utilização dos workers se aproxima de 100%. Instância ociosa e
+    sem latência recente custa 1.
+    """
+
+    inflight = report.get("inflight") or 0
+    p99_ms = max(report.get("p99_ms") or 0, 1.0)
+    utilization = min(report.get("utilization") or 0, 0.95)
+
+    return round((inflight + 1) * p99_ms / (1 - utilization), 3)
+
+
+def power_of_two(candidates, key):
+    """
+    Power-of-two-choices: sorteia dois candidatos e retorna o de menor
+    key (em empate, o que aparece primeiro na lista).
+    """
+
+    if len(candidates) == 1:
+        return candidates[0]
+
+    first, second = sorted(random.sample(range(len(candidates)), 2))
+    a, b = candidates[first], candidates[second]
+
+    return b if key(b) < key(a) else a
+
+
+def _significant(old, new):
+    return old is None or abs(new - old) > LOAD_EVENT_CHANGE * max(abs(old), 1)
+
+
+class ServiceRegistry:
+    """
+    Instâncias registradas por nome de serviço, seguras entre threads.
+    """
+
+    def __init__(self, policy="round_robin", lease_ttl=6, on_change=None):
+        """
+        policy:
+            Política padrão de escolha de instância no lookup.
+
+        lease_ttl:
+            Segundos de validade do registro sem heartbeat.
+
+        on_change:
+            Função opcional on_change(service_name, event, host, port, load,
+            exclusive), com event "added", "removed" ou "load", chamada
+            fora do lock, na ordem das mudanças.
+        """
+
+        if policy not in POLICIES:
+            raise ValueError(f"Política de balanceamento desconhecida: {policy}")
+
+        self.policy = policy
+        self.lease_ttl = lease_ttl
+        self.on_change = on_change
+
+        # service_name -> {(host, port): instância}, em ordem de registro
+        self._services = {}
+
+        # Posição do round-robin por serviço
+        self._cursors = {}
+
+        self._lock = threading.Lock()
+
+        # Eventos na ordem das mudanças (enfileirados com _lock) e lock
+        # que serializa a entrega, sem segurar o lock do registro
+        self._events = deque()
+        self._deliver_lock = threading.Lock()
+
+
+    # ==========================================================
+    # Registro
+    # ==========================================================
+
+    def register(self, service_name, host, port, ttl=None, exclusive=False):
+        """
+        Registra (ou atualiza) uma instância com um lease de ttl
+        segundos (padrão: lease_ttl). Retorna True se for nova.
+
+        exclusive: a instância não admite outras no serviço. Lança
+        RegistrationConflict se ela ou uma instância já registrada
+        (com lease válido, inclusive provisória) for exclusiva.
+        """
+
+        address = (host, port)
+        now = time.time()
+        ttl = ttl or self.lease_ttl
+
+        with self._lock:
+            instances = self._services.setdefault(service_name, {})
+            instance = instances.get(address)
+
+            others = [
+                other for other_address, other in instances.items()
+                if other_address != address and other["expires_at"] > now
+            ]
+
+            if others and (exclusive or any(other["exclusive"] for other in others)):
+                raise RegistrationConflict(
+                    f"Serviço '{service_name}' já tem {len(others)} instância(s) "
+                    f"e não admite instâncias simultâneas com estado em memória"
+                )
+
+            if instance and instance["expires_at"] > now:
+                instance["ttl"] = ttl
+                instance["expires_at"] = now + ttl
+                instance["provisional"] = False
+                instance["exclusive"] = exclusive
+                return False
+
+            instances[address] = {
+                "host": host,
+                "port": port,
+                "load": None,
+                "report": None,
+                "notified_load": None,
+                "registered_at": now,
+                "load_reported_at": None,
+                "ttl": ttl,
+                "expires_at": now + ttl,
+                "provisional": False,
+                "exclusive": exclusive
+            }
+
+            # Lease vencido ainda não varrido: a instância antiga saiu
+            if instance:
+                self._emit(service_name, "removed", host, port, instance["load"])
+
+            self._emit(service_name, "added", host, port, None, exclusive)
+
+        self._deliver()
+        return True
+
+
+    def renew(self, service_name, host, port, load=None, report=None):
+        """
+        Heartbeat: renova o lease da instância e, se informada, atualiza
+        a carga. report (dict com inflight, utilization e p99_ms)
+        substitui load pelo custo de roteamento. Retorna False se a
+        instância não estiver registrada ou se o lease já venceu (ela
+        deve se registrar novamente).
+        """
+
+        now = time.time()
+
+        if report is not None:
+            load = routing_cost(report)
+
+        with self._lock:
+            instance = self._services.get(service_name, {}).get((host, port))
+
+            if instance is None or instance["expires_at"] <= now:
+                return False
+
+            instance["expires_at"] = now + instance["ttl"]
+            instance["provisional"] = False
+
+            if report is not None:
+                instance["report"] = dict(report)
+
+            if load is not None and self._set_load(instance, load, now):
+                self._emit(service_name, "load", host, port, load)
+
+        self._deliver()
+        return True
+
+
+    def restore(self, entries, grace=None):
+        """
+        Recria instâncias gravadas antes de reiniciar o Name Server, como
+        provisórias e com lease de grace segundos (padrão: lease_ttl).
+        O primeiro heartbeat (ou registro) do dono as confirma.
+
+        entries: (service_name, host, port, exclusive); instâncias
+        exclusivas continuam recusando outras durante a carência.
+        Não gera eventos. Retorna o número de instâncias restauradas.
+        """
+
+        now = time.time()
+        grace = grace or self.lease_ttl
+        restored = 0
+
+        with self._lock:
+            for service_name, host, port, exclusive in entries:
+                instances = self._services.setdefault(service_name, {})
+
+                if (host, port) in instances:
+                    continue
+
+                instances[(host, port)] = {
+                    "host": host,
+                    "port": port,
+                    "load": None,
+                    "report": None,
+                    "notified_load": None,
+                    "registered_at": now,
+                    "load_reported_at": None,
+                    "ttl": self.lease_ttl,
+                    "expires_at": now + grace,
+                    "provisional": True,
+                    "exclusive": exclusive
+                }
+                restored += 1
+
+        return restored
+
+
+    def unregister(self, service_name, host, port):
+        """
+        Remove uma instância. Retorna False se ela não estava registrada.
+        """
+
+        with self._lock:
+            instances = self._services.get(service_name, {})
+            instance = instances.pop((host, port), None)
+
+            if instance is None:
+                return False
+
+            if not instances:
+                del self._services[service_name]
+                self._cursors.pop(service_name, None)
+
+            self._emit(service_name, "removed", host, port, instance["load"])
+
+        self._deliver()
+        return True
+
+
+    def report_load(self, service_name, host, port, load):
+        """
+        Atualiza a carga informada por uma instância.
+        Retorna False se a instância não estiver registrada.
+        """
+
+        with self._lock:
+            instance = self._services.get(service_name, {}).get((host, port))
+
+            if instance is None:
+                return False
+
+            if self._set_load(instance, load, time.time()):
+                self._emit(service_name, "load", host, port, load)
+
+        self._deliver()
+        return True
+
+
+    def _set_load(self, instance, load, now):
+        """
+        Atualiza a carga (chamar com lock). Retorna True se a mudança
+        em relação à última notificada for significativa.
+        """
+
+        instance["load"] = load
+        instance["load_reported_at"] = now
+
+        if not _significant(instance["notified_load"], load):
+            return False
+
+        instance["notified_load"] = load
+        return True
+
+
+    # ==========================================================
+    # Consulta
+    # ==========================================================
+
+    def lookup(self, service_name, policy=None):
+        """
+        Retorna o endereço (host, port) de uma instância escolhida pela
+        política (padrão: a do registro), ou None se não houver nenhuma.
+        Instâncias provisórias só são escolhidas se não houver confirmadas.
+        """
+
+        policy = policy or self.policy
+
+        if policy not in POLICIES:
+            raise ValueError(f"Política de balanceamento desconhecida: {policy}")
+
+        now = time.time()
+
+        with self._lock:
+            # Leases vencidos nunca são retornados, mesmo antes da varredura
+            instances = [
+                instance for instance in self._services.get(service_name, {}).values()
+                if instance["expires_at"] > now
+            ]
+
+            if not instances:
+                return None
+
+            confirmed = [instance for instance in instances if not instance["provisional"]]
+            instances = confirmed or instances
+
+            if policy == "random":
+                chosen = random.choice(instances)
+
+            elif policy == "weighted":
+                weights = [1 / (1 + (instance["load"] or 0)) for instance in instances]
+                chosen = random.choices(instances, weights=weights)[0]
+
+            else:
+                cursor = self._cursors.get(service_name, 0)
+                self._cursors[service_name] = cursor + 1
+
+                # Lista rotacionada: em empates, min() também alterna
+                start = cursor % len(instances)
+                rotated = instances[start:] + instances[:start]
+
+                if policy == "round_robin":
+                    chosen = rotated[0]
+                elif policy == "p2c":
+                    chosen = power_of_two(rotated, lambda instance: instance["load"] or 0)
+                else:
+                    chosen = min(rotated, key=lambda instance: instance["load"] or 0)
+
+            return chosen["host"], chosen["port"]
+
+
+    def instances(self, service_name):
+        """
+        Retorna cópias das instâncias com lease válido para o serviço.
+        """
+
+        now = time.time()
+
+        with self._lock:
+            return [
+                dict(instance) for instance in self._services.get(service_name, {}).values()
+                if instance["expires_at"] > now
+            ]
+
+
+    def sweep(self, now=None):
+        """
+        Remove as instâncias com lease vencido.
+        Retorna a lista de (service_name, host, port) removidos.
+        """
+
+        now = now or time.time()
+        removed = []
+
+        with self._lock:
+            for service_name, instances in list(self._services.items()):
+                for address, instance in list(instances.items()):
+                    if instance["expires_at"] <= now:
+                        del instances[address]
+                        removed.append((service_name, *address))
+                        self._emit(service_name, "removed", *address, None)
+
+                if not instances:
+                    del self._services[service_name]
+                    self._cursors.pop(service_name, None)
+
+        self._deliver()
+        return removed
+
+
+    def _emit(self, service_name, event, host, port, load, exclusive=False):
+        """
+        Enfileira um evento (chamar com lock): a ordem da fila é a
+        ordem das mudanças no registro.
+        """
+
+        if self.on_change:
+            self._events.append((service_name, event, host, port, load, exclusive))
+
+
+    def _deliver(self):
+        """
+        Entrega os eventos enfileirados, em ordem (chamar sem o lock do
+        registro). Uma thread pode entregar também os eventos de outras;
+        ao retornar, os eventos da chamada atual já foram entregues.
+        """
+
+        with self._deliver_lock:
+            while self._events:
+                self.on_change(*self._events.popleft())
+
+
+    def services(self):
+        """
+        Retorna o número de instâncias de cada serviço.
+        """
+
+        with self._lock:
+            return {name: len(instances) for name, instances in self._services.items()}
+
+
+class LeaseSweeper:
+    """
+    Thread que remove periodicamente do registro as instâncias
+    cujo lease venceu.
+    """
+
+    def __init__(self, registry, interval=1):
+        """
+        registry:
+            ServiceRegistry a ser varrido.
+
+        interval:
+            Intervalo (em segundos) entre as varreduras.
+        """
+
+        self.registry = registry
+        self.interval = interval
+
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Contadores
+        self.runs = 0
+        self.evicted = 0
+        self.errors = 0
+
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        self._stop.set()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+    def run_once(self):
+        """
+        Executa uma varredura imediatamente.
+        """
+
+        removed = self.registry.sweep()
+        self.runs += 1
+        self.evicted += len(removed)
+
+        for service_name, host, port in removed:
+            logger.warning(f"Lease de '{service_name}' em {host}:{port} expirou; instância removida.")
+
+        return removed
+
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Erro ao varrer leases: {e}")
+
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "evicted": self.evicted,
+            "errors": self.errors
+        }
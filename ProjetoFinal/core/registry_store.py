@@ -0,0 +1,276 @@
+"""
+registry_store.py
+
+Persistência do registro do Name Server entre reinicializações.
+
+Sem persistência, reiniciar o Name Server esvazia o registro: até que
+cada servidor se registre novamente, todos os lookups falham. Este
+módulo guarda as instâncias registradas em dois arquivos:
+
+- Journal append-only: cada instância adicionada ou removida é
+  gravada como uma linha JSON (heartbeats e cargas não são gravados)
+- Snapshot compactado: a cada compact_every operações, o estado
+  atual é gravado de forma atômica (arquivo temporário + rename) e o
+  journal é reiniciado
+
+Na inicialização, o snapshot é carregado e o journal reaplicado sobre
+ele (milissegundos, sem rede nem banco). As operações são idempotentes:
+uma queda entre o rename do snapshot e o reinício do journal apenas
+reaplica operações já refletidas.
+
+O estado restaurado é só uma indicação: o registro trata essas
+instâncias como provisórias até o heartbeat do dono confirmá-las.
+"""
+
+import json
+import os
+import threading
+import time
+
+from core.color_logger import setup_logger
+
+
+logger = setup_logger("RegistryStore")
+
+
+SNAPSHOT_VERSION = 2
+
+
+class RegistryStore:
+    """
+    Journal + snapshot das instâncias registradas, seguro entre threads.
+    """
+
+    def __init__(self, directory, compact_every=500, fsync=False):
+        """
+        directory:
+            Pasta dos arquivos registry.snapshot.json e registry.journal.
+
+        compact_every:
+            Operações no journal antes de gravar um novo snapshot.
+
+        fsync:
+            Se True, força gravação em disco do journal a cada operação.
+        """
+
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, "registry.snapshot.json")
+        self.journal_path = os.path.join(directory, "registry.journal")
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        # service_name -> {(host, port): exclusive}, em ordem de registro
+        self._state = {}
+        self._journal = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.appended = 0
+        self.compactions = 0
+        self.replayed = 0
+        self.errors = 0
+        self.last_load_ms = 0.0
+
+
+    # ==========================================================
+    # Inicialização e recuperação
+    # ==========================================================
+
+    def open(self):
+        """
+        Carrega o snapshot, reaplica o journal, compacta o resultado e
+        abre o journal para novas operações.
+        Retorna a lista de (service_name, host, port, exclusive) restaurados.
+        """
+
+        started = time.perf_counter()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        with self._lock:
+            self._state = self._read_snapshot()
+
+            for op in self._read_journal():
+                self._apply(op)
+                self.replayed += 1
+
+            # Journal reaplicado: o snapshot passa a refletir tudo
+            self._compact()
+
+            entries = [
+                (service_name, host, port, exclusive)
+                for service_name, addresses in self._state.items()
+                for (host, port), exclusive in addresses.items()
+            ]
+
+        self.last_load_ms = (time.perf_counter() - started) * 1000
+
+        return entries
+
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return {}
+
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as snapshot:
+                data = json.load(snapshot)
+        except (OSError, json.JSONDecodeError) as e:
+            # Snapshot ilegível: as instâncias voltam pelos heartbeats
+            logger.error(f"Snapshot do registro ignorado: {e}")
+            return {}
+
+        # Versão 1 não guardava a exclusividade: as instâncias voltam
+        # como não exclusivas até o próximo registro do dono
+        if data.get("version") not in (1, SNAPSHOT_VERSION):
+            logger.error(f"Versão de snapshot do registro desconhecida: {data.get('version')}")
+            return {}
+
+        state = {}
+
+        for service_name, host, port, *exclusive in data["instances"]:
+            state.setdefault(service_name, {})[(host, port)] = bool(exclusive and exclusive[0])
+
+        return state
+
+
+    def _read_journal(self):
+        """
+        Lê as operações do journal, ignorando uma última linha incompleta.
+        """
+
+        if not os.path.exists(self.journal_path):
+            return []
+
+        operations = []
+
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    operations.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # Gravação interrompida pela queda
+
+        return operations
+
+
+    def _apply(self, op):
+        """
+        Aplica uma operação ao estado (chamar com lock).
+        """
+
+        address = (op["host"], op["port"])
+
+        if op["event"] == "added":
+            self._state.setdefault(op["service"], {})[address] = op.get("exclusive", False)
+
+        elif op["event"] == "removed":
+            addresses = self._state.get(op["service"], {})
+            addresses.pop(address, None)
+
+            if not addresses:
+                self._state.pop(op["service"], None)
+
+
+    # ==========================================================
+    # Gravação
+    # ==========================================================
+
+    def append(self, event, service_name, host, port, exclusive=False):
+        """
+        Grava uma instância adicionada ("added", com a exclusividade) ou
+        removida ("removed"); outros eventos (ex.: "load") são ignorados.
+        Falhas de disco são registradas no log, sem afetar o registro.
+        """
+
+        if event not in ("added", "removed"):
+            return
+
+        op = {"event": event, "service": service_name, "host": host, "port": port}
+
+        if event == "added":
+            op["exclusive"] = bool(exclusive)
+
+        with self._lock:
+            if self._journal is None:
+                return
+
+            try:
+                self._apply(op)
+
+                self._journal.write(json.dumps(op) + "\n")
+                self._journal.flush()
+                if self.fsync:
+                    os.fsync(self._journal.fileno())
+
+                self.appended += 1
+                self._pending += 1
+
+                if self._pending >= self.compact_every:
+                    self._compact()
+
+            except OSError as e:
+                self.errors += 1
+                logger.error(f"Erro ao gravar o journal do registro: {e}")
+
+
+    def _compact(self):
+        """
+        Grava o snapshot do estado atual e reinicia o journal (chamar com lock).
+        """
+
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": time.time(),
+            "instances": [
+                [service_name, host, port, exclusive]
+                for service_name, addresses in self._state.items()
+                for (host, port), exclusive in addresses.items()
+            ]
+        }
+
+        temp_path = self.snapshot_path + ".tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as snapshot:
+            json.dump(data, snapshot)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+
+        os.replace(temp_path, self.snapshot_path)
+
+        if self._journal:
+            self._journal.close()
+
+        self._journal = open(self.journal_path, "w", encoding="utf-8")
+        self._pending = 0
+        self.compactions += 1
+
+
+    def close(self):
+        """
+        Compacta o estado final e fecha o journal.
+        """
+
+        with self._lock:
+            if self._journal is None:
+                return
+
+            try:
+                self._compact()
+            finally:
+                self._journal.close()
+                self._journal = None
+
+
+    def stats(self):
+        with self._lock:
+            return {
+                "instances": sum(len(addresses) for addresses in self._state.values()),
+                "appended": self.appended,
+                "pending": self._pending,
+                "compactions": self.compactions,
+                "replayed": self.replayed,
+                "errors": self.errors,
+                "last_load_ms": round(self.last_load_ms, 3)
+            }
@@ -0,0 +1,256 @@
+"""
+replica.py
+
+Sincronização das réplicas de leitura com o servidor principal.
+
+Uma réplica mantém uma cópia local do banco e atende apenas
+consultas (filmes, sessões e compras por e-mail), aliviando o
+servidor principal. Esta thread de fundo mantém a cópia atualizada:
+
+- Na primeira execução (ou se ficar atrasada demais), copia as
+  tabelas completas do servidor principal, em páginas de batch_size
+  linhas, e aplica as alterações feitas durante a cópia
+- Depois, busca periodicamente apenas as linhas alteradas desde a
+  última posição aplicada do log de replicação
+- Mede a defasagem (staleness): segundos desde a última vez em
+  que a réplica esteve em dia com o servidor principal
+"""
+
+import threading
+import time
+
+from core import database
+from core.color_logger import setup_logger
+from serialization import decode
+
+
+logger = setup_logger("Replica")
+
+
+class ReplicaSync:
+    """
+    Aplica na base local as alterações do servidor principal.
+    """
+
+    def __init__(self, connect_primary, secret=None, interval=1, batch_size=1000, on_change=None):
+        """
+        connect_primary:
+            Função que retorna uma conexão RPyC com o servidor principal.
+
+        secret:
+            Segredo compartilhado exigido pelos métodos de replicação
+            do servidor principal.
+
+        interval:
+            Intervalo (em segundos) entre as sincronizações.
+
+        batch_size:
+            Máximo de alterações buscadas por chamada.
+
+        on_change:
+            Função opcional chamada após cada aplicação com
+            (sessões alteradas, filmes alterados); sessões None indica
+            cópia completa (ex.: invalidar o cache do catálogo).
+        """
+
+        self.connect_primary = connect_primary
+        self.secret = secret
+        self.interval = interval
+        self.batch_size = batch_size
+        self.on_change = on_change
+
+        self._conn = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Instante (relógio local) em que a réplica esteve em dia pela última vez
+        self.synced_at = None
+        self.synced = threading.Event()
+        self.seq = 0
+        self.primary_seq = 0
+
+        # Contadores
+        self.snapshots = 0
+        self.batches = 0
+        self.changes = 0
+        self.errors = 0
+
+
+    def start(self):
+        """
+        Sincroniza uma vez (se o principal estiver acessível)
+        e inicia a thread de sincronização periódica. O evento
+        synced é marcado na primeira sincronização concluída.
+        """
+
+        # Réplica que nunca sincronizou pede uma cópia completa (posição -1)
+        seq, synced_at = database.get_replication_state()
+        self.seq = seq if synced_at else -1
+
+        try:
+            self.sync_once()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Sincronização inicial falhou, réplica defasada: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        self._stop.set()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+        self._close()
+
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync_once()
+            except Exception as e:
+                self.errors += 1
+                self._close()
+                logger.error(f"Erro ao sincronizar com o servidor principal: {e}")
+
+
+    def _close(self):
+        if self._conn:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            finally:
+                self._conn = None
+
+
+    # ==========================================================
+    # Sincronização
+    # ==========================================================
+
+    def _call(self, method_name, *args):
+        if self._conn is None:
+            self._conn = self.connect_primary()
+
+        result = decode(getattr(self._conn.root, method_name)(self.secret, *args))
+
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+
+        return result["data"]
+
+
+    def sync_once(self):
+        """
+        Aplica as alterações pendentes até alcançar o servidor principal.
+        """
+
+        while True:
+            # Início da consulta: as alterações recebidas incluem tudo
+            # que o principal confirmou até este instante
+            started = time.time()
+            data = self._call("replication_changes", self.seq, self.batch_size)
+
+            if data["resync"]:
+                self.seq = database.apply_replication_snapshot(
+                    self._snapshot_pages(), self._catch_up
+                )
+                self.primary_seq = max(self.primary_seq, self.seq)
+                self.snapshots += 1
+
+                if self.on_change:
+                    self.on_change(None, True)
+
+                logger.info(f"Réplica recebeu cópia completa (posição {self.seq}).")
+                self.synced_at = started
+                self.synced.set()
+                return
+
+            if data["changes"]:
+                screenings, movies_changed = database.apply_replication_changes(
+                    data["upto"], data["columns"], data["changes"]
+                )
+
+                self.batches += 1
+                self.changes += len(data["changes"])
+
+                if self.on_change:
+                    self.on_change(screenings, movies_changed)
+
+            self.seq = data["upto"]
+            self.primary_seq = data["head"]
+
+            if self.seq >= self.primary_seq:
+                self.synced_at = started
+                self.synced.set()
+                return
+
+
+    def _snapshot_pages(self):
+        """
+        Páginas da cópia completa, tabela a tabela, em ordem de id.
+        """
+
+        for table in database.REPLICATED_TABLES:
+            after_id = 0
+
+            while True:
+                page = self._call("replication_snapshot", table, after_id, self.batch_size)
+                yield page["seq"], table, page["columns"], page["rows"]
+
+                if len(page["rows"]) < self.batch_size:
+                    break
+
+                after_id = page["rows"][-1][page["columns"].index("id")]
+
+
+    def _catch_up(self, seq):
+        """
+        Lotes de alterações feitas no principal durante a cópia completa.
+        """
+
+        while True:
+            data = self._call("replication_changes", seq, self.batch_size)
+
+            if data["resync"]:
+                raise RuntimeError("Log de replicação descartado durante a cópia completa.")
+
+            yield data
+
+            seq = data["upto"]
+            self.primary_seq = data["head"]
+
+            if seq >= data["head"]:
+                return
+
+
+    # ==========================================================
+    # Defasagem e estatísticas
+    # ==========================================================
+
+    def staleness(self):
+        """
+        Segundos desde que a réplica esteve em dia (None se nunca esteve).
+        """
+
+        if self.synced_at is None:
+            return None
+
+        return round(time.time() - self.synced_at, 3)
+
+
+    def stats(self):
+        return {
+            "seq": self.seq,
+            "primary_seq": self.primary_seq,
+            "lag_changes": self.primary_seq - self.seq,
+            "staleness_s": self.staleness(),
+            "snapshots": self.snapshots,
+            "batches": self.batches,
+            "changes": self.changes,
+            "errors": self.errors
+        }
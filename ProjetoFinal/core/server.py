@@ -20,16 +20,51 @@ pelos clientes como se fossem funções locais (transparência de acesso).
 
 import rpyc
 from rpyc.utils.server import ThreadedServer
-import time
+import base64
+import functools
+import hmac
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import signal
 import threading
+import time
+import uuid
 
 from core import database
+from core.cache import CatalogCache
+from core.group_commit import GroupCommitter
+from core.holds import HoldReaper
+from core.inventory import InventoryEngine
+from core.lock_manager import StripedLockManager
+from core.metrics import RequestMetrics
+from core.multiprocess import SharedInvalidationLog, SharedStatsBoard
+from core.replica import ReplicaSync
+from core.worker_pool import BoundedThreadPoolServer
+from serialization import by_value
 from config import ( 
     SERVER_HOST, SERVER_PORT, 
-    NAME_SERVER_HOST, NAME_SERVER_PORT, SERVICE_NAME
+    SERVER_ENGINE, SERVER_WORKERS, SERVER_ACCEPT_QUEUE,
+    SERVER_QUEUE_TIMEOUT, SERVER_BUSY_REPLY_TIMEOUT,
+    SERVER_PROCESSES, SERVER_PROCESS_START_TIMEOUT,
+    SERVER_STATS_INTERVAL, SERVER_INVALIDATION_LOG_SIZE,
+    SERVER_ROLE, REPLICA_SYNC_INTERVAL, REPLICA_SYNC_BATCH, REPLICATION_SECRET,
+    NAME_SERVER_HOST, NAME_SERVER_PORT, SERVICE_NAME, READ_SERVICE_NAME,
+    SERVER_HEARTBEAT_INTERVAL,
+    SCREENING_LOCK_STRIPES, HOT_KEYS_TRACKED, BATCH_MAX_ITEMS, PAGE_SIZE_MAX,
+    HOLD_TTL, HOLD_REAPER_INTERVAL,
+    IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_KEY_MAX_LENGTH,
+    INVENTORY_WRITE_BEHIND, INVENTORY_FLUSH_BATCH, INVENTORY_JOURNAL_FSYNC,
+    INVENTORY_JOURNAL_COMPACT_OPS,
+    INVENTORY_FLUSH_MAX_RETRIES, INVENTORY_FLUSH_BACKOFF_MAX,
+    CATALOG_CACHE_ENABLED, CATALOG_CACHE_TTL, CATALOG_CACHE_MAX_ENTRIES,
+    GROUP_COMMIT_ENABLED, GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH,
+    METRICS_WINDOW, METRICS_LOAD_WINDOW
 )
 
-from core.color_logger import setup_logger
+from core.color_logger import setup_logger, logging_stats
 
 
 # ======================================================
@@ -40,6 +75,112 @@ from core.color_logger import setup_logger
 logger = setup_logger("CinemaService")
 
 
+# Histogramas de latência e vazão dos métodos remotos
+request_metrics = RequestMetrics(window=METRICS_WINDOW, recent_window=METRICS_LOAD_WINDOW)
+
+# Inventário em memória (None quando a compra vai direto ao banco)
+inventory = None
+
+# Group commit de compras (None quando cada compra tem sua transação)
+group_committer = None
+
+# Reaper de holds expirados
+hold_reaper = None
+
+# Servidor RPC em execução (consultado pelas estatísticas)
+rpc_server = None
+
+# Porta de escuta (réplicas na mesma máquina usam CINEMA_SERVER_PORT)
+LISTEN_PORT = int(os.getenv("CINEMA_SERVER_PORT", SERVER_PORT))
+
+# Sincronização com o servidor principal (None fora do papel de réplica)
+replica_sync = None
+
+# Segredo exigido pelos métodos de replicação (principal) e enviado
+# por eles (réplica); sem segredo, a replicação fica desativada
+SHARED_REPLICATION_SECRET = os.getenv("CINEMA_REPLICATION_SECRET") or REPLICATION_SECRET
+
+# Modo multiprocesso: índice deste worker e estado compartilhado
+# entre os processos (None no modo de processo único)
+worker_index = None
+stats_board = None
+invalidation_log = None
+
+# Instâncias principais do serviço informadas pelo Name Server no
+# registro e nos heartbeats; todas usam o mesmo banco. Valor em memória
+# compartilhada (multiprocessing.Value), visto por todos os workers
+primary_instances = None
+
+# Este processo está com o cache do catálogo desativado por haver
+# outras instâncias principais
+catalog_cache_bypassed = False
+
+
+def invalidate_screening(screening_id):
+    """
+    O estoque da sessão mudou: invalida as entradas do cache que a contêm,
+    neste processo e (no modo multiprocesso) nos demais workers.
+    """
+    
+    CinemaService.catalog_cache.invalidate_tag(("screening", screening_id))
+    
+    if invalidation_log:
+        invalidation_log.publish(screening_id)
+
+
+def catalog_cache_active():
+    """
+    O cache do catálogo só é usado enquanto esta for a única instância
+    principal registrada: as compras das outras instâncias (mesmo banco)
+    não invalidam as entradas deste processo. Ao perceber outra
+    instância, descarta as entradas, que podem ficar defasadas.
+    """
+    
+    global catalog_cache_bypassed
+    
+    if not CATALOG_CACHE_ENABLED:
+        return False
+    
+    shared = primary_instances is not None and primary_instances.value > 1
+    
+    if shared and not catalog_cache_bypassed:
+        CinemaService.catalog_cache.clear()
+    
+    catalog_cache_bypassed = shared
+    return not shared
+
+
+def note_primary_instances(result):
+    """
+    Guarda o número de instâncias informado pelo Name Server
+    (data["instances"] da resposta de register ou heartbeat).
+    """
+    
+    if primary_instances is None:
+        return
+    
+    count = result["data"]["instances"]
+    
+    if count > 1 and primary_instances.value <= 1:
+        logger.warning(
+            f"{count} instâncias principais usam o mesmo banco: "
+            f"cache do catálogo desativado enquanto houver outras."
+        )
+    elif count <= 1 and primary_instances.value > 1:
+        logger.info("Única instância principal: cache do catálogo reativado.")
+    
+    primary_instances.value = count
+
+
+def holds_backend():
+    """
+    Holds ficam no inventário em memória quando ativo; senão, no banco.
+    Ambos expõem create_hold, confirm_hold, release_hold e expire_holds.
+    """
+    
+    return inventory or database
+
+
 # ======================================================
 # Função utilitária para padronizar respostas RPC
 # ======================================================
@@ -55,6 +196,184 @@ def response(status, message, data=None):
     }
 
 
+def internal_error(message):
+    """
+    Resposta para falhas inesperadas do servidor. Mesmo formato de
+    erro para o cliente, mas contabilizada à parte nas métricas.
+    """
+    
+    request_metrics.mark_internal_error()
+    return response("error", message)
+
+
+# ======================================================
+# Prazos das requisições (deadlines)
+# ======================================================
+
+# Prazo absoluto (relógio monotônico) da requisição em andamento, por thread
+_request_deadline = threading.local()
+
+
+def with_deadline(method):
+    """
+    Decorator para métodos expostos: aceita o argumento nomeado
+    deadline_ms (orçamento restante do cliente, em milissegundos) e
+    descarta a chamada cujo prazo já expirou antes de qualquer trabalho.
+    """
+    
+    @functools.wraps(method)
+    def wrapper(*args, deadline_ms=None, **kwargs):
+        if isinstance(deadline_ms, (int, float)) and not isinstance(deadline_ms, bool):
+            _request_deadline.at = time.monotonic() + deadline_ms / 1000
+        else:
+            _request_deadline.at = None
+        
+        if deadline_exceeded():
+            return deadline_response()
+        
+        return method(*args, **kwargs)
+    
+    return wrapper
+
+
+def request_deadline():
+    """
+    Prazo absoluto (time.monotonic) da requisição atual, ou None.
+    """
+    
+    return getattr(_request_deadline, "at", None)
+
+
+def deadline_exceeded():
+    """
+    True se o cliente da requisição atual já desistiu de esperar.
+    Consultado antes de trabalho caro (ex.: após aguardar um lock).
+    """
+    
+    deadline = request_deadline()
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def deadline_response():
+    request_metrics.mark_deadline_exceeded()
+    return response("error", "Prazo da requisição expirado.")
+
+
+# ======================================================
+# Papel do servidor (principal ou réplica de leitura)
+# ======================================================
+
+def primary_only(method):
+    """
+    Decorator para métodos expostos que alteram dados: uma réplica
+    de leitura os recusa (o cliente deve chamar o servidor principal).
+    """
+    
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if replica_sync:
+            return response("error", "Réplica somente leitura: use o servidor principal.")
+        
+        return method(*args, **kwargs)
+    
+    return wrapper
+
+
+def replication_auth(method):
+    """
+    Decorator para os métodos de replicação: o log e a cópia completa
+    expõem clientes e compras, então exigem o segredo compartilhado
+    como primeiro argumento (que não é repassado ao método).
+    """
+    
+    @functools.wraps(method)
+    def wrapper(self, secret, *args, **kwargs):
+        if not SHARED_REPLICATION_SECRET:
+            return response("error", "Replicação desativada: defina CINEMA_REPLICATION_SECRET.")
+        
+        if not isinstance(secret, str) or not hmac.compare_digest(
+            secret.encode(), SHARED_REPLICATION_SECRET.encode()
+        ):
+            logger.warning("Pedido de replicação recusado: segredo inválido.")
+            return response("error", "Acesso à replicação negado.")
+        
+        return method(self, *args, **kwargs)
+    
+    return wrapper
+
+
+def replica_read(method):
+    """
+    Decorator para consultas atendidas por réplicas: acrescenta à
+    resposta a defasagem da cópia local (staleness_s, em segundos;
+    None se a réplica ainda não sincronizou). No principal, nada muda.
+    """
+    
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        result = method(*args, **kwargs)
+        
+        if replica_sync and isinstance(result, dict):
+            result["staleness_s"] = replica_sync.staleness()
+        
+        return result
+    
+    return wrapper
+
+
+# ======================================================
+# Paginação por cursor (keyset)
+# ======================================================
+
+def encode_page_token(key):
+    """
+    Converte a chave de continuação em um token opaco para o cliente.
+    """
+    
+    if key is None:
+        return None
+    
+    raw = json.dumps(list(key)).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def parse_page(page_size, page_token, key_size):
+    """
+    Valida os parâmetros de paginação e decodifica o token.
+    Retorna (limit, after) ou lança ValueError com a mensagem de erro.
+    """
+    
+    if not isinstance(page_size, int) or not 0 < page_size <= PAGE_SIZE_MAX:
+        raise ValueError(f"Tamanho de página inválido (1 a {PAGE_SIZE_MAX}).")
+    
+    if page_token is None:
+        return page_size, None
+    
+    try:
+        key = json.loads(base64.urlsafe_b64decode(str(page_token).encode("ascii")))
+    except Exception:
+        raise ValueError("Token de paginação inválido.")
+    
+    if not isinstance(key, list) or len(key) != key_size:
+        raise ValueError("Token de paginação inválido.")
+    
+    if not all(isinstance(value, (int, str)) for value in key):
+        raise ValueError("Token de paginação inválido.")
+    
+    return page_size, tuple(key)
+
+
+def page(rows, next_key):
+    """
+    Formata uma página de resultados com o token da próxima página.
+    """
+    
+    return {
+        "items": rows,
+        "next_page_token": encode_page_token(next_key)
+    }
+
+
 # ======================================================
 # Serviço RPC
 # ======================================================
@@ -63,36 +382,88 @@ class CinemaService(rpyc.Service):
     """
     Define métodos remotos disponíveis aos clientes (Serviço RPC).
     Cada método representa uma operação da lógica de negócios.
+    
+    Todos os métodos expostos retornam por valor (@by_value): o cliente
+    recebe tuplas imutáveis, nunca netrefs para objetos do servidor.
     """
     
-    # Lock para garantir exclusão mútua
-    lock = threading.Lock()
+    # Locks por sessão: compradores de uma sessão disputada
+    # não bloqueiam compras das demais sessões
+    locks = StripedLockManager(
+        stripes=SCREENING_LOCK_STRIPES,
+        hot_keys_tracked=HOT_KEYS_TRACKED
+    )
+    
+    # Cache read-through do catálogo (filmes e sessões por filme)
+    catalog_cache = CatalogCache(
+        max_entries=CATALOG_CACHE_MAX_ENTRIES,
+        ttl=CATALOG_CACHE_TTL
+    )
     
     
     def on_connect(self, conn):
         conn._config["allow_pickle"] = False
     
     
-    def exposed_list_movies(self):
+    def _cached(self, key, loader, tags_of=None):
+        """
+        Consulta read-through no cache do catálogo (quando ativo).
+        """
+        
+        if catalog_cache_active():
+            # Aplicar compras feitas pelos demais processos workers
+            if invalidation_log:
+                invalidation_log.sync(CinemaService.catalog_cache)
+            
+            return CinemaService.catalog_cache.get_or_load(key, loader, tags_of)
+        
+        return loader()
+    
+    
+    @by_value
+    @request_metrics.timed
+    @replica_read
+    @with_deadline
+    def exposed_list_movies(self, page_size=None, page_token=None):
         """
         Retorna lista de todos os filmes cadastrados.
+        
+        Com page_size, retorna uma página {"items", "next_page_token"};
+        o token deve ser reenviado para obter a página seguinte.
         """
         
         try:
-            # Garantir que apenas uma thread acesse o banco de dados por vez            
-            movies = database.list_movies()            
+            if page_size is None:
+                movies = list(self._cached(("movies",), database.list_movies))
+            else:
+                limit, after = parse_page(page_size, page_token, key_size=1)
+                rows, next_key = self._cached(
+                    ("movies", limit, after),
+                    lambda: database.list_movies_page(limit, after)
+                )
+                movies = page(list(rows), next_key)
+            
             logger.info("Filmes listados com sucesso.")            
             return response("success", "Filmes listados com sucesso.", movies)
         
+        except ValueError as e:
+            return response("error", str(e))
+        
         except Exception as e:
             # Logar o erro para análise posterior            
             logger.error(f"Erro ao listar filmes: {e}")            
-            return response("error", "Erro interno ao listar filmes.")
+            return internal_error("Erro interno ao listar filmes.")
     
     
-    def exposed_list_screenings_by_movie(self, movie_id):
+    @by_value
+    @request_metrics.timed
+    @replica_read
+    @with_deadline
+    def exposed_list_screenings_by_movie(self, movie_id, page_size=None, page_token=None):
         """
         Retorna lista de sessões disponíveis para um filme específico.
+        
+        Com page_size, retorna uma página {"items", "next_page_token"}.
         """
         
         if not isinstance(movie_id, int):
@@ -100,20 +471,52 @@ class CinemaService(rpyc.Service):
             return response("error", "ID do filme inválido.")
         
         try:
-            # Garantir que apenas uma thread acesse o banco de dados por vez            
-            screenings = database.list_screenings_by_movie(movie_id)            
+            if page_size is None:
+                # Cada sessão listada vira uma tag: a compra invalida só esta entrada
+                screenings = list(self._cached(
+                    ("screenings", movie_id),
+                    lambda: database.list_screenings_by_movie(movie_id),
+                    tags_of=lambda rows: [("screening", row[0]) for row in rows]
+                ))
+            else:
+                limit, after = parse_page(page_size, page_token, key_size=2)
+                screenings, next_key = self._cached(
+                    ("screenings", movie_id, limit, after),
+                    lambda: database.list_screenings_page(movie_id, limit, after),
+                    tags_of=lambda result: [("screening", row[0]) for row in result[0]]
+                )
+                screenings = list(screenings)
+            
+            # Estoque autoritativo está em memória quando o write-behind está ativo
+            if inventory:
+                screenings = inventory.overlay(screenings)
+            
+            if page_size is not None:
+                screenings = page(screenings, next_key)
+            
             logger.info(f"Sessões listadas para filme_id={movie_id}.")
             return response("success", "Sessões listadas com sucesso.", screenings)
         
+        except ValueError as e:
+            return response("error", str(e))
+        
         except Exception as e:
             # Logar o erro para análise posterior            
             logger.error(f"Erro ao listar sessões: {e}")            
-            return response("error", "Erro interno ao listar sessões.")
+            return internal_error("Erro interno ao listar sessões.")
             
     
-    def exposed_buy_tickets(self, name, email, screening_id, quantity):
+    @by_value
+    @request_metrics.timed
+    @primary_only
+    @with_deadline
+    def exposed_buy_tickets(self, name, email, screening_id, quantity, idempotency_key=None):
         """
         Processa a compra de ingressos para uma sessão específica.
+        
+        idempotency_key (opcional) é gerada pelo cliente para cada compra
+        e reenviada nas novas tentativas: uma chave já vista retorna o
+        resultado original, sem comprar novamente.
         """
         
         if not isinstance(name, str) or not name.strip():
@@ -128,132 +531,798 @@ class CinemaService(rpyc.Service):
         if not isinstance(quantity, int) or quantity <= 0:
             return response("error", "Quantidade de ingressos inválida.")
         
+        if idempotency_key is not None and (
+            not isinstance(idempotency_key, str) or not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH
+        ):
+            return response("error", "Chave de idempotência inválida.")
+        
         try:
-            # Garantir que apenas uma thread acesse o banco de dados por vez
+            # A verificação de estoque é feita por um UPDATE condicional
+            # dentro da transação. O lock da sessão apenas enfileira
+            # compradores da mesma sessão, evitando que disputem o banco;
+            # compras de sessões diferentes executam em paralelo
+            if inventory:
+                with CinemaService.locks.lock(screening_id):
+                    # A espera pelo lock pode ter consumido o prazo
+                    if deadline_exceeded():
+                        return deadline_response()
+                    
+                    resultado = inventory.purchase(name, email, screening_id, quantity, idempotency_key)
             
-            with CinemaService.lock:
-                # Verificar disponibilidade de ingressos antes de processar a compra
-                
-                resultado = database.buy_tickets(name, email, screening_id, quantity)
+            elif group_committer:
+                # A thread do group commit já serializa as escritas: sem lock,
+                # compras da mesma sessão podem entrar no mesmo lote
+                resultado = group_committer.submit(
+                    name, email, screening_id, quantity, idempotency_key,
+                    deadline=request_deadline()
+                )
                 
-                # Se resultado já for dict padronizado (ideal)
-                if isinstance(resultado, dict):
-                    return resultado
+                # Prazo vencido ainda na fila: descartada sem comprar
+                if resultado is None:
+                    return deadline_response()
+            
+            else:
+                with CinemaService.locks.lock(screening_id):
+                    if deadline_exceeded():
+                        return deadline_response()
+                    
+                    resultado = database.buy_tickets(name, email, screening_id, quantity, idempotency_key)
+            
+            # Estoque da sessão mudou: invalidar apenas as entradas que a contêm
+            if isinstance(resultado, dict) and resultado.get("status") == "success":
+                invalidate_screening(screening_id)
+            
+            # Se resultado já for dict padronizado (ideal)
+            if isinstance(resultado, dict):
+                return resultado
 
-                # Se banco ainda retornar string (compatibilidade)
-                return response("success", resultado)
+            # Se banco ainda retornar string (compatibilidade)
+            return response("success", resultado)
 
         except Exception as e:
             logger.error(f"Erro ao comprar ingresso: {e}")
 
-            return response("error", "Erro interno ao realizar compra.")
+            return internal_error("Erro interno ao realizar compra.")
             
     
-    def exposed_get_purchases_by_email(self, email):
+    @by_value
+    @request_metrics.timed
+    @primary_only
+    @with_deadline
+    def exposed_buy_tickets_batch(self, name, email, items, idempotency_key=None):
         """
-        Método RPC para consultar compras de um cliente.
-        Valida entrada e retorna compras associadas ao e-mail.
+        Processa a compra de vários itens (screening_id, quantity)
+        em uma única transação: todos são confirmados ou nenhum.
+        Retorna o resultado de cada item em data["items"].
+        
+        idempotency_key (opcional) funciona como em buy_tickets: uma
+        chave já vista retorna o resultado original do lote.
         """
         
-        # Validação básica
+        if not isinstance(name, str) or not name.strip():
+            return response("error", "Nome do cliente inválido.")
+        
         if not isinstance(email, str) or not email.strip():
-            return response("error", "E-mail inválido.")
+            return response("error", "E-mail do cliente inválido.")
+        
+        if not isinstance(items, (list, tuple)) or not items:
+            return response("error", "Lista de itens inválida.")
+        
+        if len(items) > BATCH_MAX_ITEMS:
+            return response("error", f"Máximo de {BATCH_MAX_ITEMS} itens por compra.")
         
+        # Materializar os itens localmente antes de validar
         try:
-            purchases = database.get_purchases_by_email(email)
+            items = [(item[0], item[1]) for item in items]
+        except Exception:
+            return response("error", "Lista de itens inválida.")
+        
+        for screening_id, quantity in items:
+            if not isinstance(screening_id, int):
+                return response("error", "ID da sessão inválida.")
             
-            return response("success", "Compras recuperadas com sucesso.", purchases)
+            if not isinstance(quantity, int) or quantity <= 0:
+                return response("error", "Quantidade de ingressos inválida.")
+        
+        if idempotency_key is not None and (
+            not isinstance(idempotency_key, str) or not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH
+        ):
+            return response("error", "Chave de idempotência inválida.")
+        
+        screening_ids = [screening_id for screening_id, _ in items]
+        
+        try:
+            # Locks das sessões adquiridos em ordem fixa (sem deadlock)
+            with CinemaService.locks.lock_many(screening_ids):
+                if deadline_exceeded():
+                    return deadline_response()
+                
+                if inventory:
+                    resultado = inventory.purchase_batch(name, email, items, idempotency_key)
+                else:
+                    resultado = database.buy_tickets_batch(name, email, items, idempotency_key)
+            
+            if resultado["status"] == "success":
+                for screening_id in set(screening_ids):
+                    invalidate_screening(screening_id)
             
+            return resultado
+        
         except Exception as e:
-            logger.error(f"Erro ao buscar compras: {e}")
-            return response("error", "Erro interno ao buscar compras")
-
-# ======================================================
-# Registro no Name Server
-# ======================================================
-
-def register_in_name_server():
-    """
-    Registrar o serviço no Name Server para descoberta pelos clientes.
-    Implementa mecanismo de retry e garante
-    que a conexão seja encerrada corretamente, mesmo em caso de falhas.
-    """
-    
-    max_retries = 5
-    delay = 1
+            logger.error(f"Erro ao comprar ingressos em lote: {e}")
+            
+            return internal_error("Erro interno ao realizar compra em lote.")
+            
     
-    for attempt in range(1, max_retries + 1):
+    @by_value
+    @request_metrics.timed
+    @primary_only
+    @with_deadline
+    def exposed_hold_tickets(self, screening_id, quantity):
+        """
+        Reserva ingressos temporariamente (HOLD_TTL segundos) enquanto
+        o cliente preenche seus dados. Retorna o hold_id a ser confirmado.
+        """
         
-        conn = None # Garantir que a conexão seja definida mesmo em caso de falha
+        if not isinstance(screening_id, int):
+            return response("error", "ID da sessão inválida.")
+        
+        if not isinstance(quantity, int) or quantity <= 0:
+            return response("error", "Quantidade de ingressos inválida.")
         
         try:
-            # Registrar o serviço no Name Server para descoberta pelos clientes
-            
-            # Conectar ao Name Server e registrar o serviço        
-            conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
+            hold_id = uuid.uuid4().hex
+            expires_at = time.time() + HOLD_TTL
             
-            # Registrar o serviço com nome, host e porta do servidor principal
-            conn.root.register(SERVICE_NAME, SERVER_HOST, SERVER_PORT)            
+            with CinemaService.locks.lock(screening_id):
+                if deadline_exceeded():
+                    return deadline_response()
+                
+                resultado = holds_backend().create_hold(hold_id, screening_id, quantity, expires_at)
             
-            logger.info("Servidor registrado no Name Server com sucesso.")
-            return True
+            if resultado["status"] == "success":
+                invalidate_screening(screening_id)
             
+            return resultado
+        
         except Exception as e:
-            # Logar o erro para análise posterior
-            logger.warning(f"Tentativa {attempt} de registro falhou. Erro: {e}")
-            time.sleep(delay)
-            
-        finally:
-            # Garantir que a conexão seja fechada corretamente
-            if conn:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-            
-    logger.error(f"Erro ao registrar no Name Server.")
-    return False
+            logger.error(f"Erro ao reservar ingressos: {e}")
+            return internal_error("Erro interno ao reservar ingressos.")
+    
+    
+    @by_value
+    @request_metrics.timed
+    @primary_only
+    @with_deadline
+    def exposed_confirm_hold(self, hold_id, name, email):
+        """
+        Confirma a compra de um hold ainda válido. O estoque já foi
+        descontado na reserva, então a confirmação não disputa estoque.
+        """
         
+        if not isinstance(hold_id, str) or not hold_id:
+            return response("error", "Reserva inválida.")
         
-# ======================================================
-# Inicialização do Servidor
-# ======================================================
-
-if __name__ == "__main__":
-    """
-    Inicializa o banco de dados, 
-    registra o serviço no Name Server e inicia o servidor RPC.    
-    """
+        if not isinstance(name, str) or not name.strip():
+            return response("error", "Nome do cliente inválido.")
+        
+        if not isinstance(email, str) or not email.strip():
+            return response("error", "E-mail do cliente inválido.")
+        
+        try:
+            return holds_backend().confirm_hold(hold_id, name, email, time.time())
+        
+        except Exception as e:
+            logger.error(f"Erro ao confirmar reserva: {e}")
+            return internal_error("Erro interno ao confirmar reserva.")
     
-    logger.info("===================================")
-    logger.info("Iniciando Servidor do Cinema...")
-    logger.info("===================================")
     
-    try:
-        # Inicializar o banco de dados (criar tabelas e inserir dados iniciais)
+    @by_value
+    @request_metrics.timed
+    @primary_only
+    @with_deadline
+    def exposed_release_hold(self, hold_id):
+        """
+        Cancela um hold, devolvendo os ingressos ao estoque.
+        """
         
-        database.start_db()
-        logger.info("Banco de dados inicializado com sucesso.")
+        if not isinstance(hold_id, str) or not hold_id:
+            return response("error", "Reserva inválida.")
         
-        # Registrar o serviço no Name Server para descoberta pelos clientes
-        if not register_in_name_server():
-            raise Exception("Falha ao registrar no Name Server. Verifique os logs para detalhes.")
+        try:
+            screening_id = holds_backend().release_hold(hold_id)
+            
+            if screening_id is None:
+                return response("error", "Reserva não encontrada.")
+            
+            invalidate_screening(screening_id)
+            return response("success", "Reserva cancelada.")
         
-        # Iniciar o servidor RPC para atender às requisições dos clientes
-        server = ThreadedServer(
-            CinemaService, 
-            hostname=SERVER_HOST,
-            port=SERVER_PORT, 
-            reuse_addr=True,
-            protocol_config={
-                "allow_public_attrs": True,
-                "allow_pickle": False,
-                "sync_request_timeout": None
-            }
-        )
+        except Exception as e:
+            logger.error(f"Erro ao cancelar reserva: {e}")
+            return internal_error("Erro interno ao cancelar reserva.")
+    
+    
+    @by_value
+    @request_metrics.timed
+    @replica_read
+    @with_deadline
+    def exposed_get_purchases_by_email(self, email, page_size=None, page_token=None):
+        """
+        Método RPC para consultar compras de um cliente.
+        Valida entrada e retorna compras associadas ao e-mail.
         
-        logger.info("Servidor aguardando conexões...")
-        server.start()
+        Com page_size, retorna uma página {"items", "next_page_token"},
+        da compra mais recente para a mais antiga.
+        """
+        
+        # Validação básica
+        if not isinstance(email, str) or not email.strip():
+            return response("error", "E-mail inválido.")
+        
+        try:
+            if page_size is None:
+                purchases = database.get_purchases_by_email(email)
+            else:
+                limit, before = parse_page(page_size, page_token, key_size=2)
+                purchases = page(*database.get_purchases_page(email, limit, before))
+            
+            return response("success", "Compras recuperadas com sucesso.", purchases)
+        
+        except ValueError as e:
+            return response("error", str(e))
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar compras: {e}")
+            return internal_error("Erro interno ao buscar compras")
+
+    
+    @by_value
+    @request_metrics.timed
+    @with_deadline
+    def exposed_stats(self):
+        """
+        Retorna os histogramas de latência (p50/p90/p99/max) por método
+        e resultado, os contadores de vazão deste processo e os
+        contadores da fila de logging (descartes e supressões).
+        """
+        
+        metrics = request_metrics.snapshot()
+        metrics["logging"] = logging_stats()
+        
+        return response("success", "Métricas recuperadas.", metrics)
+    
+    
+    @by_value
+    @request_metrics.timed
+    @with_deadline
+    def exposed_server_stats(self):
+        """
+        Retorna a ocupação do engine do servidor RPC.
+        """
+        
+        return response("success", "Estatísticas do servidor recuperadas.", server_stats())
+    
+    
+    @by_value
+    @request_metrics.timed
+    @with_deadline
+    def exposed_lock_stats(self):
+        """
+        Retorna os contadores de contenção dos locks por sessão
+        e o ranking das sessões mais disputadas.
+        """
+        
+        return response("success", "Estatísticas de contenção recuperadas.", {
+            "stripes": CinemaService.locks.stats(),
+            "hot_screenings": CinemaService.locks.hot_keys()
+        })
+    
+    
+    @by_value
+    @request_metrics.timed
+    @with_deadline
+    def exposed_cache_stats(self):
+        """
+        Retorna as estatísticas de hits/misses do cache do catálogo.
+        """
+        
+        return response("success", "Estatísticas do cache recuperadas.", CinemaService.catalog_cache.stats())
+    
+    
+    @by_value
+    @request_metrics.timed
+    @with_deadline
+    def exposed_group_commit_stats(self):
+        """
+        Retorna as métricas de tamanho de lote e latência de commit.
+        """
+        
+        if not group_committer:
+            return response("error", "Group commit desativado.")
+        
+        return response("success", "Estatísticas do group commit recuperadas.", group_committer.stats())
+    
+    
+    @by_value
+    @request_metrics.timed
+    @with_deadline
+    def exposed_inventory_stats(self):
+        """
+        Retorna os contadores do inventário em memória e o atraso
+        da fila de persistência write-behind.
+        """
+        
+        if not inventory:
+            return response("error", "Inventário em memória desativado.")
+        
+        return response("success", "Estatísticas do inventário recuperadas.", inventory.stats())
+    
+    
+    # ==================================================
+    # Replicação (chamados pelas réplicas de leitura)
+    # ==================================================
+    
+    @by_value
+    @request_metrics.timed
+    @primary_only
+    @replication_auth
+    @with_deadline
+    def exposed_replication_changes(self, since, limit=REPLICA_SYNC_BATCH):
+        """
+        Linhas alteradas após a posição since do log de replicação
+        (since negativo: réplica sem dados). data["resync"] True indica
+        que a réplica precisa de uma cópia completa.
+        """
+        
+        if not isinstance(since, int):
+            return response("error", "Posição de replicação inválida.")
+        
+        if not isinstance(limit, int) or not 0 < limit <= REPLICA_SYNC_BATCH:
+            return response("error", f"Limite de alterações inválido (1 a {REPLICA_SYNC_BATCH}).")
+        
+        try:
+            changes = database.replication_changes(since, limit)
+            
+            if changes is None:
+                return response("success", "Cópia completa necessária.", {"resync": True})
+            
+            return response("success", "Alterações recuperadas.", dict(changes, resync=False))
+        
+        except Exception as e:
+            logger.error(f"Erro ao buscar alterações para réplica: {e}")
+            return internal_error("Erro interno ao buscar alterações.")
+    
+    
+    @by_value
+    @request_metrics.timed
+    @primary_only
+    @replication_auth
+    @with_deadline
+    def exposed_replication_snapshot(self, table, after_id=0, limit=REPLICA_SYNC_BATCH):
+        """
+        Página da cópia completa de uma tabela replicada: até limit
+        linhas com id maior que after_id, e a posição do log no
+        instante da leitura.
+        """
+        
+        if table not in database.REPLICATED_TABLES:
+            return response("error", "Tabela não replicada.")
+        
+        if not isinstance(after_id, int):
+            return response("error", "Posição da página inválida.")
+        
+        if not isinstance(limit, int) or not 0 < limit <= REPLICA_SYNC_BATCH:
+            return response("error", f"Limite de linhas inválido (1 a {REPLICA_SYNC_BATCH}).")
+        
+        try:
+            page = database.replication_snapshot_page(table, after_id, limit)
+            return response("success", "Página da cópia completa recuperada.", page)
+        
+        except Exception as e:
+            logger.error(f"Erro ao gerar cópia para réplica: {e}")
+            return internal_error("Erro interno ao gerar cópia completa.")
+    
+    
+    @by_value
+    @request_metrics.timed
+    @with_deadline
+    def exposed_replica_stats(self):
+        """
+        Retorna a posição, o atraso e os contadores de sincronização da réplica.
+        """
+        
+        if not replica_sync:
+            return response("error", "Servidor não é uma réplica de leitura.")
+        
+        return response("success", "Estatísticas da réplica recuperadas.", replica_sync.stats())
+
+
+# ======================================================
+# Engine do Servidor RPC
+# ======================================================
+
+def create_server():
+    """
+    Cria o servidor RPC conforme SERVER_ENGINE ("threaded" ou "pool").
+    """
+    
+    options = dict(
+        hostname=SERVER_HOST,
+        port=LISTEN_PORT, 
+        reuse_addr=True,
+        protocol_config={
+            "allow_public_attrs": False,  # Respostas já trafegam por valor
+            "allow_pickle": False,
+            "sync_request_timeout": None
+        }
+    )
+    
+    if SERVER_ENGINE == "pool":
+        logger.info(
+            f"Engine 'pool': {SERVER_WORKERS} workers, "
+            f"fila de aceitação de {SERVER_ACCEPT_QUEUE} conexões."
+        )
+        return BoundedThreadPoolServer(
+            CinemaService,
+            workers=SERVER_WORKERS,
+            accept_queue=SERVER_ACCEPT_QUEUE,
+            queue_timeout=SERVER_QUEUE_TIMEOUT,
+            busy_timeout=SERVER_BUSY_REPLY_TIMEOUT,
+            **options
+        )
+    
+    if SERVER_ENGINE != "threaded":
+        raise ValueError(f"Engine de servidor desconhecido: {SERVER_ENGINE}")
+    
+    logger.info("Engine 'threaded': uma thread por conexão.")
+    return ThreadedServer(CinemaService, **options)
+
+
+def server_stats():
+    """
+    Estatísticas do engine em execução e o relatório de carga. No
+    modo multiprocesso, inclui os contadores agregados de todos os workers.
+    """
+    
+    if rpc_server is None:
+        stats = {"engine": SERVER_ENGINE, "running": False}
+    
+    elif isinstance(rpc_server, BoundedThreadPoolServer):
+        stats = rpc_server.stats()
+    
+    else:
+        stats = {"engine": "threaded", "active_connections": len(rpc_server.clients)}
+    
+    if stats_board:
+        publish_worker_stats()
+        stats["worker"] = worker_index
+        stats["processes"] = stats_board.collect()
+    
+    # Relatório enviado ao Name Server para o roteamento por carga
+    inflight, utilization, p99_ms = load_report()
+    stats["load_report"] = {"inflight": inflight, "utilization": utilization, "p99_ms": p99_ms}
+    
+    return stats
+
+
+def publish_worker_stats():
+    """
+    Publica os contadores deste worker no quadro compartilhado.
+    """
+    
+    cache = CinemaService.catalog_cache.stats()
+    stripes = CinemaService.locks.stats()
+    load = request_metrics.load_report()
+    
+    stats_board.publish(worker_index, {
+        "connections": len(rpc_server.clients) if rpc_server else 0,
+        "cache_hits": cache["hits"],
+        "cache_misses": cache["misses"],
+        "cache_entries": cache["entries"],
+        "lock_acquisitions": sum(stripe["acquisitions"] for stripe in stripes),
+        "lock_contended": sum(stripe["contended"] for stripe in stripes),
+        "inflight": load["inflight"],
+        "busy_workers": busy_workers(load["inflight"]),
+        "p99_us": int(load["p99_ms"] * 1000)
+    })
+
+
+# ======================================================
+# Registro no Name Server
+# ======================================================
+
+def register_in_name_server(service_name=SERVICE_NAME, port=None, exclusive=False):
+    """
+    Registrar o serviço no Name Server para descoberta pelos clientes
+    (réplicas se registram com READ_SERVICE_NAME).
+    Implementa mecanismo de retry e garante
+    que a conexão seja encerrada corretamente, mesmo em caso de falhas.
+    
+    exclusive: a instância não admite outras no serviço (estoque e
+    holds em memória); o Name Server recusa o registro se houver outra.
+    """
+    
+    max_retries = 5
+    delay = 1
+    
+    for attempt in range(1, max_retries + 1):
+        
+        conn = None # Garantir que a conexão seja definida mesmo em caso de falha
+        
+        try:
+            # Registrar o serviço no Name Server para descoberta pelos clientes
+            
+            # Conectar ao Name Server e registrar o serviço        
+            conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
+            
+            # Registrar o serviço com nome, host e porta do servidor principal
+            result = conn.root.register(
+                service_name, SERVER_HOST, port or LISTEN_PORT, exclusive=exclusive
+            )
+            
+            if result["status"] != "success":
+                raise Exception(result["message"])
+            
+            if service_name == SERVICE_NAME:
+                note_primary_instances(result)
+            
+            logger.info(f"Servidor registrado no Name Server como '{service_name}'.")
+            return True
+            
+        except Exception as e:
+            # Logar o erro para análise posterior
+            logger.warning(f"Tentativa {attempt} de registro falhou. Erro: {e}")
+            time.sleep(delay)
+            
+        finally:
+            # Garantir que a conexão seja fechada corretamente
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            
+    logger.error(f"Erro ao registrar no Name Server.")
+    return False
+
+
+def unregister_from_name_server(service_name=SERVICE_NAME):
+    """
+    Remove esta instância do Name Server no encerramento, para que
+    novos clientes sejam direcionados às instâncias restantes.
+    """
+    
+    conn = None
+    
+    try:
+        conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
+        conn.root.unregister(service_name, SERVER_HOST, LISTEN_PORT)
+        logger.info(f"Instância removida do Name Server ('{service_name}').")
+        
+    except Exception as e:
+        logger.warning(f"Falha ao remover registro do Name Server: {e}")
+        
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def busy_workers(inflight):
+    """
+    Threads de atendimento ocupadas: no engine "pool", os workers com
+    conexão; no "threaded", as requisições em andamento.
+    """
+    
+    if isinstance(rpc_server, BoundedThreadPoolServer):
+        return rpc_server.stats()["active_workers"]
+    
+    return inflight
+
+
+def current_load():
+    """
+    Carga desta instância informada ao Name Server: conexões ativas
+    (somadas entre os workers no modo multiprocesso).
+    """
+    
+    if stats_board:
+        return stats_board.collect()["totals"]["connections"]
+    
+    return len(rpc_server.clients) if rpc_server else 0
+
+
+def load_report():
+    """
+    Relatório compacto de carga enviado a cada heartbeat, como tupla
+    (inflight, utilization, p99_ms): requisições em andamento, fração
+    das threads de atendimento ocupadas (SERVER_WORKERS por processo)
+    e p99 recente. No modo multiprocesso, agrega todos os workers
+    (p99 do worker mais lento).
+    """
+    
+    if stats_board:
+        board = stats_board.collect()
+        inflight = board["totals"]["inflight"]
+        busy = board["totals"]["busy_workers"]
+        p99_ms = max((worker["p99_us"] for worker in board["workers"]), default=0) / 1000
+        capacity = SERVER_WORKERS * board["processes"]
+    else:
+        load = request_metrics.load_report()
+        inflight, p99_ms = load["inflight"], load["p99_ms"]
+        busy = busy_workers(inflight)
+        capacity = SERVER_WORKERS
+    
+    return inflight, round(busy / capacity, 3), p99_ms
+
+
+def start_heartbeat(service_name=SERVICE_NAME, exclusive=False):
+    """
+    Renova periodicamente o lease desta instância no Name Server,
+    informando também sua carga e o relatório de carga (usados no
+    roteamento pelas políticas least_loaded, p2c e weighted).
+    Se o lease tiver vencido (ex.: Name Server reiniciado ou heartbeats
+    perdidos), registra a instância novamente. Retorna o evento de parada.
+    """
+    
+    stop = threading.Event()
+    
+    def heartbeat_loop():
+        conn = None
+        
+        while not stop.wait(SERVER_HEARTBEAT_INTERVAL):
+            try:
+                if conn is None:
+                    conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
+                
+                result = conn.root.heartbeat(
+                    service_name, SERVER_HOST, LISTEN_PORT, current_load(), load_report()
+                )
+                
+                if result["status"] != "success":
+                    logger.warning("Lease no Name Server vencido; registrando novamente.")
+                    result = conn.root.register(
+                        service_name, SERVER_HOST, LISTEN_PORT, exclusive=exclusive
+                    )
+                    
+                    if result["status"] != "success":
+                        logger.error(f"Novo registro recusado pelo Name Server: {result['message']}")
+                        continue
+                
+                if service_name == SERVICE_NAME:
+                    note_primary_instances(result)
+                
+            except Exception as e:
+                logger.warning(f"Falha no heartbeat ao Name Server: {e}")
+                
+                if conn:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+        
+        if conn:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    
+    threading.Thread(target=heartbeat_loop, name="Heartbeat", daemon=True).start()
+    return stop
+        
+        
+# ======================================================
+# Componentes do Servidor
+# ======================================================
+
+def init_database():
+    """
+    Inicializa o banco de dados (tabelas, migrações e dados iniciais).
+    """
+    
+    schema_version = database.start_db()
+    logger.info(f"Banco de dados inicializado com sucesso (schema v{schema_version}).")
+    logger.info(f"Durabilidade do banco: {database.describe_profile()}.")
+
+
+def start_components(reaper=True):
+    """
+    Inicia o inventário em memória ou o group commit (conforme config)
+    e, se reaper for True, o reaper de holds expirados.
+    """
+    
+    global inventory, group_committer, hold_reaper
+    
+    # Carregar estoque em memória, reaplicando o journal se necessário
+    if INVENTORY_WRITE_BEHIND:
+        inventory = InventoryEngine(
+            batch_size=INVENTORY_FLUSH_BATCH,
+            fsync=INVENTORY_JOURNAL_FSYNC,
+            journal_compact_ops=INVENTORY_JOURNAL_COMPACT_OPS,
+            max_flush_retries=INVENTORY_FLUSH_MAX_RETRIES,
+            max_flush_backoff=INVENTORY_FLUSH_BACKOFF_MAX,
+            idempotency_ttl=IDEMPOTENCY_TTL,
+            idempotency_max_keys=IDEMPOTENCY_MAX_KEYS
+        )
+        inventory.start()
+    
+    # Agrupar compras concorrentes em transações compartilhadas
+    elif GROUP_COMMIT_ENABLED:
+        group_committer = GroupCommitter(
+            window_ms=GROUP_COMMIT_WINDOW_MS,
+            max_batch=GROUP_COMMIT_MAX_BATCH
+        )
+        group_committer.start()
+    
+    # Devolver periodicamente ao estoque os holds expirados
+    if reaper:
+        hold_reaper = HoldReaper(
+            holds_backend().expire_holds,
+            interval=HOLD_REAPER_INTERVAL,
+            on_expired=invalidate_screening
+        )
+        hold_reaper.start()
+
+
+def stop_components():
+    """
+    Encerra os componentes na ordem inversa e fecha o pool do banco.
+    """
+    
+    if hold_reaper:
+        hold_reaper.stop()
+    
+    # Persistir compras pendentes do inventário antes de fechar o banco
+    if inventory:
+        inventory.stop()
+    
+    if group_committer:
+        group_committer.stop()
+    
+    # Fechar as conexões mantidas pelo pool do banco de dados
+    database.close_pool()
+    logger.info("Pool de conexões encerrado.")
+
+
+# ======================================================
+# Modo de Processo Único
+# ======================================================
+
+def run_single():
+    """
+    Inicializa o banco, registra o serviço no Name Server
+    e atende às requisições em um único processo.
+    """
+    
+    global rpc_server, primary_instances
+    
+    registered = False
+    stop_heartbeat = None
+    
+    try:
+        init_database()
+        start_components()
+        
+        primary_instances = multiprocessing.Value("i", 1, lock=False)
+        
+        # Registrar o serviço no Name Server para descoberta pelos clientes.
+        # Com estoque e holds em memória, a instância é exclusiva: outra
+        # instância no mesmo banco venderia o mesmo estoque
+        if not register_in_name_server(exclusive=INVENTORY_WRITE_BEHIND):
+            raise Exception("Falha ao registrar no Name Server. Verifique os logs para detalhes.")
+        
+        registered = True
+        stop_heartbeat = start_heartbeat(exclusive=INVENTORY_WRITE_BEHIND)
+        
+        # Iniciar o servidor RPC para atender às requisições dos clientes
+        rpc_server = create_server()
+        
+        logger.info("Servidor aguardando conexões...")
+        rpc_server.start()
         
     except KeyboardInterrupt:
         # Logar a interrupção do servidor pelo usuário
@@ -261,4 +1330,371 @@ if __name__ == "__main__":
         
     except Exception as e:
         # Logar o erro para análise posterior
-        logger.error(f"Falha ao iniciar o servidor: {e}")
\ No newline at end of file
+        logger.error(f"Falha ao iniciar o servidor: {e}")
+        
+    finally:
+        if stop_heartbeat:
+            stop_heartbeat.set()
+        
+        if registered:
+            unregister_from_name_server()
+        
+        stop_components()
+
+
+# ======================================================
+# Réplica de Leitura
+# ======================================================
+
+def connect_primary():
+    """
+    Conecta ao servidor principal, descoberto pelo Name Server.
+    """
+    
+    ns_conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
+    
+    try:
+        address = ns_conn.root.lookup(SERVICE_NAME)
+    finally:
+        ns_conn.close()
+    
+    if not address:
+        raise Exception("Servidor principal não encontrado no Name Server.")
+    
+    host, port = address
+    return rpyc.connect(host, port, config={"allow_pickle": False, "sync_request_timeout": 30})
+
+
+def on_replica_change(screenings, movies_changed):
+    """
+    Invalida o cache do catálogo conforme as alterações aplicadas
+    (screenings None indica cópia completa).
+    """
+    
+    if screenings is None or movies_changed:
+        CinemaService.catalog_cache.clear()
+        return
+    
+    for screening_id in screenings:
+        CinemaService.catalog_cache.invalidate_tag(("screening", screening_id))
+
+
+def run_replica():
+    """
+    Réplica de leitura: mantém uma cópia local do banco atualizada
+    a partir do principal e atende somente consultas. Não executa
+    inventário, group commit nem reaper (compras são recusadas).
+    
+    O registro no Name Server só ocorre após a primeira sincronização
+    concluída, para que clientes não recebam uma réplica vazia: com o
+    principal fora do ar, a réplica aguarda as novas tentativas.
+    """
+    
+    global rpc_server, replica_sync
+    
+    registered = False
+    stop_heartbeat = None
+    
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    
+    try:
+        if LISTEN_PORT == SERVER_PORT:
+            raise ValueError("A réplica precisa de outra porta (CINEMA_SERVER_PORT).")
+        
+        init_database()
+        
+        if not SHARED_REPLICATION_SECRET:
+            raise ValueError("A réplica precisa do segredo de replicação (CINEMA_REPLICATION_SECRET).")
+        
+        replica_sync = ReplicaSync(
+            connect_primary,
+            secret=SHARED_REPLICATION_SECRET,
+            interval=REPLICA_SYNC_INTERVAL,
+            batch_size=REPLICA_SYNC_BATCH,
+            on_change=on_replica_change
+        )
+        replica_sync.start()
+        
+        if not replica_sync.synced.is_set():
+            logger.warning("Aguardando a primeira sincronização com o principal antes de registrar a réplica...")
+        
+        # Espera em intervalos curtos para não bloquear o Ctrl+C / SIGTERM
+        while not replica_sync.synced.wait(1):
+            pass
+        
+        rpc_server = create_server()
+        
+        if not register_in_name_server(READ_SERVICE_NAME):
+            raise Exception("Falha ao registrar no Name Server. Verifique os logs para detalhes.")
+        
+        registered = True
+        stop_heartbeat = start_heartbeat(READ_SERVICE_NAME)
+        
+        logger.info(f"Réplica de leitura aguardando conexões na porta {LISTEN_PORT}...")
+        rpc_server.start()
+        
+    except KeyboardInterrupt:
+        logger.info("Réplica interrompida pelo usuário.")
+        
+    except Exception as e:
+        logger.error(f"Falha ao iniciar a réplica: {e}")
+        
+    finally:
+        if stop_heartbeat:
+            stop_heartbeat.set()
+        
+        if registered:
+            unregister_from_name_server(READ_SERVICE_NAME)
+        
+        if replica_sync:
+            replica_sync.stop()
+        
+        database.close_pool()
+
+
+# ======================================================
+# Modo Multiprocesso
+# ======================================================
+
+def run_multiprocess(processes):
+    """
+    Processo principal do modo multiprocesso:
+    
+    - Inicializa o banco uma única vez (migrações não concorrem)
+    - Cria o socket de escuta, herdado por todos os workers no fork
+    - Aguarda todos os workers ficarem prontos antes de registrar
+      o serviço no Name Server
+    - Supervisiona os workers, reiniciando os que terminarem
+    - No encerramento (Ctrl+C ou SIGTERM), finaliza todos os workers
+    
+    Cada worker tem seu próprio pool de conexões, cache e locks;
+    a consistência das compras continua garantida pelo banco.
+    """
+    
+    global rpc_server, stats_board, invalidation_log, primary_instances
+    
+    ctx = multiprocessing.get_context("fork")
+    workers = {}
+    registered = False
+    stop_heartbeat = None
+    
+    # SIGTERM encerra o processo principal como um Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    
+    try:
+        if INVENTORY_WRITE_BEHIND:
+            raise ValueError("O inventário em memória exige SERVER_PROCESSES = 1.")
+        
+        init_database()
+        
+        # Nenhuma conexão do banco deve atravessar o fork
+        database.close_pool()
+        
+        stats_board = SharedStatsBoard(ctx, processes)
+        invalidation_log = SharedInvalidationLog(ctx, SERVER_INVALIDATION_LOG_SIZE)
+        primary_instances = ctx.Value("i", 1, lock=False)
+        
+        # Socket de escuta compartilhado: o kernel distribui as conexões
+        # entre os workers bloqueados em accept()
+        rpc_server = create_server()
+        rpc_server.listener.listen(rpc_server.backlog)
+        
+        ready = ctx.Queue()
+        
+        for index in range(processes):
+            workers[index] = spawn_worker(ctx, index, ready)
+        
+        wait_workers_ready(ready, processes)
+        logger.info(f"{processes} workers atendendo em {SERVER_HOST}:{LISTEN_PORT}.")
+        
+        # Registro único: todos os workers atendem no mesmo endereço
+        if not register_in_name_server():
+            raise Exception("Falha ao registrar no Name Server. Verifique os logs para detalhes.")
+        
+        registered = True
+        stop_heartbeat = start_heartbeat()
+        
+        supervise_workers(ctx, workers, ready)
+        
+    except KeyboardInterrupt:
+        logger.info("Servidor interrompido pelo usuário.")
+        
+    except Exception as e:
+        logger.error(f"Falha ao iniciar o servidor: {e}")
+        
+    finally:
+        if stop_heartbeat:
+            stop_heartbeat.set()
+        
+        if registered:
+            unregister_from_name_server()
+        
+        stop_workers(workers)
+        
+        if rpc_server:
+            rpc_server.listener.close()
+        
+        logger.info("Workers encerrados.")
+
+
+def spawn_worker(ctx, index, ready):
+    """
+    Cria (via fork) o processo worker index.
+    """
+    
+    process = ctx.Process(
+        target=run_worker,
+        args=(index, ready),
+        name=f"CinemaProcess{index}"
+    )
+    process.start()
+    
+    return process
+
+
+def run_worker(index, ready):
+    """
+    Corpo de cada processo worker, executado após o fork.
+    """
+    
+    global worker_index
+    
+    worker_index = index
+    stop_publishing = threading.Event()
+    
+    # SIGTERM do processo principal encerra o worker como um Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    
+    try:
+        # Apenas o primeiro worker expira holds, evitando varreduras duplicadas
+        start_components(reaper=(index == 0))
+        
+        threading.Thread(
+            target=publish_worker_stats_loop,
+            args=(stop_publishing,),
+            daemon=True
+        ).start()
+        
+        ready.put(index)
+        rpc_server.start()
+        
+    except KeyboardInterrupt:
+        pass
+        
+    except Exception as e:
+        logger.error(f"Falha no worker {index}: {e}")
+        
+    finally:
+        # Um segundo sinal não deve interromper o encerramento
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        
+        stop_publishing.set()
+        stop_components()
+
+
+def publish_worker_stats_loop(stop):
+    """
+    Publica periodicamente as estatísticas deste worker.
+    """
+    
+    while True:
+        try:
+            publish_worker_stats()
+        except Exception as e:
+            logger.warning(f"Falha ao publicar estatísticas do worker {worker_index}: {e}")
+        
+        if stop.wait(SERVER_STATS_INTERVAL):
+            return
+
+
+def wait_workers_ready(ready, processes):
+    """
+    Aguarda todos os workers sinalizarem que estão prontos.
+    """
+    
+    deadline = time.monotonic() + SERVER_PROCESS_START_TIMEOUT
+    started = set()
+    
+    while len(started) < processes:
+        remaining = deadline - time.monotonic()
+        
+        if remaining <= 0:
+            raise Exception(
+                f"Apenas {len(started)} de {processes} workers iniciaram dentro do tempo esperado."
+            )
+        
+        try:
+            started.add(ready.get(timeout=remaining))
+        except queue.Empty:
+            continue
+
+
+def supervise_workers(ctx, workers, ready):
+    """
+    Bloqueia até o encerramento, reiniciando workers que terminarem.
+    """
+    
+    while True:
+        sentinels = {process.sentinel: index for index, process in workers.items()}
+        
+        for sentinel in multiprocessing.connection.wait(list(sentinels)):
+            index = sentinels[sentinel]
+            
+            logger.warning(
+                f"Worker {index} terminou inesperadamente "
+                f"(código {workers[index].exitcode}). Reiniciando..."
+            )
+            
+            # Evita reinícios em laço se o worker falhar ao subir
+            time.sleep(1)
+            workers[index] = spawn_worker(ctx, index, ready)
+
+
+def stop_workers(workers):
+    """
+    Solicita o encerramento dos workers (SIGTERM) e aguarda cada um.
+    """
+    
+    for process in workers.values():
+        if process.is_alive():
+            process.terminate()
+    
+    for process in workers.values():
+        process.join(timeout=5)
+        
+        if process.is_alive():
+            logger.warning(f"Worker {process.name} não encerrou a tempo; forçando.")
+            process.kill()
+            process.join()
+
+
+# ======================================================
+# Inicialização do Servidor
+# ======================================================
+
+if __name__ == "__main__":
+    """
+    Inicia o servidor em processo único ou, com CINEMA_SERVER_PROCESSES
+    (ou SERVER_PROCESSES) maior que 1, em vários processos workers
+    compartilhando a mesma porta. Com CINEMA_SERVER_ROLE=replica
+    (ou SERVER_ROLE), inicia uma réplica de leitura.
+    """
+    
+    processes = int(os.getenv("CINEMA_SERVER_PROCESSES", SERVER_PROCESSES))
+    role = os.getenv("CINEMA_SERVER_ROLE", SERVER_ROLE)
+    
+    logger.info("===================================")
+    logger.info("Iniciando Servidor do Cinema...")
+    logger.info("===================================")
+    
+    if role == "replica":
+        logger.info("Papel: réplica de leitura.")
+        run_replica()
+    elif role != "primary":
+        logger.error(f"Papel de servidor desconhecido: {role}")
+    elif processes > 1:
+        logger.info(f"Modo multiprocesso: {processes} workers.")
+        run_multiprocess(processes)
+    else:
+        run_single()
@@ -0,0 +1,210 @@
+"""
+watch.py
+
+Assinaturas (watch) de mudanças no registro do Name Server.
+
+Em vez de consultar o lookup periodicamente, clientes assinam um
+serviço e recebem por callback RPyC cada mudança de topologia:
+
+- added   -> instância registrada
+- removed -> instância removida (cancelamento ou lease vencido)
+- load    -> carga informada pela instância mudou
+
+Cada assinante tem uma fila limitada e uma thread de entrega própria:
+um cliente lento nunca atrasa o registro nem os demais assinantes.
+Assinantes cuja conexão caiu, que não respondem dentro do prazo ou
+cuja fila transbordou são removidos automaticamente.
+"""
+
+import itertools
+import queue
+import threading
+
+import rpyc
+from rpyc.core.netref import BaseNetref
+
+from core.color_logger import setup_logger
+
+
+logger = setup_logger("Watch")
+
+
+class _Subscriber:
+    def __init__(self, watch_id, service_name, callback, owner, queue_size):
+        self.watch_id = watch_id
+        self.service_name = service_name
+        self.callback = callback
+        self.owner = owner
+        self.events = queue.Queue(maxsize=queue_size)
+        self.thread = None
+
+
+class WatchHub:
+    """
+    Assinantes por serviço e entrega assíncrona dos eventos.
+    """
+
+    def __init__(self, queue_size=256, call_timeout=5):
+        """
+        queue_size:
+            Eventos pendentes por assinante antes de descartá-lo.
+
+        call_timeout:
+            Segundos aguardando o callback do assinante.
+        """
+
+        self.queue_size = queue_size
+        self.call_timeout = call_timeout
+
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.delivered = 0
+        self.dropped = 0
+
+
+    # ==========================================================
+    # Assinaturas
+    # ==========================================================
+
+    def subscribe(self, service_name, callback, owner=None):
+        """
+        Assina os eventos do serviço. owner identifica a conexão do
+        assinante (para remoção automática quando ela cair).
+        Retorna o watch_id.
+        """
+
+        subscriber = _Subscriber(
+            next(self._ids), service_name, callback, owner, self.queue_size
+        )
+
+        with self._lock:
+            self._subscribers[subscriber.watch_id] = subscriber
+
+        subscriber.thread = threading.Thread(
+            target=self._deliver,
+            args=(subscriber,),
+            name=f"Watch{subscriber.watch_id}",
+            daemon=True
+        )
+        subscriber.thread.start()
+
+        return subscriber.watch_id
+
+
+    def unsubscribe(self, watch_id):
+        """
+        Remove a assinatura. Retorna False se ela não existia.
+        """
+
+        with self._lock:
+            subscriber = self._subscribers.pop(watch_id, None)
+
+        if subscriber is None:
+            return False
+
+        self._stop(subscriber)
+        return True
+
+
+    def unsubscribe_owner(self, owner):
+        """
+        Remove todas as assinaturas de uma conexão encerrada.
+        """
+
+        with self._lock:
+            watch_ids = [
+                watch_id for watch_id, subscriber in self._subscribers.items()
+                if subscriber.owner is owner
+            ]
+
+        return sum(self.unsubscribe(watch_id) for watch_id in watch_ids)
+
+
+    # ==========================================================
+    # Publicação e entrega
+    # ==========================================================
+
+    def publish(self, service_name, event, host, port, load=None):
+        """
+        Enfileira o evento para os assinantes do serviço (sem bloquear).
+        """
+
+        with self._lock:
+            subscribers = [
+                subscriber for subscriber in self._subscribers.values()
+                if subscriber.service_name == service_name
+            ]
+
+        for subscriber in subscribers:
+            try:
+                subscriber.events.put_nowait((service_name, event, host, port, load))
+            except queue.Full:
+                logger.warning(f"Assinante {subscriber.watch_id} não acompanha os eventos; removido.")
+                self._drop(subscriber)
+
+
+    def _deliver(self, subscriber):
+        while True:
+            event = subscriber.events.get()
+
+            if event is None:
+                return
+
+            try:
+                if isinstance(subscriber.callback, BaseNetref):
+                    # Callback remoto: aguarda no máximo call_timeout
+                    pending = rpyc.async_(subscriber.callback)(*event)
+                    pending.set_expiry(self.call_timeout)
+                    pending.value
+                else:
+                    subscriber.callback(*event)
+
+                with self._lock:
+                    self.delivered += 1
+
+            except Exception as e:
+                # Conexão do assinante caiu ou callback travado
+                logger.info(f"Assinante {subscriber.watch_id} removido: {e}")
+                self._drop(subscriber)
+                return
+
+
+    def _drop(self, subscriber):
+        with self._lock:
+            if self._subscribers.pop(subscriber.watch_id, None) is None:
+                return
+
+            self.dropped += 1
+
+        self._stop(subscriber)
+
+
+    def _stop(self, subscriber):
+        """
+        Descarta os eventos pendentes e encerra a thread de entrega.
+        """
+
+        while True:
+            try:
+                while True:
+                    subscriber.events.get_nowait()
+            except queue.Empty:
+                pass
+
+            try:
+                subscriber.events.put_nowait(None)
+                return
+            except queue.Full:
+                continue
+
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "delivered": self.delivered,
+                "dropped": self.dropped
+            }
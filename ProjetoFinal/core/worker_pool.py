@@ -0,0 +1,343 @@
+"""
+worker_pool.py
+
+Servidor RPyC com pool fixo de workers e controle de admissão.
+
+O ThreadedServer do RPyC cria uma thread por conexão, sem limite:
+uma rajada de conexões esgota memória e sobrecarrega o escalonador.
+Este servidor limita os recursos:
+
+- Número fixo de threads de trabalho (workers)
+- Fila de aceitação limitada para conexões aguardando um worker
+- Conexões excedentes recebem uma resposta "servidor ocupado"
+  (status "busy") em vez de acumular threads ou esperar indefinidamente;
+  o cliente a distingue de um servidor fora do ar e aguarda antes de
+  tentar de novo
+- Espera limitada na fila: cada worker atende uma conexão do início
+  ao fim (conexões persistentes o ocupam até fecharem), então uma
+  conexão que aguarda mais que queue_timeout também recebe "busy"
+- Contadores de workers ativos, profundidade da fila e recusas
+"""
+
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import rpyc
+from rpyc.core.channel import Channel
+from rpyc.core.stream import SocketStream
+from rpyc.utils.server import Server
+
+from serialization import encode
+
+
+# Resposta a qualquer chamada de uma conexão recusada
+BUSY_RESPONSE = {
+    "status": "busy",
+    "message": "Servidor ocupado. Tente novamente em instantes.",
+    "data": None
+}
+
+
+class BusyService(rpyc.Service):
+    """
+    Serviço das conexões recusadas: qualquer método chamado
+    retorna BUSY_RESPONSE (por valor).
+    """
+
+    def __init__(self):
+        self.answered = False
+
+
+    def _rpyc_getattr(self, name):
+        return self._busy
+
+
+    def _busy(self, *args, **kwargs):
+        self.answered = True
+        return encode(BUSY_RESPONSE)
+
+
+class BoundedThreadPoolServer(Server):
+    """
+    Servidor RPyC com workers fixos e fila de aceitação limitada.
+    Cada worker atende uma conexão por vez, do início ao fim.
+    """
+
+    def __init__(self, *args, workers=16, accept_queue=64, queue_timeout=5,
+                 busy_timeout=1, busy_backlog=16, **kwargs):
+        """
+        workers:
+            Número de threads que atendem conexões.
+
+        accept_queue:
+            Máximo de conexões aceitas aguardando um worker livre.
+
+        queue_timeout:
+            Segundos que uma conexão pode aguardar na fila antes de
+            receber a resposta "servidor ocupado".
+
+        busy_timeout:
+            Segundos dedicados a responder "ocupado" a cada conexão recusada.
+
+        busy_backlog:
+            Conexões recusadas aguardando a resposta "ocupado"; além
+            disso, são fechadas com RST (último recurso numa rajada).
+        """
+
+        self.workers = workers
+        self.accept_queue = max(1, accept_queue)
+        self.queue_timeout = queue_timeout
+        self.busy_timeout = busy_timeout
+        self.busy_backlog = busy_backlog
+
+        # Conexões aguardando worker: (socket, instante de chegada)
+        self._pending = deque()
+        self._busy = deque()
+        self._cond = threading.Condition()
+        self._closing = False
+        self._threads = []
+
+        self._stats_lock = threading.Lock()
+        self._active_workers = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._queue_timeouts = 0
+        self._busy_replies = 0
+        self._resets = 0
+
+        super().__init__(*args, **kwargs)
+
+
+    def _listen(self):
+        if self.active:
+            return
+
+        super()._listen()
+
+        targets = [(self._worker, f"CinemaWorker{index}") for index in range(self.workers)]
+        targets.append((self._busy_replier, "CinemaBusyReplier"))
+        targets.append((self._queue_watchdog, "CinemaQueueWatchdog"))
+
+        for target, name in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+
+    # ==========================================================
+    # Admissão de conexões
+    # ==========================================================
+
+    def _accept_method(self, sock):
+        """
+        Enfileira a conexão para um worker ou a recusa se a fila estiver cheia.
+        """
+
+        with self._cond:
+            if len(self._pending) < self.accept_queue:
+                self._pending.append((sock, time.monotonic()))
+                self._cond.notify_all()
+                queued = True
+            else:
+                queued = False
+
+        if not queued:
+            self._reject(sock)
+            return
+
+        with self._stats_lock:
+            self._accepted += 1
+
+
+    def _reject(self, sock):
+        """
+        Recusa a conexão sem ocupar um worker: ela recebe a resposta
+        "ocupado" da thread de recusas ou, com essa fila cheia, um RST.
+        """
+
+        with self._stats_lock:
+            self._rejected += 1
+            rejected = self._rejected
+
+        with self._cond:
+            replied = len(self._busy) < self.busy_backlog
+
+            if replied:
+                self._busy.append(sock)
+                self._cond.notify_all()
+
+        if not replied:
+            self._reset(sock)
+
+        # Evita inundar o log durante uma rajada
+        if rejected == 1 or rejected % 100 == 0:
+            self.logger.warning(f"Servidor ocupado: {rejected} conexões recusadas até agora.")
+
+
+    def _reset(self, sock):
+        """
+        Recusa rápida: fecha a conexão com RST.
+        """
+
+        with self._stats_lock:
+            self._resets += 1
+
+        self.clients.discard(sock)
+
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        except OSError:
+            pass
+
+        sock.close()
+
+
+    def _busy_replier(self):
+        """
+        Responde "ocupado" às chamadas de cada conexão recusada até o
+        cliente encerrá-la, dedicando a ela no máximo busy_timeout segundos.
+        """
+
+        while True:
+            with self._cond:
+                while not self._busy and not self._closing:
+                    self._cond.wait()
+
+                if self._closing:
+                    return
+
+                sock = self._busy.popleft()
+
+            service = BusyService()
+
+            try:
+                # sync_request_timeout=0: o encerramento não espera o cliente
+                config = dict(self.protocol_config, sync_request_timeout=0)
+                conn = service._connect(Channel(SocketStream(sock)), config)
+                deadline = time.monotonic() + self.busy_timeout
+
+                # Quem encerra é o cliente, ao receber a resposta; o
+                # servidor só fecha a conexão se o prazo acabar
+                while not conn.closed:
+                    remaining = deadline - time.monotonic()
+
+                    if remaining <= 0:
+                        conn.close()
+                        break
+
+                    conn.serve(remaining)
+
+            except Exception:
+                pass  # Cliente desistiu antes da resposta
+
+            finally:
+                if service.answered:
+                    with self._stats_lock:
+                        self._busy_replies += 1
+
+                self.clients.discard(sock)
+                sock.close()
+
+
+    def _queue_watchdog(self):
+        """
+        Recusa as conexões que aguardam worker há mais de queue_timeout.
+        """
+
+        interval = min(1, self.queue_timeout / 2)
+
+        while True:
+            expired = []
+
+            with self._cond:
+                if self._closing:
+                    return
+
+                now = time.monotonic()
+
+                while self._pending and now - self._pending[0][1] > self.queue_timeout:
+                    expired.append(self._pending.popleft()[0])
+
+                self._cond.wait(interval)
+
+            for sock in expired:
+                with self._stats_lock:
+                    self._queue_timeouts += 1
+
+                self._reject(sock)
+
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+
+                if self._closing:
+                    return
+
+                sock, _ = self._pending.popleft()
+
+            with self._stats_lock:
+                self._active_workers += 1
+
+            try:
+                self._authenticate_and_serve_client(sock)
+            except Exception:
+                pass  # Já registrado pelo Server; o worker segue atendendo
+            finally:
+                with self._stats_lock:
+                    self._active_workers -= 1
+
+
+    def close(self):
+        """
+        Encerra o servidor, descartando conexões ainda na fila
+        e finalizando os workers.
+        """
+
+        super().close()
+
+        # Descartar conexões que não chegaram a ser atendidas
+        with self._cond:
+            self._closing = True
+            leftover = [sock for sock, _ in self._pending] + list(self._busy)
+            self._pending.clear()
+            self._busy.clear()
+            self._cond.notify_all()
+
+        for sock in leftover:
+            sock.close()
+
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+
+    # ==========================================================
+    # Estatísticas
+    # ==========================================================
+
+    def stats(self):
+        """
+        Retorna ocupação dos workers, profundidade da fila e recusas.
+        """
+
+        with self._cond:
+            queue_depth = len(self._pending)
+
+        with self._stats_lock:
+            return {
+                "engine": "pool",
+                "workers": self.workers,
+                "active_workers": self._active_workers,
+                "accept_queue": self.accept_queue,
+                "queue_depth": queue_depth,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "queue_timeouts": self._queue_timeouts,
+                "busy_replies": self._busy_replies,
+                "resets": self._resets
+            }
@@ -6,13 +6,20 @@ Tela responsável pela compra de ingressos.
 Responsabilidades:
 - Coletar dados do usuário
 - Validar entrada básica
+- Reservar ingressos (hold) enquanto o usuário preenche seus dados
 - Solicitar compra via ClientCore
 - Exibir resultado
 """
 
+import time
 import customtkinter as ctk
 
 
+# Erro do servidor para reserva que já não existe (confirmada, cancelada
+# ou expirada): só nesse caso a tela esquece a reserva após uma falha
+HOLD_GONE_MESSAGE = "Reserva não encontrada ou expirada."
+
+
 class BuyScreen:
 
     def __init__(self, parent, core):
@@ -28,19 +35,31 @@ class BuyScreen:
             font=("Arial", 20)
         ).pack(pady=20)
 
-        # Campos de entrada
-        self.name_entry = ctk.CTkEntry(self.frame, placeholder_text="Nome")
-        self.name_entry.pack(pady=5)
-
-        self.email_entry = ctk.CTkEntry(self.frame, placeholder_text="Email")
-        self.email_entry.pack(pady=5)
+        # Reserva temporária ativa (hold_id retornado pelo servidor)
+        # e o pedido (sessão, quantidade) reservado
+        self.hold_id = None
+        self.held_order = None
 
+        # Campos de entrada
         self.session_entry = ctk.CTkEntry(self.frame, placeholder_text="ID da Sessão")
         self.session_entry.pack(pady=5)
 
         self.quantity_entry = ctk.CTkEntry(self.frame, placeholder_text="Quantidade")
         self.quantity_entry.pack(pady=5)
 
+        # Botão de reserva: garante os ingressos enquanto os dados são preenchidos
+        ctk.CTkButton(
+            self.frame,
+            text="Reservar",
+            command=self.hold
+        ).pack(pady=10)
+
+        self.name_entry = ctk.CTkEntry(self.frame, placeholder_text="Nome")
+        self.name_entry.pack(pady=5)
+
+        self.email_entry = ctk.CTkEntry(self.frame, placeholder_text="Email")
+        self.email_entry.pack(pady=5)
+
         # Botão de compra
         ctk.CTkButton(
             self.frame,
@@ -51,21 +70,95 @@ class BuyScreen:
         self.result_label = ctk.CTkLabel(self.frame, text="")
         self.result_label.pack()
 
+    def read_order(self):
+        """
+        Lê o ID da sessão e a quantidade; exibe o erro e retorna
+        None se algum deles não for um número inteiro.
+        """
+
+        try:
+            return int(self.session_entry.get()), int(self.quantity_entry.get())
+        except ValueError:
+            self.result_label.configure(text="ID da sessão e quantidade devem ser números inteiros.")
+            return None
+
+    def hold(self):
+        """
+        Reserva os ingressos via ClientCore, liberando reserva anterior.
+        """
+
+        order = self.read_order()
+
+        if order is None:
+            return
+
+        if self.hold_id:
+            self.core.release_hold(self.hold_id)
+            self.hold_id = None
+            self.held_order = None
+
+        result = self.core.hold_tickets(*order)
+
+        if result["status"] == "success":
+            self.hold_id = result["data"]["hold_id"]
+            self.held_order = order
+            expires = time.strftime("%H:%M:%S", time.localtime(result["data"]["expires_at"]))
+
+            self.result_label.configure(
+                text=f"Ingressos reservados até {expires}. Preencha seus dados."
+            )
+        else:
+            self.result_label.configure(text=result["message"])
+
     def buy(self):
         """
-        Executa compra via ClientCore.
+        Executa compra via ClientCore: confirma a reserva ativa,
+        ou realiza a compra direta quando não há reserva.
+
+        A reserva só é esquecida após a confirmação ou se o servidor
+        informar que ela não existe mais; outros erros (ex.: nome
+        inválido) a mantêm para uma nova tentativa.
         """
 
+        order = self.read_order()
+
+        if order is None:
+            return
+
+        if self.hold_id:
+            # Sessão ou quantidade alteradas: a reserva não vale para o novo pedido
+            if order != self.held_order:
+                self.result_label.configure(
+                    text="Sessão ou quantidade diferentes da reserva. Reserve novamente."
+                )
+                return
+
+            result = self.core.confirm_hold(
+                self.hold_id,
+                self.name_entry.get(),
+                self.email_entry.get()
+            )
+
+            if result["status"] == "success" or result["message"] == HOLD_GONE_MESSAGE:
+                self.hold_id = None
+                self.held_order = None
+
+            if result["status"] == "success":
+                self.result_label.configure(text="Compra realizada!")
+            else:
+                self.result_label.configure(text=result["message"])
+
+            return
+
         result = self.core.buy_tickets(
             self.name_entry.get(),
             self.email_entry.get(),
-            int(self.session_entry.get()),
-            int(self.quantity_entry.get())
+            *order
         )
 
         if result["status"] == "success":
             self.result_label.configure(
-                text=f"Compra realizada! Restante: {result['data']['restante']}"
+                text=f"Compra realizada! Restante: {result['data']['available_tickets']}"
             )
         else:
             self.result_label.configure(text=result["message"])
\ No newline at end of file
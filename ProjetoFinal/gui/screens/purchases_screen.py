@@ -5,11 +5,12 @@ Tela responsável por permitir que o cliente visualize
 todas as suas compras anteriores.
 
 - Coleta o e-mail do usuário
-- Solicita os dados ao ClientCore
+- Solicita os dados ao ClientCore, página por página
 - Renderiza os resultados na interface
 """
 
 import customtkinter as ctk
+from config import CLIENT_PAGE_SIZE
 
 
 class PurchasesScreen:
@@ -52,6 +53,17 @@ class PurchasesScreen:
         self.result_frame = ctk.CTkFrame(self.frame)
         self.result_frame.pack(fill="both", expand=True)
 
+        # Paginação: e-mail consultado e token da próxima página
+        self.email = None
+        self.next_page_token = None
+
+        # Botão para carregar a próxima página (exibido quando houver)
+        self.more_button = ctk.CTkButton(
+            self.frame,
+            text="Carregar mais",
+            command=self.load_next_page
+        )
+
 
     # ======================================================
     # Carregamento das Compras
@@ -64,22 +76,48 @@ class PurchasesScreen:
 
         Fluxo:
         1) Limpa resultados anteriores
-        2) Solicita dados ao ClientCore
+        2) Solicita a primeira página ao ClientCore
         3) Renderiza dados retornados
         """
 
         for widget in self.result_frame.winfo_children():
             widget.destroy()
 
-        result = self.core.get_purchases_by_email(self.email_entry.get())
+        self.email = self.email_entry.get()
+        self.next_page_token = None
+
+        self.load_page(first_page=True)
+
+
+    def load_next_page(self):
+        """
+        Solicita a próxima página e acrescenta as compras às já exibidas.
+        """
+
+        self.load_page(first_page=False)
+
+
+    def load_page(self, first_page):
+        """
+        Solicita uma página de compras e a renderiza.
+        """
+
+        self.more_button.pack_forget()
+
+        result = self.core.get_purchases_by_email(
+            self.email,
+            CLIENT_PAGE_SIZE,
+            self.next_page_token
+        )
 
         # Tratamento da resposta
         if result["status"] == "success":
 
-            purchases = result["data"]
+            purchases = result["data"]["items"]
+            self.next_page_token = result["data"]["next_page_token"]
 
             # Caso não existam compras
-            if not purchases:
+            if first_page and not purchases:
                 ctk.CTkLabel(
                     self.result_frame,
                     text="Nenhuma compra encontrada."
@@ -110,6 +148,10 @@ class PurchasesScreen:
                     justify="left"
                 ).pack(anchor="w", padx=10, pady=2)
 
+            # Ainda há compras no servidor
+            if self.next_page_token:
+                self.more_button.pack(pady=10)
+
         else:
             # Caso ocorra erro no servidor
             ctk.CTkLabel(
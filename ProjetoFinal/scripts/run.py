@@ -6,7 +6,8 @@ Script de inicialização automática do Sistema Distribuído.
 Funcionalidades:
 - Verifica depedências
 - Inicia Name Server
-- Inicia Servidor
+- Inicia Servidor (opcionalmente com vários processos workers)
+- Inicia réplicas de leitura (opcional)
 - Aguarda inicialização real
 - Executa Cliente
 - Finaliza processos corretamente
@@ -14,6 +15,11 @@ Funcionalidades:
 Este script executa os componentes como módulos Python,
 preservando a estrutura de pacotes do projeto.
 
+Uso:
+    python scripts/run.py                 # Servidor em processo único
+    python scripts/run.py --processes 4   # 4 workers na mesma porta
+    python scripts/run.py --replicas 2    # Principal + 2 réplicas de leitura
+
 Vantagens:
 - Execução simplificada
 - Ambiente consistente (usa mesma .venv)
@@ -29,12 +35,14 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, BASE_DIR)
 
 
+import argparse
+import secrets
 import subprocess
 import time
 import socket
 
 # Importa portas diretamente do config
-from config import NAME_SERVER_PORT, SERVER_PORT
+from config import NAME_SERVER_PORT, SERVER_PORT, DATA_DIR
 
 
 # ==================================================
@@ -94,14 +102,23 @@ def wait_for_port(port, timeout=10):
 # Execução Principal
 # ==================================================
 
-def main():
+def replica_port(index):
+    """
+    Porta da réplica index (após a porta do Name Server).
+    """
+    
+    return SERVER_PORT + 10 + index
+
+
+def main(processes=None, replicas=0):
     """
     Fluxo de execução:
     - Verifica dependências
     - Inicia Name Server
     - Aguarda porta do Name Server abrir
-    - Inicia Servidor
+    - Inicia Servidor (processes workers, se informado)
     - Aguarda porta do Servidor abrir
+    - Inicia as réplicas de leitura (cada uma com porta e banco próprios)
     - Executa Cliente
     - Finaliza todos os processos
     """
@@ -114,6 +131,7 @@ def main():
     
     name_server = None
     server = None
+    replica_processes = []
 
     try:
         # -------------------------------------------------
@@ -130,14 +148,46 @@ def main():
         # -------------------------------------------------
         # Iniciar Servidor
         # -------------------------------------------------
-        print("Iniciando Servidor...")
+        server_env = os.environ.copy()
+        
+        # Principal e réplicas compartilham um segredo para a replicação
+        if replicas and not server_env.get("CINEMA_REPLICATION_SECRET"):
+            server_env["CINEMA_REPLICATION_SECRET"] = secrets.token_hex(16)
+        
+        if processes:
+            server_env["CINEMA_SERVER_PROCESSES"] = str(processes)
+            print(f"Iniciando Servidor com {processes} processos workers...")
+        else:
+            print("Iniciando Servidor...")
+        
         server = subprocess.Popen(
-            [python_exec, "-m", "core.server"]
+            [python_exec, "-m", "core.server"],
+            env=server_env
         )
         
         if not wait_for_port(SERVER_PORT):
             raise Exception("Servidor não iniciou corretamente dentro do tempo esperado. Verifique os logs.")
 
+        # -------------------------------------------------
+        # Iniciar Réplicas de Leitura
+        # -------------------------------------------------
+        for index in range(replicas):
+            print(f"Iniciando réplica de leitura {index + 1}...")
+            
+            replica_env = os.environ.copy()
+            replica_env["CINEMA_REPLICATION_SECRET"] = server_env["CINEMA_REPLICATION_SECRET"]
+            replica_env["CINEMA_SERVER_ROLE"] = "replica"
+            replica_env["CINEMA_SERVER_PORT"] = str(replica_port(index))
+            replica_env["CINEMA_DB"] = os.path.join(DATA_DIR, f"cinema_replica{index + 1}.db")
+            
+            replica_processes.append(subprocess.Popen(
+                [python_exec, "-m", "core.server"],
+                env=replica_env
+            ))
+            
+            if not wait_for_port(replica_port(index)):
+                raise Exception("Réplica não iniciou corretamente dentro do tempo esperado. Verifique os logs.")
+
         # -------------------------------------------------
         # Iniciar Cliente Test
         # -------------------------------------------------
@@ -158,6 +208,10 @@ def main():
         # -------------------------------------------------
         print("Encerrando serviços...")
 
+        for replica in replica_processes:
+            replica.terminate()
+            replica.wait()
+
         if server:
             server.terminate()
             server.wait()
@@ -170,4 +224,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Inicia o Sistema Distribuído do Cinema.")
+    parser.add_argument(
+        "--processes", type=int, default=None,
+        help="Número de processos workers do servidor (padrão: SERVER_PROCESSES do config)."
+    )
+    parser.add_argument(
+        "--replicas", type=int, default=0,
+        help="Número de réplicas de leitura (padrão: nenhuma)."
+    )
+    
+    args = parser.parse_args()
+    main(args.processes, args.replicas)
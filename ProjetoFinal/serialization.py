@@ -0,0 +1,89 @@
+"""
+serialization.py
+
+Serialização por valor das respostas RPC.
+
+O RPyC transmite por valor apenas tipos imutáveis simples (brine):
+None, bool, int, float, str, bytes, tuple e frozenset. Listas e
+dicts são entregues ao cliente como netrefs (proxies): cada acesso
+a uma linha ou campo gera uma nova ida e volta pela rede.
+
+Este módulo converte as respostas para estruturas imutáveis
+serializáveis pelo brine antes de sair do servidor, e as reconstrói
+no cliente, garantindo que uma listagem de 1.000 linhas custe uma
+única ida e volta:
+
+- list / tuple -> tuple
+- dict         -> tupla marcada (DICT_TAG, ((chave, valor), ...))
+- set          -> frozenset
+
+Fica na raiz do projeto, como config.py: é compartilhado pelo
+servidor (encode) e pelo cliente (decode), sem que um importe o
+pacote do outro.
+"""
+
+import functools
+
+from rpyc.core.netref import BaseNetref
+
+
+# Marcador de dict codificado (nunca aparece como dado real)
+DICT_TAG = "\x00dict"
+
+SCALARS = (type(None), bool, int, float, str, bytes)
+
+
+def encode(value):
+    """
+    Converte value para uma estrutura imutável serializável por valor.
+    """
+
+    if isinstance(value, SCALARS):
+        return value
+
+    if isinstance(value, dict):
+        return (DICT_TAG, tuple((encode(k), encode(v)) for k, v in value.items()))
+
+    if isinstance(value, (list, tuple)):
+        return tuple(encode(item) for item in value)
+
+    if isinstance(value, (set, frozenset)):
+        return frozenset(encode(item) for item in value)
+
+    raise TypeError(f"Tipo não serializável por valor: {type(value).__name__}")
+
+
+def decode(value):
+    """
+    Reconstrói no cliente a resposta codificada por encode().
+    Lança TypeError se algum valor recebido for um proxy remoto.
+    """
+
+    if isinstance(value, BaseNetref):
+        raise TypeError("Resposta contém proxy remoto (netref) em vez de valor.")
+
+    if isinstance(value, tuple):
+        if len(value) == 2 and value[0] == DICT_TAG:
+            return {decode(k): decode(v) for k, v in value[1]}
+
+        return tuple(decode(item) for item in value)
+
+    if isinstance(value, frozenset):
+        return frozenset(decode(item) for item in value)
+
+    if isinstance(value, SCALARS):
+        return value
+
+    raise TypeError(f"Tipo inesperado na resposta: {type(value).__name__}")
+
+
+def by_value(method):
+    """
+    Decorator para métodos expostos: codifica o retorno por valor.
+    """
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        return encode(method(*args, **kwargs))
+
+    return wrapper
@@ -13,6 +13,7 @@ O uso de fixture com scope="session" garante que o sistema
 seja iniciado apenas uma vez para todos os testes.
 """
 
+import shutil
 import subprocess
 import sys
 import time
@@ -20,7 +21,7 @@ import socket
 import pytest
 import os
 
-from config import SERVER_PORT, NAME_SERVER_PORT, TEST_DB_NAME
+from config import SERVER_PORT, NAME_SERVER_PORT, TEST_DB_NAME, TEST_NAME_SERVER_STATE_DIR
 
 
 def wait_for_port(port, timeout=10):
@@ -59,12 +60,18 @@ def distributed_system():
     os.system("pkill -f core.server")
     time.sleep(1)
     
-    # Remover banco de teste antigo
-    if os.path.exists(TEST_DB_NAME):
-        os.remove(TEST_DB_NAME)
+    # Remover banco de teste antigo (incluindo arquivos do modo WAL e journal do inventário)
+    for path in (TEST_DB_NAME, TEST_DB_NAME + "-wal", TEST_DB_NAME + "-shm", TEST_DB_NAME + ".journal"):
+        if os.path.exists(path):
+            os.remove(path)
         
+    # Remover registro persistido do Name Server de execuções anteriores
+    shutil.rmtree(TEST_NAME_SERVER_STATE_DIR, ignore_errors=True)
+    
     # Definir variável de ambiente para usar o banco de teste
     os.environ["CINEMA_DB"] = TEST_DB_NAME
+    os.environ["CINEMA_NAME_SERVER_STATE"] = TEST_NAME_SERVER_STATE_DIR
+    os.environ["CINEMA_REPLICATION_SECRET"] = "segredo-de-teste"
     
     python_exec = sys.executable
     
@@ -0,0 +1,98 @@
+"""
+test_cache.py
+
+Testes do cache read-through do catálogo.
+
+Valida se:
+- Leituras repetidas são atendidas pelo cache
+- A invalidação por sessão afeta apenas as entradas dependentes
+- O limite de entradas descarta a menos usada (LRU)
+- O cache é desativado enquanto houver outras instâncias principais
+"""
+
+import multiprocessing
+
+from core import server
+from core.cache import CatalogCache
+
+
+def test_cache_hits_and_tag_invalidation():
+    """
+    Uma compra invalida só a lista de sessões que contém a sessão comprada.
+    """
+
+    cache = CatalogCache(max_entries=10, ttl=60)
+    loads = []
+
+    def loader(movie_id):
+        loads.append(movie_id)
+        return [(movie_id * 10, "2024-03-01 19:00", 100, 100)]
+
+    def tags_of(rows):
+        return [("screening", row[0]) for row in rows]
+
+    for _ in range(3):
+        cache.get_or_load(("screenings", 1), lambda: loader(1), tags_of)
+    cache.get_or_load(("screenings", 2), lambda: loader(2), tags_of)
+
+    assert loads == [1, 2]
+
+    cache.invalidate_tag(("screening", 10))
+
+    cache.get_or_load(("screenings", 1), lambda: loader(1), tags_of)
+    cache.get_or_load(("screenings", 2), lambda: loader(2), tags_of)
+
+    assert loads == [1, 2, 1]
+
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 3
+
+
+def test_cache_lru_eviction():
+    """
+    Ao exceder o limite, a entrada menos usada recentemente é descartada.
+    """
+
+    cache = CatalogCache(max_entries=2, ttl=60)
+
+    cache.get_or_load("a", lambda: 1)
+    cache.get_or_load("b", lambda: 2)
+    cache.get_or_load("a", lambda: 1)  # "a" passa a ser a mais recente
+    cache.get_or_load("c", lambda: 3)  # descarta "b"
+
+    assert cache.get_or_load("b", lambda: "recarregado") == "recarregado"
+    assert cache.stats()["evictions"] == 2
+
+
+def test_cache_bypassed_with_other_primary_instances(monkeypatch):
+    """
+    Outra instância principal no mesmo banco não invalida este cache:
+    ele é descartado e ignorado até ela sair.
+    """
+
+    monkeypatch.setattr(server, "primary_instances", multiprocessing.Value("i", 1, lock=False))
+    monkeypatch.setattr(server, "catalog_cache_bypassed", False)
+    monkeypatch.setattr(server.CinemaService, "catalog_cache", CatalogCache(max_entries=10, ttl=60))
+
+    service = server.CinemaService()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return []
+
+    service._cached(("movies",), loader)
+    service._cached(("movies",), loader)
+    assert len(loads) == 1
+
+    server.note_primary_instances({"status": "success", "data": {"instances": 2}})
+    service._cached(("movies",), loader)
+    service._cached(("movies",), loader)
+    assert len(loads) == 3
+
+    # Instância única de novo: entradas antigas já foram descartadas
+    server.note_primary_instances({"status": "success", "data": {"instances": 1}})
+    service._cached(("movies",), loader)
+    service._cached(("movies",), loader)
+    assert len(loads) == 4
@@ -9,7 +9,12 @@ inconsistência de estoque.
 """
 
 import threading
+import time
 from client.client_core import ClientCore
+from core import database
+from core.database import ConnectionPool
+from core.group_commit import GroupCommitter
+from core.lock_manager import StripedLockManager
 
 
 def buy_ticket_thread(results, index):
@@ -54,4 +59,226 @@ def test_concurrent_buy_tickets():
         1 for r in results if r["status"] == "success"
     )
 
-    assert success_count > 0
\ No newline at end of file
+    assert success_count > 0
+
+def test_concurrent_buy_tickets_never_oversells():
+    """
+    Compras simultâneas na mesma sessão não podem
+    vender mais ingressos do que o estoque disponível.
+    """
+
+    results = []
+    lock = threading.Lock()
+
+    def buy():
+        core = ClientCore()
+        core.connect()
+        result = core.buy_tickets("Lote", "lote@mail.com", 2, 30)
+
+        # Ler o estoque antes de fechar a conexão
+        remaining = None
+        if result["status"] == "success":
+            remaining = result["data"]["available_tickets"]
+
+        with lock:
+            results.append((result["status"], remaining))
+        core.close()
+
+    threads = [threading.Thread(target=buy) for _ in range(5)]
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    # Sessão 2 inicia com 100 ingressos: no máximo 3 compras de 30
+    remaining = [r for status, r in results if status == "success"]
+
+    assert len(remaining) == 3
+    assert min(remaining) == 10
+
+
+def test_striped_lock_records_contention():
+    """
+    Threads disputando a mesma sessão devem aparecer nos
+    contadores de contenção e no ranking de sessões disputadas.
+    """
+
+    manager = StripedLockManager(stripes=4)
+
+    def hold():
+        with manager.lock(7):
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=hold) for _ in range(3)]
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    stats = manager.stats()
+
+    assert len(stats) == 1
+    assert stats[0]["acquisitions"] == 3
+    assert stats[0]["contended"] >= 1
+    assert stats[0]["queue_depth"] == 0
+    assert manager.hot_keys()[0][0] == 7
+
+
+def test_group_commit_batches_concurrent_purchases(tmp_path, monkeypatch):
+    """
+    Compras simultâneas devem ser confirmadas em lotes, cada
+    chamador recebendo seu próprio resultado.
+    """
+
+    # Registrar as instruções executadas pelas conexões do pool
+    statements = []
+    open_connection = database.connect
+
+    def traced_connect(path):
+        conn = open_connection(path)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(database, "connect", traced_connect)
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "group.db")))
+    database.start_db()
+    statements.clear()
+
+    committer = GroupCommitter(window_ms=50, max_batch=16)
+    committer.start()
+
+    results = []
+    lock = threading.Lock()
+
+    def buy(index):
+        # Sessões 1 e 2 (100 ingressos cada) recebem 4 compras de 30
+        result = committer.submit(f"User{index}", f"group{index}@mail.com", 1 + index % 2, 30)
+        with lock:
+            results.append(result["status"])
+
+    threads = [threading.Thread(target=buy, args=(i,)) for i in range(8)]
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    committer.stop()
+    stats = committer.stats()
+    database.close_pool()
+
+    # Estoque suficiente para apenas 3 compras em cada sessão
+    assert results.count("success") == 6
+    assert results.count("error") == 2
+    assert stats["purchases"] == 8
+    assert stats["batches"] < 8
+
+    # Exatamente uma transação (BEGIN + COMMIT) por lote
+    assert statements.count("BEGIN IMMEDIATE") == stats["batches"]
+    assert statements.count("COMMIT") == stats["batches"]
+
+
+def test_group_commit_drops_expired_purchases(tmp_path, monkeypatch):
+    """
+    Compra cujo prazo vence ainda na fila não entra no lote: o
+    cliente já desistiu e o estoque não muda.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "expired.db")))
+    database.start_db()
+
+    committer = GroupCommitter(window_ms=50, max_batch=16)
+    committer.start()
+
+    expired = committer.submit("Ana", "ana@mail.com", 1, 5, deadline=time.monotonic() + 0.01)
+    bought = committer.submit("Bia", "bia@mail.com", 1, 5, deadline=time.monotonic() + 5)
+
+    committer.stop()
+    stats = committer.stats()
+    database.close_pool()
+
+    assert expired is None
+    assert bought["status"] == "success"
+    assert stats["expired"] == 1
+    assert stats["purchases"] == 1
+
+
+def test_group_commit_caller_gives_up_on_stalled_writer(tmp_path, monkeypatch):
+    """
+    Com a thread de escrita presa em um lote, o pedido seguinte
+    desiste no próprio prazo sem comprar; o que já estava em commit
+    recebe seu resultado.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "stalled.db")))
+    database.start_db()
+
+    buy_tickets_group = database.buy_tickets_group
+    stalled = threading.Event()
+    release = threading.Event()
+
+    def stalled_group(purchases):
+        stalled.set()
+        release.wait(5)
+        return buy_tickets_group(purchases)
+
+    monkeypatch.setattr(database, "buy_tickets_group", stalled_group)
+
+    committer = GroupCommitter(window_ms=1, max_batch=16)
+    committer.start()
+
+    first = []
+    thread = threading.Thread(
+        target=lambda: first.append(committer.submit("Ana", "ana@mail.com", 1, 1))
+    )
+    thread.start()
+    assert stalled.wait(2)
+
+    start = time.monotonic()
+    second = committer.submit("Bia", "bia@mail.com", 1, 1, deadline=time.monotonic() + 0.2)
+    elapsed = time.monotonic() - start
+
+    release.set()
+    thread.join()
+    committer.stop()
+    stats = committer.stats()
+
+    assert second is None
+    assert elapsed < 1
+    assert first[0]["status"] == "success"
+    assert stats["expired"] == 1
+    assert dict(database.load_inventory())[1] == 99
+
+    database.close_pool()
+
+
+def test_group_commit_stop_fails_leftover_purchases():
+    """
+    Pedido que sobra na fila quando a thread de escrita termina recebe
+    erro, em vez de prender o chamador para sempre.
+    """
+
+    committer = GroupCommitter()
+
+    # Em execução, mas sem thread de escrita (ex.: ela terminou com falha)
+    committer._running = True
+
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(committer.submit("Ana", "ana@mail.com", 1, 1))
+    )
+    thread.start()
+
+    while committer.stats()["queue_depth"] == 0:
+        time.sleep(0.01)
+
+    committer.stop()
+    thread.join(2)
+
+    assert not thread.is_alive()
+    assert results[0]["status"] == "error"
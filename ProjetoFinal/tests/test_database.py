@@ -0,0 +1,280 @@
+"""
+test_database.py
+
+Testes da Camada de Persistência.
+
+Valida se:
+- O pool reutiliza conexões entre requisições da mesma thread
+- O pool respeita o tamanho máximo configurado
+- O encerramento do pool fecha as conexões
+- As migrações atualizam bancos existentes
+- O perfil de durabilidade é aplicado às conexões
+- Holds expirados são devolvidos ao estoque
+- Compras com chave de idempotência são aplicadas uma única vez
+- Réplicas de leitura acompanham o principal de forma incremental
+"""
+
+import sqlite3
+import threading
+import time
+import pytest
+
+from core import database
+from core.database import (
+    ConnectionPool, MIGRATIONS, connect, create_tables, get_profile, migrate
+)
+
+
+def test_pool_reuses_thread_connection(tmp_path):
+    """
+    A mesma thread deve receber a mesma conexão "quente".
+    """
+
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+
+    with pool.connection() as first:
+        pass
+
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert pool.stats()["open"] == 1
+
+    pool.close()
+
+
+def test_pool_respects_size(tmp_path):
+    """
+    Com o pool esgotado, novas requisições aguardam até o timeout.
+    """
+
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.2)
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold_connection():
+        with pool.connection():
+            acquired.set()
+            release.wait()
+
+    t = threading.Thread(target=hold_connection)
+    t.start()
+    acquired.wait()
+
+    with pytest.raises(TimeoutError):
+        with pool.connection():
+            pass
+
+    release.set()
+    t.join()
+
+    pool.close()
+    assert pool.stats()["open"] == 0
+
+
+def test_migrations_upgrade_existing_database(tmp_path):
+    """
+    Um banco criado sem índices deve ser atualizado no lugar,
+    registrando a versão de schema, e as consultas devem usar os índices.
+    """
+
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    cursor = conn.cursor()
+    create_tables(cursor)
+
+    version = migrate(cursor)
+
+    assert version == MIGRATIONS[-1][0]
+    assert migrate(cursor) == version  # Idempotente
+
+    cursor.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT id, time, total_tickets, available_tickets
+        FROM screenings WHERE movie_id = ? ORDER BY time
+    """, (1,))
+    plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+
+    assert "idx_screenings_movie_time" in plan
+    conn.close()
+
+
+def test_connect_applies_durability_profile(tmp_path):
+    """
+    A conexão deve usar WAL e o nível de sincronização do perfil.
+    """
+
+    conn = connect(str(tmp_path / "profile.db"), profile="fast")
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0  # OFF
+
+    conn.close()
+
+    with pytest.raises(ValueError):
+        get_profile("inexistente")
+
+
+def test_expired_holds_return_to_stock(tmp_path, monkeypatch):
+    """
+    Holds expirados devem voltar ao estoque em lote e não podem ser confirmados.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "holds.db")))
+    database.start_db()
+
+    now = time.time()
+    database.create_hold("expirado", 1, 10, now - 1)
+    database.create_hold("valido", 1, 5, now + 60)
+
+    assert dict(database.load_inventory())[1] == 85
+
+    assert database.expire_holds(now) == [1]
+    assert dict(database.load_inventory())[1] == 95
+
+    assert database.confirm_hold("expirado", "Ana", "ana@mail.com", now)["status"] == "error"
+    assert database.confirm_hold("valido", "Ana", "ana@mail.com", now)["status"] == "success"
+
+    database.close_pool()
+
+
+def test_idempotent_purchase_is_applied_once(tmp_path, monkeypatch):
+    """
+    Repetir a compra com a mesma chave retorna o resultado original
+    sem descontar o estoque novamente.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "idempotency.db")))
+    database.start_db()
+
+    first = database.buy_tickets("Ana", "ana@mail.com", 1, 2, "chave-1")
+    replay = database.buy_tickets("Ana", "ana@mail.com", 1, 2, "chave-1")
+
+    assert first["status"] == "success"
+    assert replay == first
+    assert dict(database.load_inventory())[1] == 98
+    assert len(database.get_purchases_by_email("ana@mail.com")) == 1
+
+    # Mesma chave com outra compra é recusada
+    conflict = database.buy_tickets("Ana", "ana@mail.com", 1, 3, "chave-1")
+    assert conflict["status"] == "error"
+    assert dict(database.load_inventory())[1] == 98
+
+    # Compra em lote: a repetição não desconta o estoque de novo
+    items = [(2, 4), (3, 1)]
+    batch = database.buy_tickets_batch("Ana", "ana@mail.com", items, "lote-1")
+    assert batch["status"] == "success"
+    assert database.buy_tickets_batch("Ana", "ana@mail.com", items, "lote-1") == batch
+    assert database.buy_tickets_batch("Ana", "ana@mail.com", [(2, 5)], "lote-1")["status"] == "error"
+
+    # Lote recusado (desfeito) também guarda o resultado da chave
+    refused = database.buy_tickets_batch("Ana", "ana@mail.com", [(2, 1), (3, 1000)], "lote-2")
+    assert refused["status"] == "error"
+    assert database.buy_tickets_batch("Ana", "ana@mail.com", [(2, 1), (3, 1000)], "lote-2") == refused
+
+    inventory = dict(database.load_inventory())
+    assert (inventory[2], inventory[3]) == (96, 99)
+    assert len(database.get_purchases_by_email("ana@mail.com")) == 3
+
+    database.close_pool()
+
+
+def test_idempotency_keys_are_bounded(tmp_path, monkeypatch):
+    """
+    A limpeza remove chaves expiradas e as mais antigas acima do limite.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "idempotency.db")))
+    monkeypatch.setattr(database, "IDEMPOTENCY_MAX_KEYS", 3)
+    database.start_db()
+
+    for i in range(5):
+        database.buy_tickets("Ana", "ana@mail.com", 1, 1, f"chave-{i}")
+
+    with database.get_connection() as conn:
+        cursor = conn.cursor()
+        database.purge_idempotency_keys(cursor, time.time())
+        cursor.execute("SELECT key FROM idempotency_keys ORDER BY created_at")
+        keys = [row[0] for row in cursor.fetchall()]
+
+    assert keys == ["chave-2", "chave-3", "chave-4"]
+
+    database.close_pool()
+
+
+def test_replica_follows_primary_incrementally(tmp_path, monkeypatch):
+    """
+    A réplica recebe uma cópia completa, em páginas, e depois só as
+    alterações (inclusive as feitas durante a cópia).
+    """
+
+    primary = ConnectionPool(str(tmp_path / "primary.db"))
+    replica = ConnectionPool(str(tmp_path / "replica.db"))
+
+    for pool in (primary, replica):
+        monkeypatch.setattr(database, "_pool", pool)
+        database.start_db()
+
+    # Sem réplicas, as compras não pagam o custo do log de replicação
+    monkeypatch.setattr(database, "_pool", primary)
+    database.buy_tickets("Caio", "caio@mail.com", 3, 1)
+
+    with database.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM replication_log").fetchone()[0] == 0
+
+    # Réplica sem dados: o principal exige cópia completa
+    assert database.replication_changes(-1, 100) is None
+    assert database.replication_changes(0, 100) is None
+
+    pages = []
+
+    for table in database.REPLICATED_TABLES:
+        after_id = 0
+
+        while True:
+            page = database.replication_snapshot_page(table, after_id, 2)
+            pages.append((page["seq"], table, page["columns"], page["rows"]))
+
+            if len(page["rows"]) < 2:
+                break
+
+            after_id = page["rows"][-1][0]
+
+        # Compra durante a cópia: a compra vem nas páginas, mas o
+        # cliente e o estoque da sessão só nas alterações seguintes
+        if table == "clients":
+            database.buy_tickets("Bia", "bia@mail.com", 2, 1)
+
+    seq = pages[0][0]
+    catch_up = [database.replication_changes(seq, 100)]
+    copied = sum(len(rows) for _, table, _, rows in pages if table == "screenings")
+
+    monkeypatch.setattr(database, "_pool", replica)
+    seq = database.apply_replication_snapshot(pages, lambda since: catch_up)
+
+    assert seq == catch_up[0]["head"]
+    assert database.get_replication_state()[0] == seq
+    assert len(database.load_inventory()) == copied
+    assert dict(database.load_inventory())[2] == 99
+    assert len(database.get_purchases_by_email("bia@mail.com")) == 1
+
+    # Compra no principal chega à réplica como alteração incremental
+    monkeypatch.setattr(database, "_pool", primary)
+    database.buy_tickets("Ana", "ana@mail.com", 1, 4)
+    changes = database.replication_changes(seq, 100)
+
+    assert changes["upto"] == changes["head"] > seq
+    assert {table for table, _, _ in changes["changes"]} == {"screenings", "clients", "purchases"}
+
+    monkeypatch.setattr(database, "_pool", replica)
+    screenings, movies_changed = database.apply_replication_changes(
+        changes["upto"], changes["columns"], changes["changes"]
+    )
+
+    assert screenings == {1}
+    assert not movies_changed
+    assert dict(database.load_inventory())[1] == 96
+    assert len(database.get_purchases_by_email("ana@mail.com")) == 1
+
+    primary.close()
+    replica.close()
@@ -0,0 +1,266 @@
+"""
+test_discovery.py
+
+Testes do cache de descoberta do cliente.
+
+Valida se:
+- Dentro do TTL, o endereço é reutilizado sem consultar o Name Server
+- Vencido o TTL, o endereço antigo é usado enquanto é revalidado
+- Com o Name Server fora do ar, o endereço conhecido continua em uso
+- Serviço não registrado é lembrado pelo TTL negativo
+- Só a falha de conexão ao endereço em cache o invalida
+- Reconexões do ClientCore não consultam o Name Server
+- A troca de instância prefere a de menor carga informada, e uma
+  instância sobrecarregada é trocada mesmo continuando ativa
+- Com a assinatura (watch), mudanças do registro chegam por callback
+  e o cliente troca de instância sem consultar o lookup
+- Eventos recebidos antes da lista inicial da assinatura não se perdem
+"""
+
+import time
+
+import pytest
+import rpyc
+
+from client.client_core import ClientCore
+from client.discovery import DiscoveryCache, RegistryWatcher
+from config import NAME_SERVER_HOST, NAME_SERVER_PORT
+from core.watch import WatchHub
+
+
+class FakeNameServer:
+    def __init__(self, address):
+        self.address = address
+        self.calls = 0
+        self.down = False
+
+    def resolve(self, service_name):
+        self.calls += 1
+
+        if self.down:
+            raise ConnectionRefusedError("Name Server fora do ar")
+
+        return self.address
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+
+    return False
+
+
+def test_fresh_and_stale_entries():
+    name_server = FakeNameServer(("localhost", 1))
+    cache = DiscoveryCache(name_server.resolve, ttl=0.1)
+
+    assert cache.get("svc") == ("localhost", 1)
+    assert cache.get("svc") == ("localhost", 1)
+    assert name_server.calls == 1
+
+    # Vencido: responde na hora com o antigo e revalida em segundo plano
+    name_server.address = ("localhost", 2)
+    time.sleep(0.15)
+
+    assert cache.get("svc") == ("localhost", 1)
+    assert wait_until(lambda: cache.get("svc") == ("localhost", 2))
+    assert cache.stats()["stale_hits"] >= 1
+
+
+def test_name_server_outage_keeps_known_address():
+    name_server = FakeNameServer(("localhost", 1))
+    cache = DiscoveryCache(name_server.resolve, ttl=0.05)
+
+    cache.get("svc")
+    name_server.down = True
+    time.sleep(0.1)
+
+    for _ in range(3):
+        assert cache.get("svc") == ("localhost", 1)
+
+    assert wait_until(lambda: cache.stats()["lookup_errors"] >= 1)
+
+    # Sem endereço conhecido, a falha do Name Server chega ao chamador
+    with pytest.raises(ConnectionRefusedError):
+        cache.get("outro")
+
+
+def test_negative_caching_and_invalidation():
+    name_server = FakeNameServer(None)
+    cache = DiscoveryCache(name_server.resolve, ttl=60, negative_ttl=0.1)
+
+    assert cache.get("svc") is None
+    assert cache.get("svc") is None
+    assert name_server.calls == 1
+
+    name_server.address = ("localhost", 1)
+    time.sleep(0.15)
+    assert cache.get("svc") == ("localhost", 1)
+
+    # Invalidação de um endereço que não é o do cache é ignorada
+    cache.invalidate("svc", ("localhost", 9))
+    assert cache.get("svc") == ("localhost", 1)
+
+    cache.invalidate("svc", ("localhost", 1))
+    assert cache.get("svc") == ("localhost", 1)
+    assert name_server.calls == 3
+
+
+def test_endpoint_choice_prefers_lower_load():
+    cache = DiscoveryCache(lambda name: pytest.fail("lookup inesperado"))
+    endpoints = {("localhost", 1): 4.0, ("localhost", 2): 900.0}
+
+    for _ in range(20):
+        cache.set_endpoints("svc", {})
+        cache.set_endpoints("svc", endpoints)
+        assert cache.get("svc") == ("localhost", 1)
+
+    # Instância atual continua ativa e sem sobrecarga: a escolha é mantida
+    cache.set_endpoints("svc", {("localhost", 1): 7.0, ("localhost", 2): 4.0})
+    assert cache.get("svc") == ("localhost", 1)
+    assert cache.stats()["rebalances"] == 0
+
+    # Carga da atual passa de rebalance_ratio vezes a da outra: nova escolha
+    cache.set_endpoints("svc", {("localhost", 1): 5000.0, ("localhost", 2): 1.0})
+    assert cache.get("svc") == ("localhost", 2)
+    assert cache.stats()["rebalances"] == 1
+
+
+def test_client_reconnect_skips_name_server():
+    core = ClientCore()
+    core.watch_registry = False
+
+    assert core.connect()
+    core.close()
+    assert core.connect()
+
+    stats = core.discovery.stats()
+    assert stats["lookups"] == 1
+    assert stats["hits"] == 1
+
+    core.close()
+
+
+def test_client_migrates_when_cache_points_elsewhere():
+    """
+    Com o cache indicando outra instância (ex.: a atual sobrecarregada),
+    o cliente troca de conexão antes da próxima chamada.
+    """
+
+    core = ClientCore()
+    core.watch_registry = False
+
+    try:
+        assert core.connect()
+        address = core.address
+
+        # Endereço desatualizado: o cliente deve voltar ao indicado pelo cache
+        core.address = ("localhost", 1)
+
+        assert core.get_stats()["status"] == "success"
+        assert core.address == address
+        assert core.rebalances == 1
+
+    finally:
+        core.close()
+
+
+def test_watch_hub_delivers_and_drops_dead_subscribers():
+    hub = WatchHub(queue_size=4, call_timeout=1)
+    received = []
+
+    def gone(*event):
+        raise EOFError("conexão encerrada")
+
+    alive_id = hub.subscribe("svc", lambda *event: received.append(event), owner="a")
+    hub.subscribe("svc", gone, owner="b")
+    hub.subscribe("outro", lambda *event: received.append(event), owner="a")
+
+    hub.publish("svc", "added", "localhost", 1)
+
+    assert wait_until(lambda: received == [("svc", "added", "localhost", 1, None)])
+    assert wait_until(lambda: hub.stats()["dropped"] == 1)
+
+    assert hub.unsubscribe_owner("a") == 2
+    assert not hub.unsubscribe(alive_id)
+    assert hub.stats()["subscribers"] == 0
+
+
+class EarlyEventsRoot:
+    """
+    Name Server que entrega eventos antes de watch() retornar a lista
+    de instâncias (montada antes deles).
+    """
+
+    def watch(self, service_name, callback):
+        instances = (("localhost", 1, None),)
+
+        callback(service_name, "added", "localhost", 2, None)
+        callback(service_name, "removed", "localhost", 1, None)
+
+        return 1, instances
+
+
+class EarlyEventsConnection:
+    root = EarlyEventsRoot()
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_watcher_keeps_events_received_before_snapshot(monkeypatch):
+    monkeypatch.setattr(rpyc, "connect", lambda *args, **kwargs: EarlyEventsConnection())
+    monkeypatch.setattr(rpyc, "BgServingThread", lambda conn: None)
+
+    discovery = DiscoveryCache(lambda name: pytest.fail("lookup inesperado"))
+    watcher = RegistryWatcher(discovery, "localhost", 0, ("svc",))
+    watcher.start()
+
+    assert watcher.endpoints["svc"] == {("localhost", 2): None}
+    assert discovery.get("svc") == ("localhost", 2)
+    assert watcher.events == 2
+
+    watcher.stop()
+
+
+def test_client_follows_registry_changes():
+    """
+    Instância removida no Name Server: o cache troca para outra
+    instância ativa sem nenhum lookup.
+    """
+
+    service = "teste_watch"
+    discovery = DiscoveryCache(lambda name: pytest.fail("lookup inesperado"), ttl=0.01)
+    watcher = RegistryWatcher(discovery, NAME_SERVER_HOST, NAME_SERVER_PORT, (service,))
+
+    conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
+
+    try:
+        conn.root.register(service, "localhost", 40011)
+        watcher.start()
+
+        assert discovery.get(service) == ("localhost", 40011)
+
+        conn.root.register(service, "localhost", 40012)
+        assert wait_until(lambda: len(watcher.endpoints[service]) == 2)
+
+        conn.root.unregister(service, "localhost", 40011)
+        assert wait_until(lambda: discovery.get(service) == ("localhost", 40012))
+
+        conn.root.unregister(service, "localhost", 40012)
+        assert wait_until(lambda: discovery.get(service) is None)
+
+        assert discovery.stats()["lookups"] == 0
+
+    finally:
+        watcher.stop()
+
+        for port in (40011, 40012):
+            conn.root.unregister(service, "localhost", port)
+
+        conn.close()
@@ -3,10 +3,19 @@ test_failure.py
 
 Testes de falha e validação de entrada.
 
-Valida se o servidor trata entradas inválidas corretamente.
+Valida se o servidor trata entradas inválidas corretamente
+e se os prazos (deadlines) das requisições são respeitados.
 """
 
+import threading
+import time
+
+import rpyc
+from rpyc.utils.server import ThreadedServer
+
 from client.client_core import ClientCore
+from config import SERVER_HOST, SERVER_PORT
+from serialization import decode
 
 
 def test_invalid_movie_id():
@@ -21,4 +30,89 @@ def test_invalid_movie_id():
 
     assert result["status"] == "error"
 
-    core.close()
\ No newline at end of file
+    core.close()
+
+
+def test_server_drops_expired_request():
+    """
+    Pedido com prazo já esgotado é descartado e contabilizado pelo servidor.
+    """
+
+    conn = rpyc.connect(SERVER_HOST, SERVER_PORT)
+
+    result = decode(conn.root.list_movies(deadline_ms=0))
+    stats = decode(conn.root.stats())["data"]
+
+    assert result["status"] == "error"
+    assert stats["methods"]["list_movies"]["deadline_exceeded"]["count"] >= 1
+    assert stats["deadline_exceeded"] >= 1
+
+    conn.close()
+
+
+class SlowService(rpyc.Service):
+    def exposed_slow(self, deadline_ms=None):
+        time.sleep(2)
+        return "tarde demais"
+
+    def exposed_buy_tickets(self, *args, deadline_ms=None):
+        time.sleep(2)
+        return "tarde demais"
+
+
+def start_slow_server():
+    server = ThreadedServer(SlowService, hostname="localhost", port=0)
+    thread = threading.Thread(target=server.start, daemon=True)
+    thread.start()
+
+    while not server.active:
+        time.sleep(0.01)
+
+    return server
+
+
+def test_client_gives_up_at_deadline():
+    """
+    O cliente não fica preso a um servidor travado além do prazo.
+    """
+
+    server = start_slow_server()
+    core = ClientCore()
+
+    try:
+        core.conn = rpyc.connect("localhost", server.port)
+
+        start = time.monotonic()
+        result = core._retry_call("slow", timeout=0.3)
+        elapsed = time.monotonic() - start
+
+        assert result["status"] == "error"
+        assert elapsed < 1
+        assert core.deadline_exceeded == 1
+
+    finally:
+        core.close()
+        server.close()
+
+
+def test_purchase_timeout_reports_unknown_outcome():
+    """
+    Compra enviada sem resposta no prazo pode ter sido concluída: o
+    resultado é "unknown" e traz a chave para repetir com segurança.
+    """
+
+    server = start_slow_server()
+    core = ClientCore()
+
+    try:
+        core.conn = rpyc.connect("localhost", server.port)
+
+        result = core.buy_tickets("Ana", "ana@email.com", 1, 1, idempotency_key="chave-1", timeout=0.3)
+
+        assert result["status"] == "unknown"
+        assert result["data"] == {"idempotency_key": "chave-1"}
+        assert core.deadline_exceeded == 1
+
+    finally:
+        core.close()
+        server.close()
@@ -24,7 +24,7 @@ def test_list_movies():
     result = core.list_movies()
     
     assert result["status"] == "success"
-    assert isinstance(result["data"], list)
+    assert isinstance(result["data"], tuple)
     assert len(result["data"]) > 0
     
     core.close()
@@ -48,4 +48,167 @@ def test_buy_tickets_success():
     assert result["status"] == "success"
     assert "available_tickets" in result["data"]
 
-    core.close()
\ No newline at end of file
+    core.close()
+
+
+def test_buy_tickets_batch_all_or_nothing():
+    """
+    Testa compra em lote: sucesso de todos os itens e
+    cancelamento de todos quando um item falha.
+    """
+
+    core = ClientCore()
+    assert core.connect()
+
+    result = core.buy_tickets_batch("Lote", "lote@email.com", [(3, 2), (4, 1)])
+
+    assert result["status"] == "success"
+    assert [item["available_tickets"] for item in result["data"]["items"]] == [98, 99]
+
+    result = core.buy_tickets_batch("Lote", "lote@email.com", [(3, 1), (4, 1000)])
+
+    assert result["status"] == "error"
+    assert [item["status"] for item in result["data"]["items"]] == ["cancelled", "error"]
+
+    # Nenhum item do lote com falha foi confirmado
+    screenings = core.list_screenings_by_movie(3)
+    assert screenings["data"][0][3] == 98
+
+    core.close()
+
+
+def test_keyset_pagination():
+    """
+    Testa paginação por cursor do catálogo e do histórico de compras.
+    """
+
+    core = ClientCore()
+    assert core.connect()
+
+    # Catálogo: percorrer todas as páginas sem repetir filmes
+    ids = []
+    token = None
+
+    while True:
+        result = core.list_movies(7, token)
+        assert result["status"] == "success"
+
+        ids += [movie[0] for movie in result["data"]["items"]]
+        token = result["data"]["next_page_token"]
+
+        if not token:
+            break
+
+    assert ids == sorted(set(ids))
+    assert len(ids) == len(core.list_movies()["data"])
+
+    # Histórico: 3 compras em páginas de 2
+    for _ in range(3):
+        assert core.buy_tickets("Pag", "paginacao@email.com", 5, 1)["status"] == "success"
+
+    first = core.get_purchases_by_email("paginacao@email.com", 2)
+    token = first["data"]["next_page_token"]
+
+    assert len(first["data"]["items"]) == 2
+    assert token
+
+    second = core.get_purchases_by_email("paginacao@email.com", 2, token)
+
+    assert len(second["data"]["items"]) == 1
+    assert second["data"]["next_page_token"] is None
+
+    assert core.list_movies(2, "token-invalido")["status"] == "error"
+
+    core.close()
+
+
+def test_hold_confirm_and_release():
+    """
+    Testa reserva temporária: o hold desconta o estoque, a confirmação
+    registra a compra e a liberação devolve os ingressos.
+    """
+
+    core = ClientCore()
+    assert core.connect()
+
+    hold = core.hold_tickets(6, 10)
+    assert hold["status"] == "success"
+    hold_id = hold["data"]["hold_id"]
+    assert hold["data"]["available_tickets"] == 90
+
+    confirm = core.confirm_hold(hold_id, "Hold", "hold@email.com")
+    assert confirm["status"] == "success"
+
+    # Um hold só pode ser confirmado uma vez
+    assert core.confirm_hold(hold_id, "Hold", "hold@email.com")["status"] == "error"
+
+    hold = core.hold_tickets(6, 5)
+    hold_id = hold["data"]["hold_id"]
+    assert core.release_hold(hold_id)["status"] == "success"
+
+    screenings = core.list_screenings_by_movie(6)
+    assert screenings["data"][0][3] == 90
+
+    core.close()
+
+
+def test_responses_are_materialized_by_value():
+    """
+    A resposta deve continuar acessível após fechar a conexão:
+    os dados chegam por valor, não como proxies remotos.
+    """
+
+    core = ClientCore()
+    assert core.connect()
+
+    result = core.list_screenings_by_movie(1)
+    stats = core._retry_call("lock_stats")
+
+    core.close()
+
+    assert result["data"][0][0] == 1
+    assert all(isinstance(row, tuple) for row in result["data"])
+    assert isinstance(stats["data"]["stripes"], tuple)
+
+
+def test_stats_reports_latency_by_outcome():
+    """
+    Testa se as chamadas aparecem nos histogramas, separadas por resultado.
+    """
+
+    core = ClientCore()
+    assert core.connect()
+
+    core.list_movies()
+    core.buy_tickets("Teste", "teste@email.com", 1, 0)
+
+    result = core.get_stats()
+    methods = result["data"]["methods"]
+
+    assert result["status"] == "success"
+    assert methods["list_movies"]["success"]["count"] >= 1
+    assert methods["buy_tickets"]["business_error"]["count"] >= 1
+    assert result["data"]["requests"] >= 2
+
+    core.close()
+
+
+def test_buy_tickets_retry_with_same_key_is_not_charged_twice():
+    """
+    Testa se repetir uma compra com a mesma chave de idempotência
+    não vende os ingressos novamente.
+    """
+
+    core = ClientCore()
+    assert core.connect()
+
+    first = core.buy_tickets("Teste", "idempotencia@email.com", 7, 2, "chave-integracao")
+    replay = core.buy_tickets("Teste", "idempotencia@email.com", 7, 2, "chave-integracao")
+
+    assert first["status"] == "success"
+    assert replay == first
+
+    purchases = core.get_purchases_by_email("idempotencia@email.com")
+    assert len(purchases["data"]) == 1
+
+    core.close()
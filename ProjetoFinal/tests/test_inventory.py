@@ -0,0 +1,217 @@
+"""
+test_inventory.py
+
+Testes do inventário em memória com persistência write-behind.
+
+Valida se:
+- Compras são admitidas contra o estoque em memória
+- A fila de escrita persiste as compras no banco
+- Operações do journal não persistidas são reaplicadas após uma queda
+- Chaves de idempotência sobrevivem ao reinício do inventário
+- Falhas seguidas de gravação suspendem as vendas até o banco voltar
+- Sob carga contínua, o journal é compactado e não cresce sem limite
+"""
+
+import json
+import time
+
+from core import database
+from core.database import ConnectionPool
+from core.inventory import InventoryEngine
+
+
+def test_inventory_write_behind_and_replay(tmp_path, monkeypatch):
+    """
+    Persiste compras admitidas e recupera o journal após uma queda simulada.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "inventory.db")))
+    database.start_db()
+
+    journal_path = str(tmp_path / "inventory.journal")
+
+    engine = InventoryEngine(journal_path=journal_path)
+    engine.start()
+
+    result = engine.purchase("Ana", "ana@mail.com", 1, 3)
+
+    assert result["status"] == "success"
+    assert result["data"]["available_tickets"] == 97
+    assert engine.purchase("Ana", "ana@mail.com", 1, 500)["status"] == "error"
+
+    # stop() aguarda a fila ser persistida
+    engine.stop()
+
+    assert dict(database.load_inventory())[1] == 97
+    assert len(database.get_purchases_by_email("ana@mail.com")) == 1
+
+    # Simular queda: compra gravada no journal, mas não aplicada ao banco
+    pending = {
+        "seq": database.get_inventory_checkpoint() + 1,
+        "name": "Ana",
+        "email": "ana@mail.com",
+        "screening_id": 1,
+        "quantity": 2,
+        "timestamp": "2024-03-01 18:00:00"
+    }
+
+    with open(journal_path, "w", encoding="utf-8") as journal:
+        journal.write(json.dumps(pending) + "\n")
+        journal.write('{"seq": ')  # Linha incompleta interrompida pela queda
+
+    engine = InventoryEngine(journal_path=journal_path)
+    engine.start()
+
+    assert engine.available(1) == 95
+    assert engine.stats()["replayed"] == 1
+
+    engine.stop()
+    database.close_pool()
+
+
+def test_inventory_idempotency_survives_restart(tmp_path, monkeypatch):
+    """
+    A chave de uma compra admitida em memória é persistida com ela:
+    após reiniciar, a repetição ainda retorna o resultado original.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "inventory.db")))
+    database.start_db()
+
+    journal_path = str(tmp_path / "inventory.journal")
+
+    engine = InventoryEngine(journal_path=journal_path)
+    engine.start()
+
+    first = engine.purchase("Ana", "ana@mail.com", 1, 3, "chave-1")
+    assert engine.purchase("Ana", "ana@mail.com", 1, 3, "chave-1") == first
+    assert engine.available(1) == 97
+
+    items = [(2, 2), (3, 1)]
+    batch = engine.purchase_batch("Ana", "ana@mail.com", items, "lote-1")
+    assert engine.purchase_batch("Ana", "ana@mail.com", items, "lote-1") == batch
+    assert (engine.available(2), engine.available(3)) == (98, 99)
+
+    engine.stop()
+
+    engine = InventoryEngine(journal_path=journal_path)
+    engine.start()
+
+    assert engine.purchase("Ana", "ana@mail.com", 1, 3, "chave-1") == first
+    assert engine.purchase("Ana", "ana@mail.com", 1, 1, "chave-1")["status"] == "error"
+    assert engine.available(1) == 97
+
+    assert engine.purchase_batch("Ana", "ana@mail.com", items, "lote-1") == batch
+    assert engine.purchase_batch("Ana", "ana@mail.com", [(2, 1)], "lote-1")["status"] == "error"
+    assert (engine.available(2), engine.available(3)) == (98, 99)
+
+    engine.stop()
+    database.close_pool()
+
+
+def test_inventory_suspends_sales_while_database_fails(tmp_path, monkeypatch):
+    """
+    Lote recusado pelo banco é reenviado com espera; após o limite de
+    falhas, novas vendas são suspensas e voltam quando o lote é gravado.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "suspend.db")))
+    database.start_db()
+
+    apply_purchases = database.apply_purchases
+    failing = [True]
+
+    def flaky_apply(operations):
+        if failing[0]:
+            raise RuntimeError("disco cheio")
+        apply_purchases(operations)
+
+    monkeypatch.setattr(database, "apply_purchases", flaky_apply)
+
+    engine = InventoryEngine(
+        journal_path=str(tmp_path / "suspend.journal"),
+        max_flush_retries=2, flush_backoff=0.01
+    )
+    engine.start()
+
+    def wait_for(condition):
+        deadline = time.time() + 2
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert engine.purchase("Ana", "ana@mail.com", 1, 3)["status"] == "success"
+
+    wait_for(lambda: engine.stats()["suspended"])
+    stats = engine.stats()
+
+    assert stats["suspended"]
+    assert stats["flush_failures"] >= 2
+    assert stats["last_flush_error"] == "disco cheio"
+    assert engine.purchase("Bia", "bia@mail.com", 1, 1)["status"] == "error"
+
+    # Banco recuperado: o lote é gravado e as vendas retomadas
+    failing[0] = False
+    wait_for(lambda: not engine.stats()["suspended"])
+
+    assert engine.purchase("Bia", "bia@mail.com", 1, 1)["status"] == "success"
+
+    engine.stop()
+
+    assert dict(database.load_inventory())[1] == 96
+    assert engine.stats()["suspensions"] == 1
+    database.close_pool()
+
+
+def test_inventory_journal_stays_bounded_under_load(tmp_path, monkeypatch):
+    """
+    Uma nova compra chega enquanto cada lote é gravado, então a fila
+    nunca esvazia: o journal é compactado em vez de crescer, e a
+    recuperação continua correta.
+    """
+
+    monkeypatch.setattr(database, "_pool", ConnectionPool(str(tmp_path / "bounded.db")))
+    database.start_db()
+
+    journal_path = str(tmp_path / "bounded.journal")
+    apply_purchases = database.apply_purchases
+    journal_sizes = []
+
+    engine = InventoryEngine(journal_path=journal_path, batch_size=5, journal_compact_ops=10)
+
+    def busy_apply(operations):
+        apply_purchases(operations)
+
+        with open(journal_path, encoding="utf-8") as journal:
+            journal_sizes.append(sum(1 for _ in journal))
+
+        # Nova compra durante a gravação do lote
+        if engine.stats()["admitted"] < 60:
+            engine.purchase("Ana", "ana@mail.com", 1, 1)
+
+    monkeypatch.setattr(database, "apply_purchases", busy_apply)
+    engine.start()
+
+    for _ in range(3):
+        engine.purchase("Ana", "ana@mail.com", 1, 1)
+
+    deadline = time.time() + 5
+    while engine.stats()["persisted"] < 60 and time.time() < deadline:
+        time.sleep(0.01)
+
+    stats = engine.stats()
+    engine.stop()
+
+    assert stats["persisted"] == 60
+    assert stats["journal_compactions"] >= 1
+    assert max(journal_sizes) <= 10 + 5 + 3
+    assert dict(database.load_inventory())[1] == 40
+
+    # Reinício após a compactação: nada é reaplicado em dobro
+    monkeypatch.setattr(database, "apply_purchases", apply_purchases)
+    engine = InventoryEngine(journal_path=journal_path)
+    engine.start()
+
+    assert engine.available(1) == 40
+
+    engine.stop()
+    database.close_pool()
@@ -0,0 +1,75 @@
+"""
+test_logging.py
+
+Testes do logging assíncrono.
+
+Valida se:
+- setup_logger não duplica handlers em chamadas repetidas
+- Mensagens INFO acima do limite de taxa são suprimidas
+- Com a fila cheia, registros são descartados sem bloquear
+"""
+
+import logging
+import time
+
+from core.color_logger import AsyncLogPipeline, RateLimitFilter, setup_logger
+
+
+class SlowHandler(logging.Handler):
+    """
+    Simula um terminal lento.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        time.sleep(0.01)
+        self.records.append(record.getMessage())
+
+
+def test_setup_logger_is_idempotent():
+    first = setup_logger("TesteIdempotente")
+    second = setup_logger("TesteIdempotente")
+
+    assert first is second
+    assert len(first.handlers) == 1
+    assert len(first.filters) == 1
+
+
+def test_rate_limit_suppresses_info_only():
+    rate_limit = RateLimitFilter(rate=1, burst=5)
+
+    info = logging.LogRecord("t", logging.INFO, __file__, 1, "info", None, None)
+    error = logging.LogRecord("t", logging.ERROR, __file__, 1, "erro", None, None)
+
+    accepted = sum(rate_limit.filter(info) for _ in range(20))
+
+    assert accepted == 5
+    assert rate_limit.suppressed == 15
+    assert rate_limit.filter(error)
+
+
+def test_full_queue_drops_without_blocking():
+    handler = SlowHandler()
+    pipeline = AsyncLogPipeline(queue_size=5, handler=handler)
+    pipeline.start()
+
+    logger = logging.getLogger("TesteFilaCheia")
+    logger.propagate = False
+    logger.addHandler(pipeline.handler)
+
+    start = time.perf_counter()
+    for i in range(100):
+        logger.warning(f"mensagem {i}")
+    elapsed = time.perf_counter() - start
+
+    pipeline.stop()
+    stats = pipeline.stats()
+
+    # 100 escritas síncronas levariam ~1 s
+    assert elapsed < 0.5
+    assert stats["dropped"] > 0
+    assert stats["written"] + stats["dropped"] == 100
+    assert handler.records[0] == "mensagem 0"
@@ -0,0 +1,100 @@
+"""
+test_metrics.py
+
+Testes da telemetria de latência dos métodos remotos.
+
+Valida se:
+- Os percentis do histograma respeitam o erro dos buckets
+- O resultado das chamadas é classificado corretamente
+- O relatório de carga conta as requisições em andamento e o p99
+  apenas das chamadas recentes
+"""
+
+import threading
+import time
+
+import pytest
+
+from core.metrics import LatencyHistogram, RequestMetrics
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+
+    # 90 chamadas de 1 ms e 10 chamadas de 100 ms
+    for _ in range(90):
+        histogram.record(0.001)
+    for _ in range(10):
+        histogram.record(0.100)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot["count"] == 100
+    assert 1.0 <= snapshot["p50_ms"] <= 1.2
+    assert 1.0 <= snapshot["p90_ms"] <= 1.2
+    assert 100.0 <= snapshot["p99_ms"] <= 119.0
+    assert snapshot["max_ms"] == 100.0
+
+
+def test_outcomes_are_classified():
+    metrics = RequestMetrics(window=10)
+
+    @metrics.timed
+    def exposed_operation(kind):
+        if kind == "crash":
+            raise RuntimeError("falha")
+
+        if kind == "internal":
+            metrics.mark_internal_error()
+
+        status = "success" if kind == "ok" else "error"
+        return {"status": status, "message": "", "data": None}
+
+    exposed_operation("ok")
+    exposed_operation("ok")
+    exposed_operation("invalid")
+    exposed_operation("internal")
+
+    with pytest.raises(RuntimeError):
+        exposed_operation("crash")
+
+    snapshot = metrics.snapshot()
+    operation = snapshot["methods"]["operation"]
+
+    assert operation["success"]["count"] == 2
+    assert operation["business_error"]["count"] == 1
+    assert operation["internal_error"]["count"] == 2
+    assert operation["calls"] == 5
+    assert snapshot["requests"] == 5
+
+
+def test_load_report_tracks_inflight_and_recent_p99():
+    metrics = RequestMetrics(window=10, recent_window=0.1)
+    release = threading.Event()
+
+    @metrics.timed
+    def exposed_slow():
+        release.wait()
+        return {"status": "success", "message": "", "data": None}
+
+    thread = threading.Thread(target=exposed_slow)
+    thread.start()
+
+    try:
+        deadline = time.monotonic() + 2
+        while metrics.load_report()["inflight"] != 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert metrics.load_report() == {"inflight": 1, "p99_ms": 0.0}
+
+    finally:
+        release.set()
+        thread.join()
+
+    report = metrics.load_report()
+    assert report["inflight"] == 0
+    assert report["p99_ms"] > 0
+
+    # Passadas duas janelas sem chamadas, a latência antiga é descartada
+    time.sleep(0.25)
+    assert metrics.load_report()["p99_ms"] == 0.0
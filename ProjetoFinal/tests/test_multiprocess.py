@@ -0,0 +1,153 @@
+"""
+test_multiprocess.py
+
+Testes do estado compartilhado entre processos workers.
+
+Valida se:
+- Invalidações publicadas por um processo chegam ao cache dos demais
+- Um processo muito atrasado descarta o cache inteiro
+- As estatísticas de cada worker são agregadas
+- O servidor com CINEMA_SERVER_PROCESSES=2 atende requisições e
+  server_stats agrega os dois workers
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import rpyc
+
+from config import SERVER_HOST, SERVER_PORT
+from core.cache import CatalogCache
+from core.multiprocess import SharedInvalidationLog, SharedStatsBoard
+from serialization import decode
+from tests.conftest import wait_for_port
+
+
+ctx = multiprocessing.get_context("fork")
+
+MULTIPROCESS_PORT = SERVER_PORT + 20
+
+
+def fill(cache, movie_id, screening_id):
+    cache.get_or_load(
+        ("screenings", movie_id),
+        lambda: [(screening_id, "2024-03-01 19:00", 100, 100)],
+        lambda rows: [("screening", row[0]) for row in rows]
+    )
+
+
+def test_invalidation_published_by_another_process():
+    """
+    Uma compra em outro worker invalida só a entrada da sessão comprada.
+    """
+
+    log = SharedInvalidationLog(ctx, capacity=16)
+    cache = CatalogCache(max_entries=10, ttl=60)
+
+    fill(cache, 1, 10)
+    fill(cache, 2, 20)
+
+    process = ctx.Process(target=log.publish, args=(10,))
+    process.start()
+    process.join()
+
+    log.sync(cache)
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["invalidations"] == 1
+
+
+def test_lagging_process_clears_cache():
+    """
+    Mais invalidações que a capacidade do log: o cache é descartado.
+    """
+
+    log = SharedInvalidationLog(ctx, capacity=4)
+    cache = CatalogCache(max_entries=10, ttl=60)
+
+    fill(cache, 1, 10)
+    fill(cache, 2, 20)
+
+    for screening_id in range(100, 110):
+        log.publish(screening_id)
+
+    log.sync(cache)
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_stats_aggregated_across_workers():
+    board = SharedStatsBoard(ctx, processes=3)
+
+    processes = [
+        ctx.Process(target=board.publish, args=(index, {"cache_hits": 5, "connections": index}))
+        for index in (0, 2)
+    ]
+
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    collected = board.collect()
+
+    assert collected["reporting"] == 2
+    assert collected["totals"]["cache_hits"] == 10
+    assert collected["totals"]["connections"] == 2
+    assert [row["worker"] for row in collected["workers"]] == [0, 2]
+    assert all(row["pid"] for row in collected["workers"])
+
+
+def test_server_with_two_processes(tmp_path):
+    """
+    Sobe o servidor com dois workers (porta e banco próprios): as
+    requisições são atendidas e server_stats agrega ambos os workers.
+    """
+
+    env = dict(
+        os.environ,
+        CINEMA_DB=str(tmp_path / "multiprocess.db"),
+        CINEMA_SERVER_PROCESSES="2",
+        CINEMA_SERVER_PORT=str(MULTIPROCESS_PORT)
+    )
+    server = subprocess.Popen([sys.executable, "-m", "core.server"], env=env)
+
+    try:
+        assert wait_for_port(MULTIPROCESS_PORT)
+
+        # Várias conexões: o kernel as distribui entre os workers
+        for _ in range(6):
+            conn = rpyc.connect(SERVER_HOST, MULTIPROCESS_PORT)
+            result = decode(conn.root.list_movies())
+            conn.close()
+
+            assert result["status"] == "success"
+            assert result["data"]
+
+        # Cada worker publica seus contadores periodicamente
+        deadline = time.monotonic() + 10
+
+        while True:
+            conn = rpyc.connect(SERVER_HOST, MULTIPROCESS_PORT)
+            stats = decode(conn.root.server_stats())["data"]
+            conn.close()
+
+            if stats["processes"]["reporting"] == 2 or time.monotonic() > deadline:
+                break
+
+            time.sleep(0.2)
+
+        processes = stats["processes"]
+
+        assert processes["reporting"] == 2
+        assert [row["worker"] for row in processes["workers"]] == [0, 1]
+        assert stats["worker"] in (0, 1)
+        assert len({row["pid"] for row in processes["workers"]}) == 2
+
+    finally:
+        server.terminate()
+        server.wait()
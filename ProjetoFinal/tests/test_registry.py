@@ -0,0 +1,309 @@
+"""
+test_registry.py
+
+Testes do registro de serviços do Name Server.
+
+Valida se:
+- Várias instâncias podem ser registradas com o mesmo nome
+- O lookup alterna entre as instâncias (round-robin)
+- A política least_loaded escolhe a menor carga informada
+- Com relatórios de carga, p2c e weighted desviam tráfego de
+  instâncias lentas ou sobrecarregadas
+- Instâncias removidas deixam de ser retornadas
+- Uma instância exclusiva não convive com outras no mesmo serviço
+- Leases vencidos nunca são retornados e são removidos pela varredura
+- Os eventos chegam aos assinantes e ao journal na ordem das mudanças
+- O registro é reconstruído do snapshot + journal após reiniciar,
+  com instâncias provisórias até o heartbeat do dono
+- O Name Server em execução distribui os lookups entre instâncias
+"""
+
+import threading
+import time
+
+import pytest
+import rpyc
+
+from config import NAME_SERVER_HOST, NAME_SERVER_PORT
+from core.registry import LeaseSweeper, RegistrationConflict, ServiceRegistry, routing_cost
+from core.registry_store import RegistryStore
+
+
+def test_round_robin_alternates_instances():
+    registry = ServiceRegistry()
+
+    assert registry.register("svc", "localhost", 1)
+    assert registry.register("svc", "localhost", 2)
+    assert not registry.register("svc", "localhost", 1)  # Atualização
+
+    picks = [registry.lookup("svc") for _ in range(4)]
+
+    assert picks == [("localhost", 1), ("localhost", 2)] * 2
+    assert registry.lookup("outro") is None
+
+
+def test_least_loaded_prefers_lowest_reported_load():
+    registry = ServiceRegistry(policy="least_loaded")
+
+    for port in (1, 2, 3):
+        registry.register("svc", "localhost", port)
+
+    registry.report_load("svc", "localhost", 1, 10)
+    registry.report_load("svc", "localhost", 2, 3)
+    registry.report_load("svc", "localhost", 3, 7)
+
+    assert {registry.lookup("svc") for _ in range(5)} == {("localhost", 2)}
+
+    # Empate: as instâncias empatadas se alternam
+    registry.report_load("svc", "localhost", 3, 3)
+    assert {registry.lookup("svc") for _ in range(4)} == {("localhost", 2), ("localhost", 3)}
+
+    # Instância desconhecida não recebe carga
+    assert not registry.report_load("svc", "localhost", 9, 0)
+
+
+def test_load_reports_steer_traffic():
+    events = []
+    registry = ServiceRegistry(policy="p2c", on_change=lambda *event: events.append(event))
+
+    for port in (1, 2, 3):
+        registry.register("svc", "localhost", port)
+
+    idle = {"inflight": 0, "utilization": 0.1, "p99_ms": 4}
+    slow = {"inflight": 2, "utilization": 0.5, "p99_ms": 80}
+    overloaded = {"inflight": 30, "utilization": 1.0, "p99_ms": 20}
+
+    assert routing_cost(idle) < routing_cost(slow) < routing_cost(overloaded)
+
+    registry.renew("svc", "localhost", 1, report=idle)
+    registry.renew("svc", "localhost", 2, report=slow)
+    registry.renew("svc", "localhost", 3, report=overloaded)
+
+    # p2c: a instância sobrecarregada nunca vence um sorteio
+    picks = [registry.lookup("svc") for _ in range(300)]
+    assert picks.count(("localhost", 3)) == 0
+    assert picks.count(("localhost", 1)) > picks.count(("localhost", 2))
+
+    picks = [registry.lookup("svc", "weighted") for _ in range(300)]
+    assert picks.count(("localhost", 1)) > 250
+
+    # Oscilações pequenas da carga não geram eventos para os assinantes
+    loads = [event for event in events if event[1] == "load"]
+    registry.renew("svc", "localhost", 1, report=dict(idle, p99_ms=4.2))
+    assert [event for event in events if event[1] == "load"] == loads
+
+    registry.renew("svc", "localhost", 1, report=slow)
+    assert events[-1][1:4] == ("load", "localhost", 1)
+
+
+def test_unregister_and_invalid_policy():
+    registry = ServiceRegistry()
+
+    registry.register("svc", "localhost", 1)
+    registry.register("svc", "localhost", 2)
+
+    assert registry.unregister("svc", "localhost", 1)
+    assert not registry.unregister("svc", "localhost", 1)
+    assert {registry.lookup("svc", "random") for _ in range(5)} == {("localhost", 2)}
+
+    with pytest.raises(ValueError):
+        registry.lookup("svc", "inexistente")
+
+
+def test_exclusive_instance_refuses_others():
+    registry = ServiceRegistry()
+
+    assert registry.register("svc", "localhost", 1, exclusive=True)
+    assert not registry.register("svc", "localhost", 1, exclusive=True)  # Renovação
+
+    with pytest.raises(RegistrationConflict):
+        registry.register("svc", "localhost", 2)
+
+    registry.register("outro", "localhost", 2)
+
+    with pytest.raises(RegistrationConflict):
+        registry.register("outro", "localhost", 3, exclusive=True)
+
+    # Lease vencido não bloqueia
+    registry.register("svc2", "localhost", 4, ttl=0.01, exclusive=True)
+    time.sleep(0.02)
+    assert registry.register("svc2", "localhost", 5)
+
+
+def test_expired_lease_is_never_returned():
+    """
+    Sem heartbeat, a instância some do lookup assim que o lease vence.
+    """
+
+    registry = ServiceRegistry(lease_ttl=60)
+
+    registry.register("svc", "localhost", 1, ttl=0.2)
+    registry.register("svc", "localhost", 2)
+
+    assert registry.renew("svc", "localhost", 1, load=4)
+    assert registry.instances("svc")[0]["load"] == 4
+
+    time.sleep(0.3)
+
+    # Vencido, mas ainda não varrido: lookup já o ignora
+    assert {registry.lookup("svc") for _ in range(4)} == {("localhost", 2)}
+    assert not registry.renew("svc", "localhost", 1)
+
+    sweeper = LeaseSweeper(registry)
+    assert sweeper.run_once() == [("svc", "localhost", 1)]
+    assert sweeper.stats()["evicted"] == 1
+
+    # Registrar de novo reativa a instância
+    assert registry.register("svc", "localhost", 1)
+    assert len(registry.instances("svc")) == 2
+
+
+def test_events_follow_registry_order():
+    """
+    A varredura remove um lease vencido enquanto a mesma instância se
+    registra de novo: os eventos chegam na ordem das mudanças, mesmo
+    com a entrega da remoção mais lenta.
+    """
+
+    events = []
+    removing = threading.Event()
+
+    def on_change(service, event, host, port, load, exclusive):
+        if event == "removed":
+            removing.set()
+            time.sleep(0.3)
+
+        events.append(event)
+
+    registry = ServiceRegistry(on_change=on_change)
+    registry.register("svc", "localhost", 1, ttl=0.01)
+    time.sleep(0.02)
+
+    sweeper = threading.Thread(target=registry.sweep)
+    sweeper.start()
+    assert removing.wait(2)
+
+    registry.register("svc", "localhost", 1)
+    sweeper.join()
+
+    assert events == ["added", "removed", "added"]
+    assert registry.lookup("svc") == ("localhost", 1)
+
+
+def test_registry_survives_restart(tmp_path):
+    """
+    Snapshot + journal reconstroem o registro; as instâncias restauradas
+    só são preferidas depois de confirmadas pelo heartbeat.
+    """
+
+    store = RegistryStore(str(tmp_path), compact_every=3)
+    assert store.open() == []
+
+    registry = ServiceRegistry(
+        on_change=lambda service, event, host, port, load, exclusive: store.append(event, service, host, port, exclusive)
+    )
+
+    for port in (1, 2, 3):
+        registry.register("svc", "localhost", port)   # Terceira operação compacta
+
+    registry.unregister("svc", "localhost", 1)
+    registry.register("outro", "localhost", 4)
+    registry.renew("svc", "localhost", 2, load=5)     # Carga não vai ao journal
+
+    assert store.stats()["compactions"] == 2
+    assert store.stats()["pending"] == 2
+
+    # Queda no meio de uma gravação: a linha incompleta é ignorada
+    with open(store.journal_path, "a", encoding="utf-8") as journal:
+        journal.write('{"event": "rem')
+
+    restarted = RegistryStore(str(tmp_path))
+    entries = restarted.open()
+
+    assert entries == [
+        ("svc", "localhost", 2, False), ("svc", "localhost", 3, False), ("outro", "localhost", 4, False)
+    ]
+    assert restarted.stats()["replayed"] == 2
+
+    restored = ServiceRegistry()
+    assert restored.restore(entries, grace=0.2) == 3
+    assert all(instance["provisional"] for instance in restored.instances("svc"))
+
+    # Só a instância confirmada pelo heartbeat é escolhida
+    assert restored.renew("svc", "localhost", 3)
+    assert {restored.lookup("svc") for _ in range(4)} == {("localhost", 3)}
+
+    # Sem heartbeat, as provisórias vencem ao fim da carência
+    time.sleep(0.3)
+    assert restored.lookup("outro") is None
+    assert sorted(restored.sweep()) == [("outro", "localhost", 4), ("svc", "localhost", 2)]
+
+    restarted.close()
+
+
+def test_exclusive_instance_survives_restart(tmp_path):
+    """
+    A exclusividade vai ao journal e ao snapshot: após reiniciar o Name
+    Server, a instância restaurada continua recusando outras.
+    """
+
+    store = RegistryStore(str(tmp_path))
+    store.open()
+
+    registry = ServiceRegistry(
+        on_change=lambda service, event, host, port, load, exclusive: store.append(event, service, host, port, exclusive)
+    )
+    registry.register("svc", "localhost", 1, exclusive=True)
+
+    # Reinício antes da compactação (journal) e depois dela (snapshot)
+    for _ in range(2):
+        restarted = RegistryStore(str(tmp_path))
+        entries = restarted.open()
+        restarted.close()
+
+        assert entries == [("svc", "localhost", 1, True)]
+
+        restored = ServiceRegistry()
+        restored.restore(entries)
+
+        # Heartbeat do dono confirma a instância sem perder a exclusividade
+        assert restored.renew("svc", "localhost", 1)
+
+        with pytest.raises(RegistrationConflict):
+            restored.register("svc", "localhost", 2)
+
+    store.close()
+
+
+def test_name_server_balances_lookups():
+    conn = rpyc.connect(NAME_SERVER_HOST, NAME_SERVER_PORT)
+
+    try:
+        for port in (40001, 40002):
+            result = conn.root.register("teste_balanceamento", "localhost", port)
+
+        assert result["data"]["instances"] == 2
+
+        # Instância exclusiva (estoque em memória) não se junta às demais
+        result = conn.root.register("teste_balanceamento", "localhost", 40003, exclusive=True)
+        assert result["status"] == "error"
+
+        picks = {tuple(conn.root.lookup("teste_balanceamento")) for _ in range(4)}
+        assert picks == {("localhost", 40001), ("localhost", 40002)}
+
+        assert conn.root.report_load("teste_balanceamento", "localhost", 40001, 5)["status"] == "success"
+        assert tuple(conn.root.lookup("teste_balanceamento", "least_loaded")) == ("localhost", 40002)
+
+        # Relatório de carga no heartbeat: a instância lenta deixa de ser escolhida
+        conn.root.heartbeat("teste_balanceamento", "localhost", 40001, None, (0, 0.0, 2.0))
+        conn.root.heartbeat("teste_balanceamento", "localhost", 40002, None, (8, 0.9, 300.0))
+
+        picks = {tuple(conn.root.lookup("teste_balanceamento", "p2c")) for _ in range(4)}
+        assert picks == {("localhost", 40001)}
+        assert len(conn.root.list_instances("teste_balanceamento")) == 2
+
+    finally:
+        for port in (40001, 40002):
+            conn.root.unregister("teste_balanceamento", "localhost", port)
+
+        conn.close()
@@ -0,0 +1,133 @@
+"""
+test_replica.py
+
+Testes da réplica de leitura.
+
+Sobe uma réplica (porta e banco próprios) ao lado do servidor
+principal iniciado pelo conftest e valida se:
+- As consultas do cliente são atendidas pela réplica, com a defasagem
+- Compras feitas no principal chegam à réplica
+- A réplica recusa compras
+- O principal recusa pedidos de replicação sem o segredo
+- O cliente que acabou de comprar lê do principal
+- Sem a réplica, as consultas voltam ao principal
+- Sem o principal, a réplica não se marca como sincronizada
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import rpyc
+
+from client.client_core import ClientCore
+from config import SERVER_HOST, SERVER_PORT, READ_SERVICE_NAME
+from core.replica import ReplicaSync
+from serialization import decode
+from tests.conftest import wait_for_port
+
+
+REPLICA_PORT = SERVER_PORT + 10
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.2)
+
+    return False
+
+
+def available(core, movie_id):
+    return core.list_screenings_by_movie(movie_id)["data"][0][3]
+
+
+def test_replica_sync_stays_unsynced_without_primary():
+    """
+    Sincronização que falha não marca a réplica como em dia:
+    run_replica só a registra no Name Server depois disso.
+    """
+
+    def unreachable():
+        raise ConnectionRefusedError("principal fora do ar")
+
+    sync = ReplicaSync(unreachable)
+
+    try:
+        sync.sync_once()
+    except ConnectionRefusedError:
+        pass
+
+    assert not sync.synced.is_set()
+    assert sync.staleness() is None
+
+
+def test_replica_serves_reads_and_follows_primary(tmp_path):
+    env = dict(
+        os.environ,
+        CINEMA_DB=str(tmp_path / "replica.db"),
+        CINEMA_SERVER_ROLE="replica",
+        CINEMA_SERVER_PORT=str(REPLICA_PORT)
+    )
+    replica = subprocess.Popen([sys.executable, "-m", "core.server"], env=env)
+
+    reader = ClientCore()
+    buyer = ClientCore()
+
+    try:
+        assert wait_for_port(REPLICA_PORT)
+
+        # A réplica só se registra após a primeira sincronização
+        assert wait_until(lambda: reader._lookup(READ_SERVICE_NAME))
+
+        result = reader.list_movies()
+        assert result["status"] == "success"
+        assert 0 <= result["staleness_s"] <= reader.max_staleness
+        assert reader.replica_reads == 1
+
+        before = available(reader, 8)
+
+        # Compra no principal: o comprador passa a ler do principal
+        assert buyer.buy_tickets("Replica", "replica@email.com", 8, 3)["status"] == "success"
+        assert available(buyer, 8) == before - 3
+        assert buyer.replica_reads == 0
+
+        # A réplica alcança a compra
+        assert wait_until(lambda: available(reader, 8) == before - 3)
+        assert reader.replica_reads > 1
+
+        # Compras são recusadas pela réplica
+        conn = rpyc.connect(SERVER_HOST, REPLICA_PORT)
+        refused = decode(conn.root.buy_tickets("Replica", "replica@email.com", 8, 1))
+        stats = decode(conn.root.replica_stats())["data"]
+        conn.close()
+
+        assert refused["status"] == "error"
+        assert stats["lag_changes"] >= 0
+
+        # Sem o segredo, o principal não entrega clientes nem compras
+        conn = rpyc.connect(SERVER_HOST, SERVER_PORT)
+        denied = decode(conn.root.replication_snapshot("errado", "clients"))
+        conn.close()
+
+        assert denied["status"] == "error"
+        assert denied["data"] is None
+
+        # Réplica fora do ar: a consulta é refeita no principal
+        replica.terminate()
+        replica.wait()
+
+        assert reader.list_movies()["status"] == "success"
+        assert reader.replica_fallbacks >= 1
+
+    finally:
+        reader.close()
+        buyer.close()
+
+        if replica.poll() is None:
+            replica.terminate()
+            replica.wait()
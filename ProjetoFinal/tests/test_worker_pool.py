@@ -0,0 +1,147 @@
+"""
+test_worker_pool.py
+
+Testes do servidor com pool fixo de workers.
+
+Valida se:
+- Conexões dentro da capacidade são atendidas normalmente
+- Conexões excedentes recebem a resposta "busy" e são contabilizadas
+- Conexões que esperam demais na fila também recebem "busy"
+- O cliente aguarda e tenta de novo sem abrir o Circuit Breaker
+"""
+
+import socket
+import threading
+import time
+
+import rpyc
+
+from client.client_core import ClientCore
+from serialization import decode
+from core.worker_pool import BoundedThreadPoolServer
+
+
+class EchoService(rpyc.Service):
+    def exposed_echo(self, value, deadline_ms=None):
+        return value
+
+
+def start_pool(**kwargs):
+    server = BoundedThreadPoolServer(
+        EchoService, hostname="localhost", port=0, **kwargs
+    )
+    thread = threading.Thread(target=server.start, daemon=True)
+    thread.start()
+
+    while not server.active:
+        time.sleep(0.01)
+
+    return server
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_pool_rejects_connections_beyond_capacity():
+    """
+    Com 1 worker e fila de 1, a terceira conexão simultânea recebe "busy".
+    """
+
+    server = start_pool(workers=1, accept_queue=1)
+
+    try:
+        # Ocupa o único worker com uma conexão ativa
+        busy = rpyc.connect("localhost", server.port)
+        assert busy.root.echo(1) == 1
+
+        # Ocupa a fila com uma conexão sem atendimento
+        queued = socket.create_connection(("localhost", server.port))
+
+        wait_for(lambda: server.stats()["queue_depth"] >= 1)
+
+        # A próxima é recusada sem ocupar um worker: qualquer chamada
+        # recebe a resposta "busy", distinguível de servidor fora do ar
+        extra = rpyc.connect("localhost", server.port)
+        response = decode(extra.root.echo(2))
+        assert response["status"] == "busy"
+        extra.close()
+
+        wait_for(lambda: server.stats()["busy_replies"] >= 1)
+
+        stats = server.stats()
+        assert stats["rejected"] == 1
+        assert stats["busy_replies"] == 1
+        assert stats["resets"] == 0
+        assert stats["active_workers"] == 1
+        assert stats["queue_depth"] == 1
+
+        queued.close()
+        busy.close()
+
+    finally:
+        server.close()
+
+
+def test_pool_replies_busy_after_queue_timeout():
+    """
+    Uma conexão que espera mais que queue_timeout por um worker
+    (preso a uma conexão persistente) recebe "busy" em vez de esperar
+    indefinidamente.
+    """
+
+    server = start_pool(workers=1, accept_queue=4, queue_timeout=0.2)
+
+    try:
+        busy = rpyc.connect("localhost", server.port)
+        assert busy.root.echo(1) == 1
+
+        waiting = rpyc.connect("localhost", server.port)
+        response = decode(waiting.root.echo(2))
+        assert response["status"] == "busy"
+
+        stats = server.stats()
+        assert stats["queue_timeouts"] == 1
+        assert stats["queue_depth"] == 0
+
+        waiting.close()
+        busy.close()
+
+    finally:
+        server.close()
+
+
+def test_client_backs_off_on_busy_without_opening_breaker():
+    """
+    O cliente reconhece "busy": espera entre as tentativas, mantém o
+    endereço no cache de descoberta e não conta falha no circuito.
+    """
+
+    server = start_pool(workers=1, accept_queue=1)
+    core = ClientCore()
+    core.watch_registry = False
+    core.busy_backoff = 0.05
+    core.discovery.get = lambda service_name: ("localhost", server.port)
+
+    try:
+        busy = rpyc.connect("localhost", server.port)
+        assert busy.root.echo(1) == 1
+
+        queued = socket.create_connection(("localhost", server.port))
+        wait_for(lambda: server.stats()["queue_depth"] >= 1)
+
+        result = core._retry_call("echo", 2, timeout=5)
+
+        assert result["status"] == "busy"
+        assert core.busy_replies == core.max_retries
+        assert core.breaker.state == "CLOSED"
+        assert core.breaker.failure_count == 0
+
+        queued.close()
+        busy.close()
+
+    finally:
+        core.close()
+        server.close()